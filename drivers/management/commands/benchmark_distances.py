@@ -0,0 +1,55 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 22:10
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from koshkie import haversine
+from koshkie.distance import distances_from, distance_matrix
+
+CENTER_LATITUDE = 30.0444  # Cairo
+CENTER_LONGITUDE = 31.2357
+SPREAD = 0.5  # degrees around the center the locations are spread in
+
+
+class Command(BaseCommand):
+    """Django command to compare computing distances one pair at a
+    time with koshkie.haversine and over arrays with koshkie.distance"""
+
+    help = 'Benchmarks the scalar haversine against the vectorized distances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 10000],
+                            help='numbers of locations to compute the distances to')
+        parser.add_argument('--runs', type=int, default=20,
+                            help='number of runs for every size')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        random = np.random.RandomState(0)
+        self.stdout.write('%10s %15s %15s %15s %15s' % ('locations', 'scalar (ms)', 'vector (ms)',
+                                                        'matrix (ms)', 'max error (m)'))
+        for size in options['sizes']:
+            locations = random.uniform(-SPREAD, SPREAD, (size, 2)) + (CENTER_LATITUDE, CENTER_LONGITUDE)
+            latitudes, longitudes = locations[:, 0].tolist(), locations[:, 1].tolist()
+
+            start = time.perf_counter()
+            for _ in range(options['runs']):
+                scalar = [haversine(CENTER_LATITUDE, CENTER_LONGITUDE, latitude, longitude)
+                          for latitude, longitude in zip(latitudes, longitudes)]
+            scalar_time = (time.perf_counter() - start) / options['runs']
+
+            start = time.perf_counter()
+            for _ in range(options['runs']):
+                vector = distances_from(CENTER_LATITUDE, CENTER_LONGITUDE, latitudes, longitudes)
+            vector_time = (time.perf_counter() - start) / options['runs']
+
+            # 50 orders against all the locations, as in the batch matching
+            start = time.perf_counter()
+            for _ in range(options['runs']):
+                distance_matrix(latitudes[:50], longitudes[:50], latitudes, longitudes)
+            matrix_time = (time.perf_counter() - start) / options['runs']
+
+            self.stdout.write('%10d %15.3f %15.3f %15.3f %15.6f' % (
+                size, scalar_time * 1000, vector_time * 1000, matrix_time * 1000,
+                np.abs(np.asarray(scalar) - vector).max() * 1000))
@@ -0,0 +1,90 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 12:00
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from drivers.models import DriverProfileModel
+from drivers.spatial import available_drivers, get_driver_index
+
+CENTER_LATITUDE = 30.0444  # Cairo
+CENTER_LONGITUDE = 31.2357
+SPREAD = 0.5  # degrees around the center the drivers are spread in
+
+
+class Command(BaseCommand):
+    """Django command to compare the nearby drivers lookup
+    in SQL with the drivers spatial index.
+
+    The drivers are created inside a transaction
+    that is rolled back at the end of every run.
+    """
+
+    help = 'Benchmarks the drivers spatial index against the SQL haversine lookup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                            help='numbers of drivers to benchmark with')
+        parser.add_argument('--queries', type=int, default=100,
+                            help='number of lookups per run')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        random.seed(0)
+        self.stdout.write('%10s %15s %15s %15s' % ('drivers', 'sql (ms)', 'index (ms)', 'index only (ms)'))
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.seed(size)
+                points = [self.random_point() for _ in range(options['queries'])]
+
+                with override_settings(DRIVERS_INDEX_BACKEND=None):
+                    sql_time = self.time_lookups(points)
+
+                with override_settings(DRIVERS_INDEX_BACKEND='drivers.spatial.LocalDriverIndex'):
+                    index = get_driver_index()  # built here, outside the timings
+                    index_time = self.time_lookups(points)
+
+                    start = time.perf_counter()
+                    for latitude, longitude in points:
+                        index.nearest(latitude, longitude)
+                    index_only_time = (time.perf_counter() - start) / len(points)
+
+                transaction.set_rollback(True)
+
+            self.stdout.write('%10d %15.3f %15.3f %15.3f' % (size, sql_time * 1000, index_time * 1000,
+                                                             index_only_time * 1000))
+
+    @staticmethod
+    def random_point():
+        return (CENTER_LATITUDE + random.uniform(-SPREAD, SPREAD),
+                CENTER_LONGITUDE + random.uniform(-SPREAD, SPREAD))
+
+    def seed(self, size):
+        """creates size available drivers around the center"""
+        User.objects.bulk_create([User(username='benchmark-driver-%d' % i) for i in range(size)],
+                                 batch_size=500)
+        accounts = User.objects.filter(username__startswith='benchmark-driver-').values_list('pk', flat=True)
+
+        # online a while in the future so they stay available during the whole run
+        online = timezone.now() + timezone.timedelta(minutes=30)
+        drivers = []
+        for account_id in accounts.iterator():
+            latitude, longitude = self.random_point()
+            drivers.append(DriverProfileModel(account_id=account_id, phone_number=123, vehicle_type='M',
+                                              profile_photo='benchmark.jpg', is_active=True,
+                                              is_available=True, last_time_online=online,
+                                              live_location_latitude=latitude,
+                                              live_location_longitude=longitude))
+        DriverProfileModel.objects.bulk_create(drivers, batch_size=500)
+
+    @staticmethod
+    def time_lookups(points):
+        """returns the average time of getting the first page of nearby drivers"""
+        start = time.perf_counter()
+        for latitude, longitude in points:
+            list(available_drivers(latitude, longitude)[:10])
+        return (time.perf_counter() - start) / len(points)
@@ -0,0 +1,18 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 16:17
+
+# Generated by Django 3.0.7 on 2026-10-18 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('drivers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='driverprofilemodel',
+            index=models.Index(fields=['is_active', 'is_available', 'is_busy', 'live_location_latitude', 'live_location_longitude'], name='driver_available_location_idx'),
+        ),
+    ]
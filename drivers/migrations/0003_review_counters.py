@@ -0,0 +1,38 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:10
+
+# Generated by Django 3.0.7 on 2026-10-18 23:13
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def count_reviews(apps, schema_editor):
+    for app_label, model_name in (('drivers', 'DriverProfileModel'),):
+        model = apps.get_model(app_label, model_name)
+        instances = list(model.objects.annotate(actual_count=Count('reviews'), actual_sum=Sum('reviews__stars'))
+                         .only('pk').order_by('pk'))
+        for instance in instances:
+            instance.reviews_count = instance.actual_count
+            instance.stars_sum = instance.actual_sum or 0
+            instance.rating = round(instance.stars_sum / instance.reviews_count, 1) if instance.reviews_count else 0
+        model.objects.bulk_update(instances, ['reviews_count', 'stars_sum', 'rating'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('drivers', '0002_driver_available_location_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverprofilemodel',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='driverprofilemodel',
+            name='stars_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(count_reviews, migrations.RunPython.noop),
+    ]
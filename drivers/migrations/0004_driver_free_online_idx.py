@@ -0,0 +1,19 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 06:00
+
+# Generated by Django 3.0.7 on 2026-10-19 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('drivers', '0003_review_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='driverprofilemodel',
+            index=models.Index(condition=models.Q(is_active=True, is_available=True, is_busy=False),
+                               fields=['last_time_online'], name='driver_free_online_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 09:40
+
+# Generated by Django 3.0.7 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('drivers', '0004_driver_free_online_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='driverreviewmodel',
+            index=models.Index(fields=['driver', 'time_stamp', 'id'], name='driver_review_keyset_idx'),
+        ),
+    ]
@@ -6,7 +6,8 @@ import uuid
 from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import Avg
+
+from koshkie.ratings import Rated
 
 
 def photo_upload(instance, filename):
@@ -24,7 +25,7 @@ def photo_upload(instance, filename):
     return 'drivers/{0}.{1}'.format(uuid.uuid4().hex, os.path.splitext(filename))
 
 
-class DriverProfileModel(models.Model):
+class DriverProfileModel(Rated, models.Model):
     """The Model of the Driver Profile."""
 
     vehicle_type_choices = [
@@ -50,15 +51,23 @@ class DriverProfileModel(models.Model):
     ])
     vehicle_type = models.CharField(max_length=1, choices=vehicle_type_choices)
     rating = models.DecimalField(default=0, decimal_places=1, max_digits=2)
+    reviews_count = models.PositiveIntegerField(default=0)
+    stars_sum = models.FloatField(default=0)
+
+    class Meta:
+        # the status flags come first as they are always compared by equality,
+        # so the index range scan is on the latitude inside the search box
+        indexes = [models.Index(fields=['is_active', 'is_available', 'is_busy',
+                                        'live_location_latitude', 'live_location_longitude'],
+                                name='driver_available_location_idx'),
+                   # the free drivers anywhere, by the last time they were online
+                   models.Index(fields=['last_time_online'],
+                                condition=models.Q(is_active=True, is_available=True, is_busy=False),
+                                name='driver_free_online_idx')]
 
     def __str__(self):
         return self.account.username
 
-    def calculate_rating(self):
-        """Calculates the average rating of the driver from their reviews"""
-
-        self.rating = self.reviews.aggregate(Avg('stars')).get('stars__avg', 0)
-
 
 class DriverReviewModel(models.Model):
     """The Model of the Driver's Reviews."""
@@ -76,6 +85,7 @@ class DriverReviewModel(models.Model):
     class Meta:
         unique_together = ("driver", "sort")
         ordering = ['sort']
+        indexes = [models.Index(fields=['driver', 'time_stamp', 'id'], name='driver_review_keyset_idx')]
 
     def __str__(self):
         return self.text
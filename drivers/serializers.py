@@ -11,7 +11,6 @@ class DriverProfileSerializer(serializers.ModelSerializer):
     """The serializer for the driver profile model"""
 
     account = UserSerializer()
-    reviews_count = serializers.SerializerMethodField()
 
     class Meta:
         model = DriverProfileModel
@@ -21,6 +20,7 @@ class DriverProfileSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'is_active': {'read_only': True},
             'rating': {'read_only': True},
+            'reviews_count': {'read_only': True},
         }
 
     def create(self, validated_data):
@@ -58,10 +58,6 @@ class DriverProfileSerializer(serializers.ModelSerializer):
 
         return instance
 
-    def get_reviews_count(self, obj):
-        """returns the count of all review a driver has"""
-        return obj.reviews.count()
-
 
 class DriverReviewSerializer(serializers.ModelSerializer):
     """The serializer for the driver review model"""
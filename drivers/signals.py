@@ -1,9 +1,12 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 06/02/2020, 16:49
-from django.db.models import F
+from django.db import transaction
 from django.db.models.signals import post_delete, pre_save, post_save
 from django.dispatch import receiver
 
 from drivers.models import DriverProfileModel, DriverReviewModel
+from drivers.spatial import get_driver_index
+from koshkie.ordering import close_gap
+from koshkie.ratings import update_rating
 
 
 @receiver(post_delete, sender=DriverProfileModel)
@@ -14,33 +17,60 @@ def delete_driver_account(sender, **kwargs):
     kwargs['instance'].account.delete()
 
 
+@receiver(post_save, sender=DriverProfileModel)
+def update_driver_index(sender, **kwargs):
+    """The receiver called after a driver profile is saved
+    to keep the drivers spatial index up to date with
+    their location and availability once it is committed"""
+
+    index = get_driver_index()
+    if index is not None:
+        driver = kwargs['instance']
+        transaction.on_commit(lambda: index.update(driver))
+
+
+@receiver(post_delete, sender=DriverProfileModel)
+def remove_driver_from_index(sender, **kwargs):
+    """The receiver called after a driver profile is deleted
+    to remove it from the drivers spatial index once it is committed"""
+
+    index = get_driver_index()
+    if index is not None:
+        driver_id = kwargs['instance'].pk
+        transaction.on_commit(lambda: index.remove(driver_id))
+
+
 @receiver(pre_save, sender=DriverReviewModel)
 def add_sort_to_review(sender, **kwargs):
     """The receiver called before a driver review is saved
-    to give it a unique sort"""
+    to give it a unique sort, or to keep its old stars
+    if it is updated"""
 
     review = kwargs['instance']
     if not review.pk:
         latest_sort = DriverReviewModel.objects.filter(driver=review.driver).count()
         review.sort = latest_sort + 1
+    else:
+        review.old_stars = DriverReviewModel.objects.values_list('stars', flat=True).get(pk=review.pk)
 
 
 @receiver(post_save, sender=DriverReviewModel)
 def add_new_rating_driver(sender, **kwargs):
     """The receiver called after a driver review is saved
-    to give the driver a new rating"""
+    to update the driver's review counters and rating"""
 
     review = kwargs['instance']
-    review.driver.calculate_rating()
-    review.driver.save()
+    if kwargs['created']:
+        update_rating(review.driver, 1, review.stars)
+    else:
+        update_rating(review.driver, 0, review.stars - review.old_stars)
 
 
 @receiver(post_delete, sender=DriverReviewModel)
 def resort_reviews(sender, **kwargs):
     """The receiver called after a driver review is deleted
-    to resort them and give the driver a new rating"""
+    to resort them and update the driver's review counters and rating"""
 
     review = kwargs['instance']
-    review.driver.reviews.filter(sort__gt=review.sort).update(sort=F('sort') - 1)
-    review.driver.calculate_rating()
-    review.driver.save()
+    close_gap(review.driver.reviews, review.sort)
+    update_rating(review.driver, -1, -review.stars)
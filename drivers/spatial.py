@@ -0,0 +1,260 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 12:00
+import math
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, When, IntegerField
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from drivers.models import DriverProfileModel
+from koshkie import nearby
+from koshkie.caching import settings_singleton
+from koshkie.distance import distances_from
+
+KM_PER_DEGREE = 111.32  # length of one degree of latitude
+
+
+class BaseDriverIndex:
+    """The base class for the drivers spatial index backends.
+
+    The index holds the drivers who can take orders right now bucketed
+    in a uniform grid of (latitude, longitude) cells, so looking up the drivers
+    near a location only touches the cells around it instead of every driver.
+    Subclasses only store which drivers are in which cell.
+    """
+
+    def __init__(self, cell_size=2.5):
+        self.cell_size = cell_size  # in km
+        self.cell_degrees = cell_size / KM_PER_DEGREE
+
+    def cell(self, latitude, longitude):
+        """returns the grid cell that contains a location"""
+        return (math.floor(latitude / self.cell_degrees),
+                math.floor(longitude / self.cell_degrees))
+
+    def cells_around(self, latitude, longitude, radius):
+        """returns all grid cells overlapping a circle around a location"""
+        lat_span = radius / KM_PER_DEGREE
+        # a degree of longitude gets shorter when going far from the equator
+        lon_span = min(radius / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.001)), 180)
+
+        min_row, min_col = self.cell(latitude - lat_span, longitude - lon_span)
+        max_row, max_col = self.cell(latitude + lat_span, longitude + lon_span)
+        return [(row, col) for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)]
+
+    def nearest(self, latitude, longitude, radius=2.5):
+        """returns the ids of the indexed drivers within radius (km)
+        of a location ordered by distance (nearest first)"""
+        entries = self.entries(self.cells_around(latitude, longitude, radius))
+        if not entries:
+            return []
+
+        drivers_ids, latitudes, longitudes = zip(*entries)
+        distances = distances_from(latitude, longitude, latitudes, longitudes)
+        return [drivers_ids[i] for i in np.argsort(distances, kind='stable') if distances[i] <= radius]
+
+    def update(self, driver):
+        """adds, moves or removes a driver depending on whether
+        they can take orders or not"""
+        if driver.is_active and driver.is_available and not driver.is_busy:
+            self.add(driver.pk, float(driver.live_location_latitude),
+                     float(driver.live_location_longitude))
+        else:
+            self.remove(driver.pk)
+
+    def rebuild(self):
+        """fills the index from scratch with the drivers in the database"""
+        self.clear()
+        drivers = DriverProfileModel.objects.filter(is_active=True, is_available=True, is_busy=False)
+        for driver_id, latitude, longitude in drivers.values_list('pk', 'live_location_latitude',
+                                                                  'live_location_longitude').iterator():
+            self.add(driver_id, latitude, longitude)
+        self.mark_built()
+
+    def add(self, driver_id, latitude, longitude):
+        raise NotImplementedError
+
+    def remove(self, driver_id):
+        raise NotImplementedError
+
+    def entries(self, cells):
+        """returns (driver_id, latitude, longitude) of all drivers in cells"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def is_built(self):
+        raise NotImplementedError
+
+    def mark_built(self):
+        raise NotImplementedError
+
+
+class LocalDriverIndex(BaseDriverIndex):
+    """Driver index kept in the memory of the current process,
+    it is the fastest but each process sees only its own updates,
+    so it should only be used with a single process server."""
+
+    def __init__(self, **kwargs):
+        super(LocalDriverIndex, self).__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._cells = {}  # cell -> {driver_id: (latitude, longitude)}
+        self._drivers = {}  # driver_id -> cell
+        self._built = False
+
+    def add(self, driver_id, latitude, longitude):
+        cell = self.cell(latitude, longitude)
+        with self._lock:
+            self._discard(driver_id)
+            self._cells.setdefault(cell, {})[driver_id] = (latitude, longitude)
+            self._drivers[driver_id] = cell
+
+    def remove(self, driver_id):
+        with self._lock:
+            self._discard(driver_id)
+
+    def _discard(self, driver_id):
+        cell = self._drivers.pop(driver_id, None)
+        if cell is not None:
+            drivers = self._cells[cell]
+            drivers.pop(driver_id, None)
+            if not drivers:
+                del self._cells[cell]
+
+    def entries(self, cells):
+        with self._lock:
+            return [(driver_id, latitude, longitude) for cell in cells
+                    for driver_id, (latitude, longitude) in self._cells.get(cell, {}).items()]
+
+    def clear(self):
+        with self._lock:
+            self._cells = {}
+            self._drivers = {}
+            self._built = False
+
+    def is_built(self):
+        return self._built
+
+    def mark_built(self):
+        self._built = True
+
+
+class CacheDriverIndex(BaseDriverIndex):
+    """Driver index shared between processes through the django cache
+    in DRIVERS_INDEX_CACHE (memcached or redis in production).
+
+    The cells are updated with read-modify-write, so an update racing with
+    another one in the same cell may be lost, that driver is then found
+    again on their next location update.
+    """
+
+    key_prefix = 'drivers-index'
+
+    def __init__(self, cache_alias='default', **kwargs):
+        super(CacheDriverIndex, self).__init__(**kwargs)
+        self.cache = caches[cache_alias]
+
+    def _cell_key(self, cell):
+        return '%s:cell:%s:%s' % (self.key_prefix, cell[0], cell[1])
+
+    def _driver_key(self, driver_id):
+        return '%s:driver:%s' % (self.key_prefix, driver_id)
+
+    def add(self, driver_id, latitude, longitude):
+        cell = self.cell(latitude, longitude)
+        old_cell = self.cache.get(self._driver_key(driver_id))
+        if old_cell is not None and tuple(old_cell) != cell:
+            self._discard(driver_id, old_cell)
+
+        drivers = self.cache.get(self._cell_key(cell), {})
+        drivers[driver_id] = (latitude, longitude)
+        self.cache.set_many({self._cell_key(cell): drivers,
+                             self._driver_key(driver_id): cell}, timeout=None)
+
+    def remove(self, driver_id):
+        cell = self.cache.get(self._driver_key(driver_id))
+        if cell is not None:
+            self._discard(driver_id, cell)
+            self.cache.delete(self._driver_key(driver_id))
+
+    def _discard(self, driver_id, cell):
+        drivers = self.cache.get(self._cell_key(cell), {})
+        if drivers.pop(driver_id, None) is not None:
+            self.cache.set(self._cell_key(cell), drivers, timeout=None)
+
+    def entries(self, cells):
+        found = self.cache.get_many([self._cell_key(cell) for cell in cells])
+        return [(driver_id, latitude, longitude) for drivers in found.values()
+                for driver_id, (latitude, longitude) in drivers.items()]
+
+    def clear(self):
+        # stale cells are overwritten or ignored, only the
+        # built marker has to go to trigger a full rebuild
+        self.cache.delete('%s:built' % self.key_prefix)
+
+    def is_built(self):
+        return self.cache.get('%s:built' % self.key_prefix, False)
+
+    def mark_built(self):
+        self.cache.set('%s:built' % self.key_prefix, True, timeout=None)
+
+
+@settings_singleton('DRIVERS_INDEX_')
+def configured_driver_index():
+    """Returns the drivers index configured in DRIVERS_INDEX_BACKEND or None if it's disabled"""
+    backend = getattr(settings, 'DRIVERS_INDEX_BACKEND', None)
+    if not backend:
+        return None
+
+    index_class = import_string(backend)
+    if issubclass(index_class, CacheDriverIndex):
+        return index_class(cache_alias=getattr(settings, 'DRIVERS_INDEX_CACHE', 'default'))
+    return index_class()
+
+
+def get_driver_index():
+    """Returns the drivers index configured in DRIVERS_INDEX_BACKEND,
+    filled from the database on first use, or None if it's disabled."""
+    index = configured_driver_index()
+    if index is not None and not index.is_built():
+        index.rebuild()
+    return index
+
+
+def free_drivers():
+    """Returns a queryset of the drivers who are online
+    and can take an order right now wherever they are"""
+
+    min_active_time = timezone.now() - timezone.timedelta(seconds=10)
+    return DriverProfileModel.objects.filter(is_busy=False, is_active=True, is_available=True,
+                                             last_time_online__gte=min_active_time)
+
+
+def available_drivers(latitude, longitude, radius=2.5):
+    """Returns a queryset of the drivers who can take an order
+    within radius (km) of a location ordered by distance (nearest first).
+
+    Uses the drivers spatial index if it's enabled, if not
+    the distance is calculated in SQL for every driver.
+    """
+
+    queryset = free_drivers()
+
+    index = get_driver_index()
+    if index is None:
+        return nearby(queryset, latitude, longitude, radius,
+                      'live_location_latitude', 'live_location_longitude')
+
+    drivers_ids = index.nearest(latitude, longitude, radius)
+    if not drivers_ids:
+        return queryset.none()
+
+    # keeps the index's order, the database only rechecks the drivers' state
+    ordering = Case(*[When(pk=pk, then=position) for position, pk in enumerate(drivers_ids)],
+                    output_field=IntegerField())
+    return queryset.filter(pk__in=drivers_ids).order_by(ordering)
@@ -1,13 +1,23 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 07/02/2020, 23:11
+import shutil
+import tempfile
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from drivers.models import DriverProfileModel, DriverReviewModel
 from drivers.serializers import DriverProfileSerializer, DriverReviewSerializer
 from users.models import UserProfileModel
 
+# the uploaded photos are saved here instead of the media of the project
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
 
 def img_file():
     path = '/drivers/tests/sample.jpg'
@@ -22,6 +32,7 @@ def img_file():
     return image_file
 
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class TestDrivers(TestCase):
     """UnitTest for users serializers"""
 
@@ -98,6 +109,7 @@ class TestDrivers(TestCase):
         self.assertEqual(serializer.data.get('reviews_count', 0), 2)
 
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class TestReviews(TestCase):
     """UnitTest for driver reviews serializers"""
 
@@ -0,0 +1,107 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 12:00
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from drivers.models import DriverProfileModel
+from drivers.spatial import LocalDriverIndex, CacheDriverIndex, available_drivers, get_driver_index
+
+
+class TestDriverIndex(TestCase):
+    """UnitTest for the drivers spatial index backends"""
+
+    def check_index(self, index):
+        index.add(1, 30, 30)
+        index.add(2, 30.01, 30)  # ~1.1 km away
+        index.add(3, 30.03, 30.03)  # ~4.4 km away
+        index.add(4, 40, 40)
+
+        self.assertEqual(index.nearest(30, 30), [1, 2])
+        self.assertEqual(index.nearest(30.03, 30.03), [3])
+        self.assertEqual(index.nearest(30, 30, radius=5), [1, 2, 3])
+
+        # driver moved to another cell
+        index.add(1, 40, 40.001)
+        self.assertEqual(index.nearest(30, 30), [2])
+        self.assertEqual(index.nearest(40, 40), [4, 1])
+
+        index.remove(4)
+        index.remove(123)  # not in the index
+        self.assertEqual(index.nearest(40, 40), [1])
+
+    def test_local_index(self):
+        """test for the process local index"""
+        self.check_index(LocalDriverIndex())
+
+    def test_cache_index(self):
+        """test for the index shared through the cache"""
+        self.check_index(CacheDriverIndex())
+        CacheDriverIndex().cache.clear()
+
+    def test_cells_around(self):
+        """test that the searched cells cover the whole radius"""
+        index = LocalDriverIndex(cell_size=1)
+        cells = index.cells_around(30, 30, 2.5)
+        self.assertIn(index.cell(30.0224, 30), cells)  # 2.49 km north
+        self.assertIn(index.cell(30, 29.9741), cells)  # 2.49 km west
+        self.assertNotIn(index.cell(30, 30.1), cells)
+
+
+@override_settings(DRIVERS_INDEX_BACKEND='drivers.spatial.LocalDriverIndex')
+class TestAvailableDrivers(TransactionTestCase):
+    """UnitTest for the nearby drivers lookup using the index"""
+
+    def setUp(self):
+        # the drivers of the previous tests were flushed without signals
+        get_driver_index().clear()
+        self.drivers = []
+        for i, latitude in enumerate((30.01, 30, 30.3)):
+            account = User.objects.create(username='driver%d' % i, password='password')
+            self.drivers.append(DriverProfileModel.objects.create(account=account, phone_number=123,
+                                                                  profile_photo='/drivers/tests/sample.jpg',
+                                                                  is_active=True, is_available=True,
+                                                                  last_time_online=timezone.now(),
+                                                                  live_location_longitude=30,
+                                                                  live_location_latitude=latitude))
+
+    def test_nearest_first(self):
+        """test that only drivers in range are returned nearest first"""
+        self.assertEqual(list(available_drivers(30, 30)), [self.drivers[1], self.drivers[0]])
+
+    def test_index_follows_updates(self):
+        """test that the index is kept up to date by signals"""
+
+        # busy drivers are removed from the index
+        self.drivers[1].is_busy = True
+        self.drivers[1].save()
+        self.assertNotIn(self.drivers[1].pk, get_driver_index().nearest(30, 30))
+        self.assertEqual(list(available_drivers(30, 30)), [self.drivers[0]])
+
+        # moved to the location
+        self.drivers[2].live_location_latitude = 30.001
+        self.drivers[2].save()
+        self.assertEqual(list(available_drivers(30, 30)), [self.drivers[2], self.drivers[0]])
+
+        self.drivers[0].delete()
+        self.assertEqual(get_driver_index().nearest(30, 30), [self.drivers[2].pk])
+
+    def test_index_rolled_back(self):
+        """test that the index is not changed by updates that are rolled back"""
+        driver_ids = [self.drivers[1].pk, self.drivers[0].pk]
+        try:
+            with transaction.atomic():
+                self.drivers[1].is_busy = True
+                self.drivers[1].save()
+                self.drivers[0].delete()
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(get_driver_index().nearest(30, 30), driver_ids)
+
+    def test_offline_drivers_filtered(self):
+        """test that drivers not online recently are not returned
+        even if they are in the index"""
+        self.drivers[1].last_time_online = timezone.now() - timezone.timedelta(seconds=20)
+        self.drivers[1].save()
+        self.assertEqual(list(available_drivers(30, 30)), [self.drivers[0]])
@@ -1,17 +1,26 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 11/02/2020, 20:13
 import json
+import shutil
+import tempfile
 import time
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase, client
+from django.test import TestCase, client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
 from drivers.models import DriverProfileModel, DriverReviewModel
 from users.models import UserProfileModel
 
+# the uploaded photos are saved here instead of the media of the project
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
 
 def img_file():
     path = '/drivers/tests/sample.jpg'
@@ -26,6 +35,7 @@ def img_file():
     return image_file
 
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class TestDrivers(TestCase):
     """Unit Test for drivers app's views"""
 
@@ -264,6 +274,7 @@ class TestDrivers(TestCase):
         self.assertEqual(User.objects.filter(username='username').exists(), False)
 
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class TestReviews(TestCase):
     """Unit Test for drivers reviews views"""
 
@@ -283,6 +294,23 @@ class TestReviews(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+        # by cursor
+        DriverReviewModel.objects.create(user=user_profile, driver=driver_profile, stars=4,
+                                         text='text 2')
+        response = self.client.get(url, {'cursor': '', 'limit': 1})
+        self.assertEqual([review['sort'] for review in json.loads(response.content)['reviews']], [1])
+        response = self.client.get(url, {'cursor': json.loads(response.content)['next'], 'limit': 1})
+        self.assertEqual([review['sort'] for review in json.loads(response.content)['reviews']], [2])
+        self.assertIsNone(json.loads(response.content)['next'])
+
+        # the reviews after the cursor keep their place when an earlier one is deleted and resorted
+        DriverReviewModel.objects.create(user=user_profile, driver=driver_profile, stars=3,
+                                         text='text 3')
+        response = self.client.get(url, {'cursor': '', 'limit': 2})
+        DriverReviewModel.objects.get(driver=driver_profile, sort=1).delete()
+        response = self.client.get(url, {'cursor': json.loads(response.content)['next'], 'limit': 2})
+        self.assertEqual([review['text'] for review in json.loads(response.content)['reviews']], ['text 3'])
+
         # wrong username
         url = reverse('drivers:reviews-list', kwargs={'username': 'non existing username'})
         response = self.client.get(url)
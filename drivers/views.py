@@ -1,8 +1,6 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 14/02/2020, 14:50
 
 from django.contrib.auth import login, authenticate, update_session_auth_hash
-from django.db.models import F
-from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view
 from rest_framework.generics import get_object_or_404
@@ -12,7 +10,8 @@ from rest_framework.response import Response
 from drivers.models import DriverProfileModel, DriverReviewModel
 from drivers.permissions import DriverProfilePermissions, DriverReviewPermissions
 from drivers.serializers import DriverProfileSerializer, DriverReviewSerializer
-from koshkie import haversine
+from drivers.spatial import available_drivers
+from koshkie.pagination import paginate
 
 
 @api_view(['POST'])
@@ -61,14 +60,7 @@ class DriverProfileView(viewsets.ViewSet):
         except Exception:
             return Response("invalid coordinates", status=status.HTTP_400_BAD_REQUEST)
 
-        min_active_time = timezone.now() - timezone.timedelta(seconds=10)
-        queryset = DriverProfileModel.objects.annotate(distance=haversine(user_latitude, user_longitude,
-                                                                          F('live_location_latitude'),
-                                                                          F('live_location_longitude'))
-                                                       ).filter(distance__lte=2.5, is_busy=False,
-                                                                last_time_online__gte=min_active_time,
-                                                                is_active=True, is_available=True
-                                                                ).order_by('distance')
+        queryset = available_drivers(user_latitude, user_longitude)
 
         paginator = LimitOffsetPagination()
         paginator.default_limit = 10
@@ -225,14 +217,10 @@ class DriverReviewView(viewsets.ViewSet):
 
         driver = get_object_or_404(DriverProfileModel, account__username=username)
         queryset = driver.reviews.all()
-        paginator = LimitOffsetPagination()
-        paginator.default_limit = 25
-        paginator.max_limit = 100
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        serializer = DriverReviewSerializer(paginated_queryset, many=True)
+        page, pagination = paginate(queryset, request, ('time_stamp', 'id'))
+        serializer = DriverReviewSerializer(page, many=True)
 
-        return Response(data={'limit': paginator.limit, 'offset': paginator.offset,
-                              'count': paginator.count, 'reviews': serializer.data})
+        return Response(data=dict(pagination, reviews=serializer.data))
 
     def retrieve(self, request, username=None, pk=None):
         """Retrieves a certain review from the driver's reviews
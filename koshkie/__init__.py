@@ -2,7 +2,7 @@
 import math
 from abc import ABC
 
-from django.db.models import Func, F
+from django.db.models import Func, F, Q
 
 
 class Sin(Func, ABC):
@@ -48,3 +48,48 @@ def haversine(lat1, lon1, lat2, lon2):
         c = 2 * math.asin(math.sqrt(a))
 
     return rad * c
+
+
+def bounding_box(latitude, longitude, radius):
+    """returns the (min_latitude, max_latitude, min_longitude, max_longitude)
+    of the smallest box containing all locations within radius (km)
+    of a location, longitudes may go past +-180 near the date line"""
+    # for more info http://janmatuschek.de/LatitudeLongitudeBoundingCoordinates
+    angular_radius = radius / 6371
+    lat_span = angular_radius * 180 / math.pi
+    min_latitude = latitude - lat_span
+    max_latitude = latitude + lat_span
+
+    sin_lon_span = math.sin(angular_radius) / math.cos(latitude * math.pi / 180.0)
+    if min_latitude <= -90 or max_latitude >= 90 or sin_lon_span >= 1:
+        # the circle contains a pole so it covers all longitudes
+        return max(min_latitude, -90), min(max_latitude, 90), -180, 180
+
+    lon_span = math.asin(sin_lon_span) * 180 / math.pi
+    return min_latitude, max_latitude, longitude - lon_span, longitude + lon_span
+
+
+def nearby(queryset, latitude, longitude, radius, latitude_field, longitude_field):
+    """filters a queryset to the rows within radius (km) of a location
+    ordered by distance (nearest first).
+
+    The rows are first restricted to the bounding box of the radius,
+    which can use indexes on the coordinates columns, then the exact
+    haversine distance is only calculated for the rows inside the box.
+    """
+    min_latitude, max_latitude, min_longitude, max_longitude = bounding_box(latitude, longitude, radius)
+
+    box = Q(**{latitude_field + '__gte': min_latitude, latitude_field + '__lte': max_latitude})
+    if min_longitude < -180:  # the box crosses the date line
+        box &= (Q(**{longitude_field + '__gte': min_longitude + 360}) |
+                Q(**{longitude_field + '__lte': max_longitude}))
+    elif max_longitude > 180:
+        box &= (Q(**{longitude_field + '__gte': min_longitude}) |
+                Q(**{longitude_field + '__lte': max_longitude - 360}))
+    else:
+        box &= Q(**{longitude_field + '__gte': min_longitude, longitude_field + '__lte': max_longitude})
+
+    return queryset.filter(box).annotate(distance=haversine(latitude, longitude,
+                                                            F(latitude_field),
+                                                            F(longitude_field))
+                                         ).filter(distance__lte=radius).order_by('distance')
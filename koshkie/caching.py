@@ -0,0 +1,110 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 09:30
+import functools
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+
+
+class VersionedCache:
+    """The base class of the caches whose keys have a version kept in the django cache.
+
+    Bumping a version makes all the entries cached with it stale without deleting
+    them, they are never read again and expire on their own. A version starts from
+    the current time, so a version lost by the cache doesn't start over and find
+    old entries. The caches with a version for every group of entries (like the
+    menu of every shop) pass the group as the scope of version() and bump().
+
+    The lookups are counted as hits and misses for stats().
+    """
+
+    key_prefix = None
+
+    def __init__(self, cache_alias='default', timeout=None):
+        self.cache = caches[cache_alias]
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _version_key(self, scope=None):
+        if scope is None:
+            return '%s:version' % self.key_prefix
+        return '%s:version:%s' % (self.key_prefix, scope)
+
+    def version(self, scope=None):
+        key = self._version_key(scope)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, time.time_ns(), timeout=None)
+            version = self.cache.get(key)
+        return version
+
+    def bump(self, scope=None):
+        """makes the entries cached with the version of a scope stale"""
+        key = self._version_key(scope)
+        try:
+            self.cache.incr(key)
+        except ValueError:  # no version yet
+            self.cache.add(key, time.time_ns(), timeout=None)
+
+    def get_or_build(self, key, build, *args):
+        """returns the value cached in key, built by build(*args) and cached if it isn't cached yet"""
+        value = self.cache.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = build(*args)
+        self.cache.set(key, value, timeout=self.timeout)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0}
+
+
+def bump_after_commit(cache, scope=None):
+    """Bumps a version of a versioned cache now and again after the current
+    transaction commits, as another request may cache an entry built from
+    the data before the commit while the transaction is still open"""
+    cache.bump(scope)
+    transaction.on_commit(lambda: cache.bump(scope))
+
+
+def settings_singleton(*prefixes):
+    """Makes a function that builds an object from the settings return the same object
+    until a setting starting with one of the prefixes changes, or None without keeping
+    it when the object is disabled in the settings.
+
+    Django only sends setting_changed when the tests override the settings, so the
+    server builds every object once and the tests get the objects of their settings.
+    """
+
+    def decorator(build):
+        instance = None
+
+        @functools.wraps(build)
+        def get():
+            nonlocal instance
+
+            if instance is None:
+                instance = build()
+            return instance
+
+        def reset(setting, **kwargs):
+            nonlocal instance
+
+            if setting.startswith(prefixes):
+                instance = None
+
+        setting_changed.connect(reset, weak=False)
+        return get
+
+    return decorator
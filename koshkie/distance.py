@@ -0,0 +1,27 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 22:10
+import numpy as np
+
+EARTH_RADIUS = 6371  # km, the same as koshkie.haversine
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    """the haversine formula over numpy arrays of radians"""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def distances_from(latitude, longitude, latitudes, longitudes):
+    """returns a numpy array of the distances (km)
+    between a location and every location in the lists"""
+    return _haversine(np.radians(latitude), np.radians(longitude),
+                      np.radians(np.asarray(latitudes, dtype=float)),
+                      np.radians(np.asarray(longitudes, dtype=float)))
+
+
+def distance_matrix(latitudes1, longitudes1, latitudes2, longitudes2):
+    """returns a numpy matrix of the distances (km) between every
+    location in the first lists and every location in the second"""
+    return _haversine(np.radians(np.asarray(latitudes1, dtype=float))[:, np.newaxis],
+                      np.radians(np.asarray(longitudes1, dtype=float))[:, np.newaxis],
+                      np.radians(np.asarray(latitudes2, dtype=float))[np.newaxis, :],
+                      np.radians(np.asarray(longitudes2, dtype=float))[np.newaxis, :])
@@ -0,0 +1,44 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 06:00
+import json
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SEQUENTIAL_SCAN = 'Seq Scan'
+
+
+def explain(sql, params=None, using=DEFAULT_DB_ALIAS):
+    """Returns the plan postgres makes for a query without running it"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def explain_queryset(queryset):
+    """Returns the plan postgres makes for a queryset without running it"""
+    sql, params = queryset.query.sql_with_params()
+    return explain(sql, params, using=queryset.db)
+
+
+def table_scans(plan):
+    """Returns how a plan reads its tables, a dict of every table to
+    the names of the indexes it is read from, and SEQUENTIAL_SCAN
+    if the whole table is read"""
+    scans = defaultdict(set)
+
+    def visit(node, table=None):
+        table = node.get('Relation Name', table)
+        if 'Index Name' in node:
+            scans[table].add(node['Index Name'])
+        elif node['Node Type'] == SEQUENTIAL_SCAN:
+            scans[table].add(SEQUENTIAL_SCAN)
+        # the bitmap index scans of a table are under the bitmap heap scan that reads it
+        child_table = table if node['Node Type'] in ('Bitmap Heap Scan', 'BitmapAnd', 'BitmapOr') else None
+        for child in node.get('Plans', []):
+            visit(child, child_table)
+
+    visit(plan)
+    return dict(scans)
@@ -0,0 +1,377 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 17:05
+import logging
+import math
+import queue
+import threading
+import time
+from collections import namedtuple, OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from geopy import Nominatim
+from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+
+from koshkie.caching import settings_singleton
+from koshkie.geoindex import GeoIndex
+
+# an address waiting to get its country and city
+GeocodingJob = namedtuple('GeocodingJob', ('model', 'pk', 'latitude', 'longitude', 'attempts'))
+
+# the errors worth trying again later, any other error means the location can't be geocoded
+RETRYABLE_ERRORS = (GeocoderTimedOut, GeocoderUnavailable)
+RETRY = object()  # lookup result of a location that should be retried
+MAX_RETRY_DELAY = 60  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+class NominatimGeocoder:
+    """Reverse geocoder using the OpenStreetMap Nominatim service"""
+
+    def __init__(self, timeout=5):
+        self.geolocator = Nominatim(user_agent='koshkie', timeout=timeout)
+
+    def reverse(self, latitude, longitude):
+        """returns the (country, city) of a location"""
+        location = self.geolocator.reverse((latitude, longitude), language='en')
+        address = location.raw.get('address', {}) if location else {}
+        return address.get('country', ''), address.get('state', '') or address.get('city', '')
+
+
+class OfflineGeocoder:
+    """Reverse geocoder resolving locations to the nearest place in the
+    local index file GEOCODING_OFFLINE_INDEX (made by `manage.py build_geocoding_index`),
+    locations farther than GEOCODING_OFFLINE_MAX_DISTANCE km from any place get no country"""
+
+    def __init__(self, path=None, max_distance=None):
+        self.index = GeoIndex(path or settings.GEOCODING_OFFLINE_INDEX)
+        self.max_distance = max_distance or settings.GEOCODING_OFFLINE_MAX_DISTANCE
+
+    def reverse(self, latitude, longitude):
+        """returns the (country, city) of the nearest place"""
+        place = self.index.nearest(latitude, longitude)
+        if place is None or place[2] > self.max_distance:
+            return '', ''
+        return place[0], place[1]
+
+
+class StubGeocoder:
+    """Reverse geocoder that doesn't call any service,
+    it is used for tests and offline development"""
+
+    def __init__(self, country='Egypt', city='Cairo'):
+        self.country = country
+        self.city = city
+
+    def reverse(self, latitude, longitude):
+        """returns the same (country, city) for all locations"""
+        return self.country, self.city
+
+
+class GeocodeCache:
+    """Cache of reverse geocoding results keyed on the grid cell
+    of the location, as all locations in the same neighbourhood
+    have the same country and city.
+
+    Results are kept in an in-process LRU of max_size cells and, if
+    cache_alias is set, in that django cache too (a DatabaseCache table
+    keeps them between restarts and shares them between workers).
+    """
+
+    key_prefix = 'geocode'
+
+    def __init__(self, grid=0.005, max_size=10000, cache_alias=None):
+        self.grid = grid  # in degrees, 0.005 is ~500 m
+        self.max_size = max_size
+        self.cache = caches[cache_alias] if cache_alias else None
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, latitude, longitude):
+        """returns the cache key of the grid cell that contains a location"""
+        return '%s:%s:%d:%d' % (self.key_prefix, self.grid, math.floor(latitude / self.grid),
+                                math.floor(longitude / self.grid))
+
+    def get(self, latitude, longitude):
+        """returns the cached (country, city) of a location or None"""
+        key = self.key(latitude, longitude)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self.cache.get(key) if self.cache is not None else None
+        with self._lock:
+            if result is not None:
+                self.hits += 1
+                self._remember(key, tuple(result))
+            else:
+                self.misses += 1
+        return result and tuple(result)
+
+    def set(self, latitude, longitude, result):
+        key = self.key(latitude, longitude)
+        with self._lock:
+            self._remember(key, result)
+        if self.cache is not None:
+            self.cache.set(key, result, timeout=None)
+
+    def set_many(self, results):
+        """caches many ((latitude, longitude), result) pairs at once"""
+        entries = {self.key(latitude, longitude): result for (latitude, longitude), result in results}
+        with self._lock:
+            for key, result in entries.items():
+                self._remember(key, result)
+        if self.cache is not None:
+            self.cache.set_many(entries, timeout=None)
+
+    def _remember(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'cache_hits': self.hits, 'cache_misses': self.misses, 'cache_size': len(self._results)}
+
+
+class GeocodingMetrics:
+    """Counters of the reverse geocoding lookups"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.retries = 0
+        self.failures = 0
+        self.total_latency = 0
+        self.max_latency = 0
+
+    def add_lookup(self, latency):
+        with self._lock:
+            self.lookups += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def add_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def add_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {'lookups': self.lookups, 'retries': self.retries, 'failures': self.failures,
+                    'average_latency': self.total_latency / self.lookups if self.lookups else 0,
+                    'max_latency': self.max_latency}
+
+
+class GeocodingQueue:
+    """A pool of background workers filling the country and city of
+    saved addresses, so saving an address never waits for the geocoder.
+
+    Every worker takes up to batch_size jobs at a time, looks up each
+    distinct location once and writes the results with one update per result.
+    Locations found in the cache aren't sent to the geocoder at all.
+    Lookups that time out are retried after retry_delay seconds,
+    doubled on every attempt up to MAX_RETRY_DELAY, until max_retries is reached.
+    """
+
+    def __init__(self, geocoder, workers=2, batch_size=20, max_retries=3, retry_delay=1, cache=None):
+        self.geocoder = geocoder
+        self.cache = cache
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.jobs = queue.Queue()
+        self.metrics = GeocodingMetrics()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def put(self, job):
+        """adds a job to the queue, starting the workers on first use"""
+        with self._lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._work, name='geocoding-%d' % i, daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        self.jobs.put(job)
+
+    def _work(self):
+        while True:
+            batch = [self.jobs.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                for job in self.process(batch):
+                    self.retry(job)
+            except Exception:  # e.g. the database went away, the worker has to keep running
+                logger.exception('geocoding a batch of %d addresses failed', len(batch))
+                for job in batch:
+                    self.retry(job)
+            finally:
+                connection.close()  # every thread has its own connection
+                for _ in batch:
+                    self.jobs.task_done()
+
+    def process(self, batch):
+        """geocodes and saves a batch of jobs, returns the jobs that should be retried"""
+        results = {}
+        failed = []
+        for job in batch:
+            location = (job.latitude, job.longitude)
+            if location not in results:
+                results[location] = self.lookup(job.latitude, job.longitude)
+
+            if results[location] is RETRY:
+                failed.append(job)
+
+        updates = {}
+        for job in batch:
+            result = results[(job.latitude, job.longitude)]
+            if result is not None and result is not RETRY:
+                updates.setdefault((job.model, result), []).append(job.pk)
+
+        for (model, (country, city)), pks in updates.items():
+            apps.get_model(model).objects.filter(pk__in=pks).update(country=country, city=city)
+
+        return failed
+
+    def lookup(self, latitude, longitude):
+        """returns the (country, city) of a location, RETRY
+        if the lookup should be retried or None if it failed"""
+        if self.cache is not None:
+            result = self.cache.get(latitude, longitude)
+            if result is not None:
+                return result
+
+        start = time.perf_counter()
+        try:
+            result = self.geocoder.reverse(latitude, longitude)
+        except RETRYABLE_ERRORS:
+            return RETRY
+        except Exception:
+            self.metrics.add_failure()
+            return None
+        self.metrics.add_lookup(time.perf_counter() - start)
+
+        if self.cache is not None and result[0]:  # locations out of any country aren't cached
+            self.cache.set(latitude, longitude, result)
+        return result
+
+    def retry_after(self, job):
+        """returns seconds to wait before retrying a job or None if it shouldn't be retried"""
+        if job.attempts >= self.max_retries:
+            self.metrics.add_failure()
+            return None
+        self.metrics.add_retry()
+        return min(self.retry_delay * 2 ** job.attempts, MAX_RETRY_DELAY)
+
+    def retry(self, job):
+        delay = self.retry_after(job)
+        if delay is not None:
+            timer = threading.Timer(delay, self.jobs.put, args=(job._replace(attempts=job.attempts + 1),))
+            timer.daemon = True
+            timer.start()
+
+    def run(self, job):
+        """geocodes a job in the current thread, waiting between retries"""
+        while self.process([job]):
+            delay = self.retry_after(job)
+            if delay is None:
+                return
+            time.sleep(delay)
+            job = job._replace(attempts=job.attempts + 1)
+
+    def stats(self):
+        """returns the lookups metrics and the number of waiting jobs"""
+        stats = self.metrics.as_dict()
+        stats['queue_depth'] = self.jobs.qsize()
+        if self.cache is not None:
+            stats.update(self.cache.stats())
+        return stats
+
+
+@settings_singleton('GEOCODING_')
+def get_geocode_cache():
+    """Returns the geocoding results cache configured in
+    the GEOCODING_CACHE settings or None if it's disabled"""
+    if settings.GEOCODING_CACHE_SIZE:
+        return GeocodeCache(grid=settings.GEOCODING_CACHE_GRID,
+                            max_size=settings.GEOCODING_CACHE_SIZE,
+                            cache_alias=settings.GEOCODING_CACHE)
+    return None
+
+
+@settings_singleton('GEOCODING_')
+def get_geocoding_queue():
+    """Returns the geocoding queue configured in the GEOCODING settings"""
+    return GeocodingQueue(import_string(settings.GEOCODING_BACKEND)(),
+                          workers=settings.GEOCODING_WORKERS,
+                          batch_size=settings.GEOCODING_BATCH_SIZE,
+                          max_retries=settings.GEOCODING_MAX_RETRIES,
+                          retry_delay=settings.GEOCODING_RETRY_DELAY,
+                          cache=get_geocode_cache())
+
+
+class Geocoded:
+    """A mixin for the addresses geocoded from their location_latitude and location_longitude,
+    location_changed() tells the post_save receivers if the save made the address or moved it,
+    as saving any other field of the address doesn't need it to be geocoded again."""
+
+    location_fields = ('location_latitude', 'location_longitude')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Geocoded, cls).from_db(db, field_names, values)
+        instance._saved_location = instance.location()
+        return instance
+
+    def location(self):
+        """returns the (latitude, longitude) of the address as the decimals they are saved as"""
+        return tuple(self._meta.get_field(name).to_python(self.__dict__.get(name)) for name in self.location_fields)
+
+    def save(self, *args, **kwargs):
+        location = self.location()
+        self._location_changed = location != getattr(self, '_saved_location', None)
+        super(Geocoded, self).save(*args, **kwargs)
+        self._saved_location = location
+
+    def location_changed(self):
+        """returns whether the last save made the address or changed its location"""
+        return getattr(self, '_location_changed', True)
+
+
+def geocode_address(address):
+    """Fills the country and city of a saved address from its coordinates.
+
+    The lookup is queued after the current transaction commits
+    unless GEOCODING_ASYNC is False, then it's done right away.
+    """
+
+    job = GeocodingJob(address._meta.label, address.pk, float(address.location_latitude),
+                       float(address.location_longitude), 0)
+    if settings.GEOCODING_ASYNC:
+        transaction.on_commit(lambda: get_geocoding_queue().put(job))
+    else:
+        get_geocoding_queue().run(job)
@@ -0,0 +1,138 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 18:40
+import csv
+import math
+import mmap
+import struct
+
+# the file starts with the header, then the points coordinates (3 float32 each),
+# the points labels (country and city string ids, 2 uint32 each),
+# the strings offsets (uint32) and finally the utf-8 strings.
+# the points are stored in the order of an implicit balanced k-d tree:
+# the median of every range splits it on the axis of its depth.
+HEADER = struct.Struct('<4sHII')
+MAGIC = b'KGEO'
+VERSION = 1
+EARTH_RADIUS = 6371  # km
+
+
+def to_cartesian(latitude, longitude):
+    """returns the point of a location on the unit sphere, the straight
+    distance between two points grows with the distance on earth"""
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    return (math.cos(latitude) * math.cos(longitude),
+            math.cos(latitude) * math.sin(longitude),
+            math.sin(latitude))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS * math.asin(min(chord / 2, 1))
+
+
+def build_index(places, path):
+    """writes an index file of places, an iterable of
+    (latitude, longitude, country, city) tuples"""
+    strings = {}
+    points = []
+    for latitude, longitude, country, city in places:
+        country_id = strings.setdefault(country, len(strings))
+        city_id = strings.setdefault(city, len(strings))
+        points.append(to_cartesian(float(latitude), float(longitude)) + (country_id, city_id))
+
+    stack = [(0, len(points), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo > 1:
+            axis = depth % 3
+            points[lo:hi] = sorted(points[lo:hi], key=lambda point: point[axis])
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, depth + 1))
+            stack.append((mid + 1, hi, depth + 1))
+
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = [0]
+    for string in encoded:
+        offsets.append(offsets[-1] + len(string))
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(points), len(encoded)))
+        file.write(struct.pack('<%df' % (3 * len(points)), *[c for point in points for c in point[:3]]))
+        file.write(struct.pack('<%dI' % (2 * len(points)), *[i for point in points for i in point[3:]]))
+        file.write(struct.pack('<%dI' % len(offsets), *offsets))
+        file.write(b''.join(encoded))
+    return len(points)
+
+
+def read_places(path):
+    """yields the places of a csv file with latitude, longitude, country and city columns"""
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            yield row['latitude'], row['longitude'], row['country'], row['city']
+
+
+class GeoIndex:
+    """A read only nearest place index over a file made by build_index.
+
+    The file is memory mapped, so opening it costs nothing and
+    all processes on a machine share the same pages of it.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.size, strings_count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a geocoding index file' % path)
+
+        view = memoryview(self._mmap)
+        start = HEADER.size
+        self._coords = view[start:start + 12 * self.size].cast('f')
+        start += 12 * self.size
+        self._labels = view[start:start + 8 * self.size].cast('I')
+        start += 8 * self.size
+        self._offsets = view[start:start + 4 * (strings_count + 1)].cast('I')
+        self._strings_start = start + 4 * (strings_count + 1)
+
+    def string(self, string_id):
+        start = self._strings_start + self._offsets[string_id]
+        end = self._strings_start + self._offsets[string_id + 1]
+        return self._mmap[start:end].decode('utf-8')
+
+    def nearest(self, latitude, longitude):
+        """returns (country, city, distance in km) of the nearest place
+        to a location or None if the index is empty"""
+        if not self.size:
+            return None
+
+        target = to_cartesian(latitude, longitude)
+        coords = self._coords
+        best_index, best_distance = -1, float('inf')  # squared distance
+
+        stack = [(0, self.size, 0, 0)]  # (lo, hi, depth, squared distance to the range)
+        while stack:
+            lo, hi, depth, bound = stack.pop()
+            if lo >= hi or bound >= best_distance:
+                continue
+            mid = (lo + hi) // 2
+            x, y, z = coords[3 * mid], coords[3 * mid + 1], coords[3 * mid + 2]
+            distance = (x - target[0]) ** 2 + (y - target[1]) ** 2 + (z - target[2]) ** 2
+            if distance < best_distance:
+                best_index, best_distance = mid, distance
+
+            axis = depth % 3
+            diff = target[axis] - coords[3 * mid + axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            # the far side is pushed first so the near side is searched first,
+            # it is skipped when popped if a nearer place was found meanwhile
+            stack.append((far[0], far[1], depth + 1, diff * diff))
+            stack.append((near[0], near[1], depth + 1, bound))
+
+        return (self.string(self._labels[2 * best_index]),
+                self.string(self._labels[2 * best_index + 1]),
+                chord_to_km(math.sqrt(best_distance)))
+
+    def close(self):
+        self._coords.release()
+        self._labels.release()
+        self._offsets.release()
+        self._mmap.close()
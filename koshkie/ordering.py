@@ -0,0 +1,163 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 13:20
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.http import Http404
+
+# the reviews are numbered 1 to n in their parent and the (parent, sort) pairs
+# are unique. the unique constraint is checked after every row on some
+# databases, so shifting a range of sorts by one in one UPDATE can hit the
+# next row before it moves, the range is moved past SORT_OFFSET first then
+# to its new sorts.
+SORT_OFFSET = 1000000  # more than the items any parent has
+
+# the menu items (product groups, option groups, options and add-ons) are
+# kept in their parent by a rank with gaps between the ranks, so moving an
+# item only changes its own rank and deleting one changes nothing else.
+# their sorts (1 to n) are numbered from the ranks of all the items read
+# together, an item that wasn't numbered has no sort.
+RANK_STEP = 1 << 16  # moves into the same gap before the parent is respaced
+
+
+def close_gap(siblings, sort):
+    """shifts the items after a removed sort back by one with two UPDATE queries"""
+    with transaction.atomic():
+        siblings.filter(sort__gt=sort).update(sort=F('sort') + SORT_OFFSET)
+        siblings.filter(sort__gte=SORT_OFFSET).update(sort=F('sort') - SORT_OFFSET - 1)
+
+
+def next_rank(siblings):
+    """returns the rank and the sort of a new item added after all the items of a parent"""
+    last = siblings.aggregate(rank=Max('rank'), count=Count('pk'))
+    return (last['rank'] or 0) + RANK_STEP, last['count'] + 1
+
+
+def at_position(siblings, position):
+    """returns the item at a sort (1 to n) in its parent or None"""
+    if position < 1:
+        return None
+    items = list(siblings.order_by('rank')[position - 1:position])
+    if not items:
+        return None
+    items[0].sort = position
+    return items[0]
+
+
+def get_at_position_or_404(siblings, position):
+    """returns the item at a sort in its parent (taken from the url) or raises Http404"""
+    try:
+        item = at_position(siblings, int(position))
+    except (TypeError, ValueError):
+        item = None
+    if item is None:
+        raise Http404
+    return item
+
+
+def respace(siblings):
+    """sets the ranks of all the items of a parent RANK_STEP apart,
+    keeping their order. the ranks are negated first so the new ranks
+    never hit ranks that aren't changed yet"""
+    model = siblings.model
+    with transaction.atomic():
+        pks = list(siblings.order_by('rank').values_list('pk', flat=True))
+        siblings.update(rank=-F('rank'))
+        model.objects.bulk_update([model(pk=pk, rank=position * RANK_STEP)
+                                   for position, pk in enumerate(pks, 1)], ['rank'])
+
+
+def rank_for(siblings, item, position):
+    """Returns a rank that puts an item at a sort in its parent,
+    between the ranks of the items around that sort.
+
+    The parent is respaced first when there is no rank left
+    between them, that happens after RANK_STEP halvings at most.
+
+    Arguments:
+        siblings: a queryset or related manager of the items of the parent
+        item: the item being moved, it isn't counted in the sorts
+        position: the new sort of the item
+    """
+    others = siblings.exclude(pk=item.pk).order_by('rank')
+    for _ in range(2):
+        if position == 1:
+            before, after = 0, others.values_list('rank', flat=True).first()
+        else:
+            around = list(others.values_list('rank', flat=True)[position - 2:position])
+            before, after = around[0], around[1] if len(around) > 1 else None
+
+        if after is None:
+            return before + RANK_STEP
+        if after - before > 1:
+            return before + (after - before) // 2
+        respace(siblings)
+    raise RuntimeError('no rank left between %d and %d after respacing' % (before, after))
+
+
+def number_siblings(siblings):
+    """sets the sorts of all the items of a parent, already loaded
+    in their order, to their positions without querying the database"""
+    siblings = list(siblings)
+    for position, item in enumerate(siblings, 1):
+        item.sort = position
+    return siblings
+
+
+def number(items):
+    """sets the sorts of any items of the same model that aren't numbered
+    yet with one query for the ranks of all the items in their parents"""
+    items = list(items)
+    unnumbered = [item for item in items if item is not None and getattr(item, '_sort', None) is None]
+    if not unnumbered:
+        return items
+
+    model = type(unnumbered[0])
+    parent_id = model.parent_field + '_id'
+    parents = {getattr(item, parent_id) for item in unnumbered}
+    positions = {}
+    position, last_parent = 0, None
+    for parent, pk in (model.objects.filter(**{parent_id + '__in': parents})
+                       .order_by(parent_id, 'rank').values_list(parent_id, 'pk')):
+        position = position + 1 if parent == last_parent else 1
+        last_parent = parent
+        positions[pk] = position
+
+    for item in unnumbered:
+        item.sort = positions.get(item.pk)
+    return items
+
+
+class Ranked:
+    """A mixin for the models of the items kept in their parent by a sparse
+    rank, the models set parent_field to the name of their parent foreign key"""
+
+    parent_field = None
+
+    def siblings(self):
+        """returns the items of the parent of the item, including it"""
+        parent_id = self.parent_field + '_id'
+        return type(self).objects.filter(**{parent_id: getattr(self, parent_id)})
+
+    @property
+    def sort(self):
+        """the position (1 to n) of the item in its parent, set by number(),
+        number_siblings(), at_position() or when the item is added or moved"""
+        sort = getattr(self, '_sort', None)
+        if sort is None and self.rank is not None:
+            # counting it here would be a query for every item of a list
+            raise RuntimeError('%s %s has no sort, number it with its siblings first'
+                               % (type(self).__name__, self.pk))
+        return sort
+
+    @sort.setter
+    def sort(self, sort):
+        self._sort = sort
+
+    def move_to(self, sort):
+        """gives the item the rank of a new sort, saving it is up to the caller"""
+        self.rank = rank_for(self.siblings(), self, sort)
+        self.sort = sort
+
+    def save(self, *args, **kwargs):
+        if self.rank is None:
+            self.rank, self.sort = next_rank(self.siblings())
+        super(Ranked, self).save(*args, **kwargs)
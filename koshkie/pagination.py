@@ -0,0 +1,127 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 01:10
+import base64
+import json
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination, _positive_int
+
+from koshkie.explain import explain_queryset
+
+
+def approximate_count(queryset):
+    """Returns the number of rows of a queryset estimated by the
+    planner of postgres without counting them, small estimates
+    (under APPROXIMATE_COUNT_MIN) and other databases are counted exactly.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+
+    estimate = explain_queryset(queryset)['Plan Rows']
+    if estimate < settings.APPROXIMATE_COUNT_MIN:
+        return queryset.count()
+    return estimate
+
+
+class KeysetPagination:
+    """Paginates a queryset by the keys of the last item of the
+    previous page instead of an offset, so every page is read from
+    the index the same way however deep it is and nothing is counted.
+
+    The cursor of the next page holds the values of the ordering
+    fields of the last item, the last ordering field must be unique.
+    The count is only added when the request asks for an
+    'exact' or 'approximate' count.
+    """
+
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    count_query_param = 'count'
+
+    def __init__(self, ordering, default_limit=25, max_limit=100):
+        self.ordering = ordering
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+        self.limit = None
+        self.next_cursor = None
+        self.count = None
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(request.query_params[self.limit_query_param],
+                                 strict=True, cutoff=self.max_limit)
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def encode_cursor(self, item):
+        values = [getattr(item, field.lstrip('-')) for field in self.ordering]
+        data = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [model._meta.get_field(field.lstrip('-')).to_python(value)
+                    for field, value in zip(self.ordering, values)]
+        except Exception:
+            raise NotFound('Invalid cursor')
+
+    def after(self, values):
+        """returns a filter of the items after the given ordering values,
+        the first field is bounded on its own too so the index is
+        read from the cursor on instead of being filtered"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = '%s__%s' % (name, 'lt' if field.startswith('-') else 'gt')
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+
+        first = self.ordering[0]
+        bound = '%s__%s' % (first.lstrip('-'), 'lte' if first.startswith('-') else 'gte')
+        return Q(**{bound: values[0]}) & condition
+
+    def paginate_queryset(self, queryset, request):
+        self.limit = self.get_limit(request)
+
+        count = request.query_params.get(self.count_query_param)
+        if count == 'exact':
+            self.count = queryset.count()
+        elif count == 'approximate':
+            self.count = approximate_count(queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor, queryset.model)))
+
+        page = list(queryset[:self.limit + 1])
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+
+def paginate(queryset, request, ordering, default_limit=25, max_limit=100):
+    """Returns a page of a queryset and the pagination fields of the response.
+
+    Requests with a cursor parameter (an empty one for the first page)
+    are paginated by keys in the ordering with 'limit', 'next' and
+    'count' fields, the others still by limit and offset with
+    'limit', 'offset' and 'count' fields.
+    """
+    if KeysetPagination.cursor_query_param in request.query_params:
+        paginator = KeysetPagination(ordering, default_limit, max_limit)
+        page = paginator.paginate_queryset(queryset, request)
+        return page, {'limit': paginator.limit, 'next': paginator.next_cursor, 'count': paginator.count}
+
+    paginator = LimitOffsetPagination()
+    paginator.default_limit = default_limit
+    paginator.max_limit = max_limit
+    page = paginator.paginate_queryset(queryset, request)
+    return page, {'limit': paginator.limit, 'offset': paginator.offset, 'count': paginator.count}
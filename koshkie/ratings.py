@@ -0,0 +1,67 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:10
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.functions import Coalesce, NullIf, Round
+
+# the rated models (shops, products and drivers) store the number of their reviews
+# and the sum of their stars next to the rating, so a review changes them by a
+# difference instead of averaging all the reviews again
+COUNTER_FIELDS = ('reviews_count', 'stars_sum', 'rating')
+
+
+def average_rating(stars_sum, reviews_count):
+    """returns the rating of a rated instance rounded to the one decimal place of
+    its rating field, the same way update_rating rounds it in the database"""
+    return round(stars_sum * 10 / reviews_count) / 10 if reviews_count else 0
+
+
+class Rated:
+    """A mixin for the rated models, saving an instance that is already in the
+    database writes all its fields but the review counters, as a save of an
+    instance read before a review was written would undo that review's change"""
+
+    def save(self, *args, **kwargs):
+        if not (self._state.adding or args or kwargs.get('update_fields') is not None or kwargs.get('force_insert')):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in COUNTER_FIELDS
+                                       and field.attname not in deferred]
+        super(Rated, self).save(*args, **kwargs)
+
+
+def update_rating(instance, count, stars):
+    """Adds count reviews and stars to the review counters of a rated
+    instance and sets its rating to the new average.
+
+    The counters are changed by one UPDATE with expressions of their
+    current values, so reviews written at the same time don't overwrite
+    each other's changes.
+    """
+    new_count = F('reviews_count') + count
+    new_sum = F('stars_sum') + stars
+    type(instance).objects.filter(pk=instance.pk).update(
+        reviews_count=new_count, stars_sum=new_sum,
+        # the expressions use the values before the update in the same statement,
+        # the rating is rounded to one decimal place like average_rating() does
+        rating=Coalesce(Round(new_sum * 10 / NullIf(new_count, Value(0))) / 10, Value(0),
+                        output_field=FloatField()))
+    instance.refresh_from_db(fields=list(COUNTER_FIELDS))
+
+
+def rebuild_counters(model, save=True):
+    """Counts the reviews and sums the stars of every instance of a
+    rated model and returns the instances whose stored counters drifted
+    from them, which are fixed too unless save is False"""
+    drifted = []
+    instances = model.objects.annotate(actual_count=Count('reviews'), actual_sum=Sum('reviews__stars')) \
+        .only('reviews_count', 'stars_sum', 'rating').order_by('pk')
+    for instance in instances.iterator():
+        actual_sum = instance.actual_sum or 0
+        if instance.reviews_count != instance.actual_count or instance.stars_sum != actual_sum:
+            instance.reviews_count = instance.actual_count
+            instance.stars_sum = actual_sum
+            instance.rating = average_rating(actual_sum, instance.actual_count)
+            drifted.append(instance)
+
+    if save:
+        model.objects.bulk_update(drifted, COUNTER_FIELDS, batch_size=500)
+    return drifted
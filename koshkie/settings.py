@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'drivers',
     'users',
@@ -137,3 +138,108 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+
+# Drivers spatial index
+# None keeps the nearby drivers lookups in SQL,
+# 'drivers.spatial.LocalDriverIndex' keeps the index in the memory of each process and
+# 'drivers.spatial.CacheDriverIndex' shares it between processes through DRIVERS_INDEX_CACHE
+
+DRIVERS_INDEX_BACKEND = None
+DRIVERS_INDEX_CACHE = 'default'
+
+
+# Reverse geocoding of addresses
+# the country and city of saved addresses are looked up by background
+# workers, set GEOCODING_ASYNC to False to look them up while saving.
+# GEOCODING_BACKEND may be 'koshkie.geocoding.NominatimGeocoder' or
+# 'koshkie.geocoding.OfflineGeocoder' to look them up in GEOCODING_OFFLINE_INDEX
+
+GEOCODING_BACKEND = 'koshkie.geocoding.NominatimGeocoder'
+GEOCODING_ASYNC = True
+GEOCODING_WORKERS = 2
+GEOCODING_BATCH_SIZE = 20
+GEOCODING_MAX_RETRIES = 3
+GEOCODING_RETRY_DELAY = 1  # seconds, doubled on every retry
+GEOCODING_OFFLINE_INDEX = os.path.join(BASE_DIR, 'geocoding.idx')
+GEOCODING_OFFLINE_MAX_DISTANCE = 50  # km
+
+# results are cached for every GEOCODING_CACHE_GRID degrees (0.005 is ~500 m)
+# square in memory (0 size disables the cache) and in the GEOCODING_CACHE
+# django cache if set, e.g. a DatabaseCache made by `manage.py createcachetable`
+# keeps them between restarts, `manage.py warm_geocoding_cache` prefills it
+
+GEOCODING_CACHE_GRID = 0.005
+GEOCODING_CACHE_SIZE = 10000
+GEOCODING_CACHE = None
+
+
+# Orders dispatching
+# orders made while no driver is available near them wait for one,
+# `manage.py run_dispatcher` assigns them in batches of DISPATCH_BATCH_SIZE
+# every DISPATCH_INTERVAL seconds.
+# with the 'greedy' DISPATCH_MATCHING new orders take the nearest driver right away,
+# with 'batch' all new orders wait for the next batch which gives them the
+# drivers with the lowest total pickup distance
+
+DISPATCH_MATCHING = 'greedy'
+DISPATCH_BATCH_SIZE = 50
+DISPATCH_INTERVAL = 2  # seconds
+
+
+# Shops menus cache
+# the serialized menus of the shops are kept in the MENU_CACHE django cache
+# (None disables it) and rebuilt after any change to their products,
+# the ratings and best selling products are at most MENU_CACHE_TIMEOUT old
+
+MENU_CACHE = None
+MENU_CACHE_TIMEOUT = 300  # seconds
+
+
+# Nearby shops lists cache
+# the lists of the open shops near the users are kept in the SHOPS_LIST_CACHE
+# django cache (None disables it), one for every SHOPS_LIST_CACHE_CELL degrees
+# square of the map, and rebuilt after any change to a shop, its address or its
+# tags or when any shop opens or closes, the ratings and offers of the shops
+# are at most SHOPS_LIST_CACHE_TIMEOUT old. the shops open and close in the
+# tick_open_shops command, so the cache has to be shared with it
+
+SHOPS_LIST_CACHE = None
+SHOPS_LIST_CACHE_CELL = 0.002  # degrees, about 220 meters
+SHOPS_LIST_CACHE_TIMEOUT = 60  # seconds
+
+
+# Shops routes cache
+# the shop and product slugs in the urls are resolved to their ids and the
+# account that owns the shop through an in-process LRU of ROUTES_CACHE_SIZE
+# routes and the ROUTES_CACHE django cache (None disables both), which has to
+# be shared by the processes as changing or deleting a slug is only seen
+# through the version of the routes kept in it
+
+ROUTES_CACHE = None
+ROUTES_CACHE_SIZE = 10000
+
+
+# Pagination
+# lists requested with a cursor are paginated by keys instead of offsets,
+# their count is only given when asked for, an 'approximate' count is the
+# estimate of the postgres planner unless it's under APPROXIMATE_COUNT_MIN
+
+APPROXIMATE_COUNT_MIN = 10000
+
+
+# Shops search
+# 'shops.search.PostgresShopSearch' searches the shops with the trigram indexes
+# of postgres, 'shops.search.LocalShopSearch' with an index kept in the memory
+# of each process, None picks the postgres one if the database has pg_trgm
+# and warns that it falls back to the local one if it hasn't
+
+SHOPS_SEARCH_BACKEND = None
+
+
+# Products search
+# 'shops.search.PostgresProductSearch' searches the products with the full text
+# search of postgres, 'shops.search.LocalProductSearch' with an index kept in the
+# memory of each process, None picks the postgres one on postgres
+
+PRODUCTS_SEARCH_BACKEND = None
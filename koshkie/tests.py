@@ -0,0 +1,476 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 16:30
+import os
+import random
+import tempfile
+import time
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from geopy.exc import GeocoderTimedOut
+
+from drivers.models import DriverProfileModel
+from drivers.spatial import free_drivers, available_drivers
+from koshkie import bounding_box, haversine, nearby
+from koshkie.caching import VersionedCache, settings_singleton
+from koshkie.distance import distances_from, distance_matrix
+from koshkie.explain import SEQUENTIAL_SCAN, explain, explain_queryset, table_scans
+from koshkie.geoindex import GeoIndex
+from koshkie.geocoding import (GeocodingQueue, GeocodingJob, StubGeocoder, GeocodeCache, OfflineGeocoder,
+                               get_geocoding_queue, get_geocode_cache)
+from orders.models import OrderModel
+from shops.management.commands.benchmark_shop_search import (Command as ShopSearchCommand, CENTER_LATITUDE,
+                                                              CENTER_LONGITUDE)
+from shops.models import ShopProfileModel, ShopAddressModel, ProductModel, ShopReviewModel, ProductReviewModel
+from users.models import UserProfileModel, UserAddressModel
+
+
+class TestGeoQueries(TestCase):
+    """Unittest for the geo query helpers"""
+
+    def test_bounding_box_contains_circle(self):
+        """test that every point on the circle is inside its bounding box"""
+
+        for latitude, longitude in ((30, 31), (-60, 10), (0, 179.99)):
+            min_latitude, max_latitude, min_longitude, max_longitude = bounding_box(latitude, longitude, 2.5)
+            for point_latitude, point_longitude in ((latitude + 0.0224, longitude),
+                                                    (latitude - 0.0224, longitude)):
+                self.assertTrue(min_latitude <= point_latitude <= max_latitude)
+
+            # walks east till the edge of the circle
+            step = 0.0001
+            point_longitude = longitude
+            while haversine(latitude, longitude, latitude, point_longitude + step) <= 2.5:
+                point_longitude += step
+            self.assertTrue(min_longitude <= point_longitude <= max_longitude)
+
+        # the circle contains the pole
+        self.assertEqual(bounding_box(89.99, 0, 2.5)[2:], (-180, 180))
+
+    def test_nearby(self):
+        """test for filtering a queryset by distance"""
+
+        for i, (latitude, longitude) in enumerate(((30, 30.02), (30, 30), (30, 30.1), (0, 179.999),
+                                                  (0, -179.999))):
+            account = User.objects.create(username='driver%d' % i, password='password')
+            DriverProfileModel.objects.create(account=account, phone_number=123,
+                                              profile_photo='/drivers/tests/sample.jpg',
+                                              live_location_latitude=latitude,
+                                              live_location_longitude=longitude)
+
+        drivers = nearby(DriverProfileModel.objects.all(), 30, 30, 2.5,
+                         'live_location_latitude', 'live_location_longitude')
+        self.assertEqual([driver.account.username for driver in drivers], ['driver1', 'driver0'])
+
+        # across the date line
+        drivers = nearby(DriverProfileModel.objects.all(), 0, 179.9999, 2.5,
+                         'live_location_latitude', 'live_location_longitude')
+        self.assertEqual([driver.account.username for driver in drivers], ['driver3', 'driver4'])
+
+
+class TestDistances(TestCase):
+    """Unittest for the vectorized distances"""
+
+    def setUp(self):
+        """setup for unittest"""
+        random.seed(0)
+        self.locations = [(30, 30), (30, 30.02), (0, 179.999), (0, -179.999), (89.9, 10), (-45, -120)]
+        self.locations += [(random.uniform(-90, 90), random.uniform(-180, 180)) for _ in range(100)]
+
+    def test_distances_from(self):
+        """test that the distances match koshkie.haversine"""
+        latitudes, longitudes = zip(*self.locations)
+        for latitude, longitude in self.locations[:10]:
+            distances = distances_from(latitude, longitude, latitudes, longitudes)
+            for distance, (other_latitude, other_longitude) in zip(distances, self.locations):
+                self.assertAlmostEqual(distance, haversine(latitude, longitude,
+                                                           other_latitude, other_longitude), places=6)
+
+    def test_distance_matrix(self):
+        """test that every cell is the distance between its row and column locations"""
+        latitudes, longitudes = zip(*self.locations)
+        matrix = distance_matrix(latitudes[:10], longitudes[:10], latitudes, longitudes)
+        self.assertEqual(matrix.shape, (10, len(self.locations)))
+        for row, (latitude, longitude) in enumerate(self.locations[:10]):
+            self.assertEqual(matrix[row].tolist(), distances_from(latitude, longitude,
+                                                                  latitudes, longitudes).tolist())
+
+    def test_empty(self):
+        """test that no locations give no distances"""
+        self.assertEqual(distances_from(30, 30, [], []).shape, (0,))
+        self.assertEqual(distance_matrix([30], [30], [], []).shape, (1, 0))
+
+
+class FlakyGeocoder(StubGeocoder):
+    """stub geocoder timing out a number of times before answering"""
+
+    def __init__(self, timeouts):
+        super(FlakyGeocoder, self).__init__()
+        self.timeouts = timeouts
+        self.calls = 0
+
+    def reverse(self, latitude, longitude):
+        self.calls += 1
+        if self.calls <= self.timeouts:
+            raise GeocoderTimedOut()
+        return super(FlakyGeocoder, self).reverse(latitude, longitude)
+
+
+@override_settings(GEOCODING_BACKEND='koshkie.geocoding.StubGeocoder', GEOCODING_RETRY_DELAY=0)
+class TestGeocoding(TestCase):
+    """Unittest for the reverse geocoding of addresses"""
+
+    def setUp(self):
+        account = User.objects.create(username='username', password='password')
+        self.user = UserProfileModel.objects.create(account=account, phone_number=123)
+
+    def create_address(self, **kwargs):
+        return UserAddressModel.objects.create(user=self.user, title='home', area='area', type='H',
+                                               street='street', building='building',
+                                               location_latitude=30, location_longitude=31, **kwargs)
+
+    def test_saving_does_not_wait(self):
+        """test that the address is saved before it is geocoded"""
+        address = self.create_address()
+        address.refresh_from_db()
+        self.assertEqual(address.country, '')  # queued after the transaction commits
+
+    @override_settings(GEOCODING_ASYNC=False)
+    def test_sync_geocoding(self):
+        """test geocoding while saving"""
+        address = self.create_address()
+        address.refresh_from_db()
+        self.assertEqual((address.country, address.city), ('Egypt', 'Cairo'))
+
+    @override_settings(GEOCODING_ASYNC=False)
+    def test_geocoded_on_location_change(self):
+        """test that the address is only geocoded again when its location changes"""
+        address = self.create_address()
+        UserAddressModel.objects.update(country='', city='')
+
+        address = UserAddressModel.objects.get(pk=address.pk)
+        address.title = 'work'
+        address.location_latitude = '30.000000'
+        address.save()
+        address.refresh_from_db()
+        self.assertEqual(address.country, '')
+
+        address.location_longitude = 31.5
+        address.save()
+        address.refresh_from_db()
+        self.assertEqual(address.country, 'Egypt')
+
+    def test_batch(self):
+        """test that a batch looks up every location once and fills all addresses"""
+        addresses = [self.create_address() for _ in range(3)]
+        geocoder = FlakyGeocoder(timeouts=0)
+        geocoding_queue = GeocodingQueue(geocoder)
+        failed = geocoding_queue.process([GeocodingJob('users.UserAddressModel', address.pk, 30, 31, 0)
+                                          for address in addresses])
+
+        self.assertEqual(failed, [])
+        self.assertEqual(geocoder.calls, 1)
+        self.assertEqual(UserAddressModel.objects.filter(country='Egypt', city='Cairo').count(), 3)
+        self.assertEqual(geocoding_queue.stats()['lookups'], 1)
+
+    def test_bounded_retries(self):
+        """test that timed out lookups are retried a limited number of times"""
+        address = self.create_address()
+        job = GeocodingJob('users.UserAddressModel', address.pk, 30, 31, 0)
+
+        # succeeds on the last retry
+        geocoding_queue = GeocodingQueue(FlakyGeocoder(timeouts=3), max_retries=3, retry_delay=0)
+        geocoding_queue.run(job)
+        address.refresh_from_db()
+        self.assertEqual(address.country, 'Egypt')
+        self.assertEqual(geocoding_queue.stats()['retries'], 3)
+
+        # gives up
+        UserAddressModel.objects.update(country='')
+        geocoding_queue = GeocodingQueue(FlakyGeocoder(timeouts=10), max_retries=3, retry_delay=0)
+        geocoding_queue.run(job)
+        address.refresh_from_db()
+        self.assertEqual(address.country, '')
+        self.assertEqual(geocoding_queue.stats()['failures'], 1)
+
+    def test_worker_survives_errors(self):
+        """test that a batch failing with an error is retried and the worker keeps running"""
+        batches = []
+
+        class BrokenQueue(GeocodingQueue):
+            def process(self, batch):
+                batches.append(batch)
+                if len(batches) == 1:
+                    raise DatabaseError('the connection was lost')
+                return []
+
+        geocoding_queue = BrokenQueue(StubGeocoder(), workers=1, retry_delay=0)
+        with self.assertLogs('koshkie.geocoding', 'ERROR'):
+            geocoding_queue.put(GeocodingJob('users.UserAddressModel', 1, 30, 31, 0))
+            deadline = time.monotonic() + 5
+            while len(batches) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual([job.attempts for batch in batches for job in batch], [0, 1])
+        self.assertEqual(geocoding_queue.stats()['retries'], 1)
+
+    def test_configured_queue(self):
+        """test that the queue follows the settings"""
+        self.assertIsInstance(get_geocoding_queue().geocoder, StubGeocoder)
+
+
+class TestVersionedCache(TestCase):
+    """Unittest for the versions of the versioned caches"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_versions(self):
+        """test that bumping a version only makes the entries of its scope stale"""
+        versioned_cache = VersionedCache()
+        versioned_cache.key_prefix = 'test'
+        version = versioned_cache.version()
+        self.assertEqual(versioned_cache.version(), version)
+
+        scope_version = versioned_cache.version('scope')
+        versioned_cache.bump('scope')
+        self.assertEqual(versioned_cache.version('scope'), scope_version + 1)
+        self.assertEqual(versioned_cache.version(), version)
+
+        self.assertEqual(versioned_cache.get_or_build('key', lambda value: value, 1), 1)
+        self.assertEqual(versioned_cache.get_or_build('key', lambda value: value, 2), 1)
+        self.assertEqual(versioned_cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_settings_singleton(self):
+        """test that the object is built once until its settings change"""
+        built = []
+
+        @settings_singleton('TEST_OBJECT')
+        def get_object():
+            built.append(object())
+            return built[-1]
+
+        self.assertIs(get_object(), get_object())
+        with override_settings(TEST_OBJECT_SIZE=1):
+            self.assertIsNot(get_object(), built[0])
+        self.assertEqual(len(built), 2)
+
+
+class TestGeocodeCache(TestCase):
+    """Unittest for the reverse geocoding results cache"""
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_grid(self):
+        """test that locations in the same cell share the result"""
+        geocode_cache = GeocodeCache(grid=0.005)
+        geocode_cache.set(30.0001, 31.0001, ('Egypt', 'Cairo'))
+
+        self.assertEqual(geocode_cache.get(30.0049, 31.0049), ('Egypt', 'Cairo'))
+        self.assertIsNone(geocode_cache.get(30.0051, 31.0001))
+        self.assertEqual(geocode_cache.stats(), {'cache_hits': 1, 'cache_misses': 1, 'cache_size': 1})
+
+    def test_lru(self):
+        """test that the least recently used cells are dropped first"""
+        geocode_cache = GeocodeCache(grid=1, max_size=2)
+        geocode_cache.set(1, 1, ('A', 'a'))
+        geocode_cache.set(2, 2, ('B', 'b'))
+        geocode_cache.get(1, 1)
+        geocode_cache.set(3, 3, ('C', 'c'))
+
+        self.assertEqual(geocode_cache.get(1, 1), ('A', 'a'))
+        self.assertIsNone(geocode_cache.get(2, 2))
+        self.assertEqual(geocode_cache.get(3, 3), ('C', 'c'))
+
+    def test_persistent_cache(self):
+        """test that results are found in the django cache by other processes"""
+        GeocodeCache(cache_alias='default').set(30, 31, ('Egypt', 'Cairo'))
+        self.assertEqual(GeocodeCache(cache_alias='default').get(30, 31), ('Egypt', 'Cairo'))
+
+    def test_queue_uses_cache(self):
+        """test that a cached location isn't sent to the geocoder"""
+        geocoder = FlakyGeocoder(timeouts=0)
+        geocoding_queue = GeocodingQueue(geocoder, cache=GeocodeCache())
+
+        for latitude in (30, 30.001, 30.002):
+            self.assertEqual(geocoding_queue.lookup(latitude, 31), ('Egypt', 'Cairo'))
+        self.assertEqual(geocoder.calls, 1)
+        self.assertEqual(geocoding_queue.stats()['cache_hits'], 2)
+
+    @override_settings(GEOCODING_CACHE='default')
+    def test_warmup(self):
+        """test prefilling the cache from geocoded addresses"""
+        account = User.objects.create(username='username', password='password')
+        user = UserProfileModel.objects.create(account=account, phone_number=123)
+        UserAddressModel.objects.create(user=user, title='home', area='area', type='H',
+                                        street='street', building='building', country='Egypt',
+                                        city='Giza', location_latitude=30, location_longitude=31)
+        call_command('warm_geocoding_cache', stdout=StringIO())
+
+        self.assertEqual(GeocodeCache(cache_alias='default').get(30, 31), ('Egypt', 'Giza'))
+        self.assertIsNotNone(get_geocode_cache())
+
+    def test_warmup_needs_persistent_cache(self):
+        """test that warming up only the in-process cache fails"""
+        with self.assertRaises(CommandError):
+            call_command('warm_geocoding_cache', stdout=StringIO())
+
+
+class TestOfflineGeocoder(TestCase):
+    """Unittest for the offline reverse geocoding index"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.source = os.path.join(directory, 'places.csv')
+        self.index = os.path.join(directory, 'geocoding.idx')
+        with open(self.source, 'w', encoding='utf-8') as file:
+            file.write('latitude,longitude,country,city\n'
+                       '30.0444,31.2357,Egypt,Cairo\n'
+                       '31.2001,29.9187,Egypt,Alexandria\n'
+                       '51.5074,-0.1278,United Kingdom,London\n'
+                       '-33.8688,151.2093,Australia,Sydney\n'
+                       '64.1466,-21.9426,Iceland,Reykjavík\n')
+        call_command('build_geocoding_index', self.source, output=self.index, stdout=StringIO())
+
+    def test_nearest_place(self):
+        """test resolving locations to the nearest place"""
+        geocoder = OfflineGeocoder(self.index, max_distance=50)
+
+        self.assertEqual(geocoder.reverse(30.06, 31.22), ('Egypt', 'Cairo'))
+        self.assertEqual(geocoder.reverse(31.1, 29.8), ('Egypt', 'Alexandria'))
+        self.assertEqual(geocoder.reverse(64.1, -21.9), ('Iceland', 'Reykjavík'))
+        self.assertEqual(geocoder.reverse(0, 0), ('', ''))  # in the ocean
+
+    def test_matches_brute_force(self):
+        """test that the k-d tree search finds the same place as checking all places"""
+        random.seed(0)
+        places = [(random.uniform(-90, 90), random.uniform(-180, 180), 'country', str(i)) for i in range(500)]
+        with open(self.source, 'w', encoding='utf-8') as file:
+            file.write('latitude,longitude,country,city\n')
+            file.writelines('%s,%s,%s,%s\n' % place for place in places)
+        call_command('build_geocoding_index', self.source, output=self.index, stdout=StringIO())
+
+        index = GeoIndex(self.index)
+        for _ in range(100):
+            latitude, longitude = random.uniform(-90, 90), random.uniform(-180, 180)
+            nearest = min(places, key=lambda place: haversine(latitude, longitude, place[0], place[1]))
+            self.assertEqual(index.nearest(latitude, longitude)[1], nearest[3])
+        index.close()
+
+    def test_invalid_file(self):
+        """test that other files are rejected"""
+        with self.assertRaises(ValueError):
+            GeoIndex(self.source)
+
+    def test_selected_in_settings(self):
+        """test using the offline geocoder as the geocoding backend"""
+        with override_settings(GEOCODING_BACKEND='koshkie.geocoding.OfflineGeocoder',
+                               GEOCODING_OFFLINE_INDEX=self.index):
+            self.assertEqual(get_geocoding_queue().lookup(51.5, -0.12), ('United Kingdom', 'London'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'the plans are made by postgres')
+class TestHotQueryPlans(TestCase):
+    """Unittest for the indexes the hot queries of the views are read with,
+    on a dataset big enough for postgres to prefer them to reading the tables"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """seeds the shops, products, reviews, drivers and orders"""
+        generator = random.Random(0)
+        ShopSearchCommand.seed(500)
+        shops = list(ShopProfileModel.objects.filter(slug__startswith='benchmark-').order_by('pk'))
+        cls.shop = shops[0]
+        # only a tenth of the shops stay near the center
+        ShopAddressModel.objects.exclude(shop__in=shops[:50]).update(location_latitude=F('location_latitude') + 1)
+
+        ProductModel.objects.bulk_create([
+            ProductModel(shop=shop, photo='product.jpg', title='product', slug='product-%d' % i, price=10,
+                         description='text', is_offer=generator.random() < 0.05,
+                         is_available=generator.random() < 0.9,
+                         num_sold=0 if generator.random() < 0.3 else generator.randint(1, 100))
+            for shop in shops for i in range(40)], batch_size=1000)
+        cls.product = ProductModel.objects.filter(shop=cls.shop).first()
+
+        users = UserProfileModel.objects.bulk_create([
+            UserProfileModel(account=account, phone_number=123) for account in
+            User.objects.bulk_create([User(username='user-%d' % i) for i in range(100)])])
+        drivers = DriverProfileModel.objects.bulk_create([
+            DriverProfileModel(account=account, profile_photo='driver.jpg', phone_number=123,
+                               is_active=True, is_available=generator.random() < 0.2,
+                               is_busy=generator.random() < 0.5, last_time_online=timezone.now(),
+                               live_location_latitude=CENTER_LATITUDE + generator.uniform(-0.5, 0.5),
+                               live_location_longitude=CENTER_LONGITUDE + generator.uniform(-0.5, 0.5))
+            for account in User.objects.bulk_create([User(username='driver-%d' % i) for i in range(2000)])])
+        cls.user, cls.driver = users[0], drivers[0]
+
+        ShopReviewModel.objects.bulk_create([ShopReviewModel(user=generator.choice(users), shop=shop, sort=sort,
+                                                             stars=5, text='text')
+                                             for shop in shops for sort in range(1, 21)], batch_size=1000)
+        ProductReviewModel.objects.bulk_create([
+            ProductReviewModel(user=generator.choice(users), product=product, sort=sort, stars=5, text='text')
+            for product in ProductModel.objects.order_by('pk')[:2000] for sort in range(1, 6)], batch_size=1000)
+        OrderModel.objects.bulk_create([
+            OrderModel(user=generator.choice(users), driver=generator.choice(drivers[:200] + [None]),
+                       status=generator.choice('CPDD'), final_price=10, subtotal=10, delivery_fee=0, vat=0)
+            for _ in range(20000)], batch_size=1000)
+
+        with connection.cursor() as cursor:
+            for model in (ShopProfileModel, ShopAddressModel, ProductModel, ShopReviewModel, ProductReviewModel,
+                          DriverProfileModel, OrderModel):
+                cursor.execute('ANALYZE %s' % model._meta.db_table)
+
+    def assertNoTableScans(self, plans, tables):
+        """asserts that all the tables are read by some of the plans, and never whole"""
+        read = set()
+        for plan in plans:
+            for table, scans in table_scans(plan).items():
+                read.add(table)
+                if table in tables:
+                    self.assertNotIn(SEQUENTIAL_SCAN, scans, msg='%s is read whole' % table)
+        self.assertEqual(set(tables) - read, set())
+
+    def assertNoTableScansIn(self, url, tables):
+        """asserts that the queries of a request never read any of the tables whole"""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertNoTableScans([explain(query['sql']) for query in queries
+                                 if query['sql'].startswith('SELECT')], tables)
+
+    def test_shops_list(self):
+        """test the nearby shops with their offers"""
+        self.assertNoTableScansIn('/shops/?latitude=%s&longitude=%s' % (CENTER_LATITUDE, CENTER_LONGITUDE),
+                                  ['shops_shopaddressmodel', 'shops_productmodel'])
+
+    def test_menu(self):
+        """test the offers and the best selling products of a shop"""
+        self.assertNoTableScansIn('/shops/%s/products/' % self.shop.slug, ['shops_productmodel'])
+
+    def test_reviews(self):
+        """test the reviews of a shop and of a product"""
+        self.assertNoTableScansIn('/shops/%s/reviews/' % self.shop.slug, ['shops_shopreviewmodel'])
+        self.assertNoTableScansIn('/shops/%s/products/%s/reviews/' % (self.shop.slug, self.product.slug),
+                                  ['shops_productmodel', 'shops_productreviewmodel'])
+
+    def test_orders(self):
+        """test the pages of the orders of a user and of a driver"""
+        for account in (self.user.account, self.driver.account):
+            self.client.force_login(account)
+            self.assertNoTableScansIn('/orders/', ['orders_ordermodel'])
+            self.assertNoTableScansIn('/orders/?cursor=', ['orders_ordermodel'])
+
+    def test_dispatch(self):
+        """test the orders waiting for a driver and the free drivers"""
+        plans = [explain_queryset(OrderModel.objects.filter(driver=None, status='C').order_by('ordered_at')[:50]),
+                 explain_queryset(free_drivers()),
+                 explain_queryset(available_drivers(CENTER_LATITUDE, CENTER_LONGITUDE))]
+        self.assertNoTableScans(plans, ['orders_ordermodel', 'drivers_driverprofilemodel'])
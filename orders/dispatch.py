@@ -0,0 +1,190 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 20:40
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from drivers.spatial import available_drivers, free_drivers, get_driver_index
+from koshkie import nearby, bounding_box
+from koshkie.caching import settings_singleton
+from orders.matching import match
+from orders.models import OrderModel
+
+MAX_CANDIDATES = 10  # nearest drivers tried before giving up
+
+
+def claim(driver):
+    """marks a driver as busy if they are free (online, active, available
+    and not busy) right now, returns whether they were claimed"""
+    if not free_drivers().filter(pk=driver.pk).update(is_busy=True):
+        return False
+
+    driver.is_busy = True
+    # update() doesn't send post_save, so the index is updated here
+    # once the claim is committed, like the drivers receivers do
+    index = get_driver_index()
+    if index is not None:
+        driver_id = driver.pk
+        transaction.on_commit(lambda: index.remove(driver_id))
+    return True
+
+
+def claim_driver(latitude, longitude, radius=2.5):
+    """Marks the nearest available driver to a location as busy
+    and returns them, or None if there is no driver to claim.
+
+    The driver is claimed with an update that only matches them while
+    they are not busy, so when two orders race for the same driver the
+    database lets only one of them through and the other one moves on
+    to the next nearest driver.
+    """
+
+    for driver in available_drivers(latitude, longitude, radius)[:MAX_CANDIDATES]:
+        if claim(driver):
+            return driver
+    return None
+
+
+class DispatchMetrics:
+    """Counters of the orders assigned by the dispatcher"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.assigned = 0
+        self.total_wait = 0
+        self.max_wait = 0
+
+    def add_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    def add_assigned(self, wait):
+        with self._lock:
+            self.assigned += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self):
+        with self._lock:
+            return {'batches': self.batches, 'assigned': self.assigned,
+                    'average_time_to_assign': self.total_wait / self.assigned if self.assigned else 0,
+                    'max_time_to_assign': self.max_wait}
+
+
+class Dispatcher:
+    """Assigns drivers to the orders that were accepted while
+    there was no driver available near them.
+
+    The pending orders are the confirmed orders without a driver,
+    they are matched oldest first in batches of batch_size by the
+    `manage.py run_dispatcher` loop, and a driver who delivers an order
+    is given the oldest pending order near them right away.
+
+    With the 'greedy' matching every order in a batch takes the nearest
+    free driver in turn, with the 'batch' matching the drivers are given
+    to the whole batch at once with the lowest total pickup distance.
+    """
+
+    def __init__(self, batch_size=50, radius=2.5, matching='greedy'):
+        self.batch_size = batch_size
+        self.radius = radius
+        self.matching = matching
+        self.metrics = DispatchMetrics()
+
+    @staticmethod
+    def pending_orders():
+        """returns the orders waiting for a driver oldest first, locked for the current
+        transaction and skipping orders locked by other dispatchers where supported"""
+        orders = OrderModel.objects.filter(driver=None, status='C').order_by('ordered_at')
+        if connection.features.has_select_for_update_skip_locked:
+            orders = orders.select_for_update(skip_locked=True, of=('self',))
+        return orders
+
+    def assign(self, order, driver):
+        order.driver = driver
+        order.assigned_at = timezone.now()
+        self.metrics.add_assigned((order.assigned_at - order.ordered_at).total_seconds())
+
+    def dispatch(self):
+        """assigns drivers to a batch of pending orders, returns the number of assigned orders"""
+        with transaction.atomic():
+            orders = list(self.pending_orders().select_related('shipping_address')[:self.batch_size])
+            if self.matching == 'batch':
+                assigned = self.match_batch(orders)
+            else:
+                assigned = self.match_greedy(orders)
+
+            OrderModel.objects.bulk_update(assigned, ['driver', 'assigned_at'])
+        self.metrics.add_batch()
+        return len(assigned)
+
+    def match_greedy(self, orders):
+        """gives every order the nearest free driver, returns the assigned orders"""
+        assigned = []
+        for order in orders:
+            address = order.shipping_address
+            driver = claim_driver(float(address.location_latitude), float(address.location_longitude),
+                                  self.radius)
+            if driver is not None:
+                self.assign(order, driver)
+                assigned.append(order)
+        return assigned
+
+    def match_batch(self, orders):
+        """gives the orders the drivers with the lowest total
+        pickup distance, returns the assigned orders"""
+        if not orders:
+            return []
+
+        locations = [(float(order.shipping_address.location_latitude),
+                      float(order.shipping_address.location_longitude)) for order in orders]
+
+        # the free drivers inside the box containing the search box of every order
+        boxes = [bounding_box(latitude, longitude, self.radius) for latitude, longitude in locations]
+        drivers = free_drivers().filter(live_location_latitude__gte=min(box[0] for box in boxes),
+                                        live_location_latitude__lte=max(box[1] for box in boxes))
+        min_longitude, max_longitude = min(box[2] for box in boxes), max(box[3] for box in boxes)
+        if min_longitude >= -180 and max_longitude <= 180:  # not crossing the date line
+            drivers = drivers.filter(live_location_longitude__gte=min_longitude,
+                                     live_location_longitude__lte=max_longitude)
+        drivers = list(drivers)
+
+        assigned = []
+        for order_index, driver_index in match(locations, [(driver.live_location_latitude,
+                                                            driver.live_location_longitude)
+                                                           for driver in drivers], self.radius):
+            # a driver taken by another order since being loaded is skipped,
+            # that order waits for the next batch
+            if claim(drivers[driver_index]):
+                self.assign(orders[order_index], drivers[driver_index])
+                assigned.append(orders[order_index])
+        return assigned
+
+    def assign_to(self, driver):
+        """gives the oldest pending order near a driver who
+        just became free to them, returns the order or None"""
+        with transaction.atomic():
+            order = nearby(self.pending_orders(), driver.live_location_latitude,
+                           driver.live_location_longitude, self.radius,
+                           'shipping_address__location_latitude',
+                           'shipping_address__location_longitude').order_by('ordered_at').first()
+
+            if order is None or not claim(driver):
+                return None
+            self.assign(order, driver)
+            order.save(update_fields=['driver', 'assigned_at'])
+        return order
+
+    def stats(self):
+        """returns the assignment metrics and the number of orders waiting for a driver"""
+        stats = self.metrics.as_dict()
+        stats['queue_length'] = OrderModel.objects.filter(driver=None, status='C').count()
+        return stats
+
+
+@settings_singleton('DISPATCH_')
+def get_dispatcher():
+    """Returns the dispatcher configured in the DISPATCH settings"""
+    return Dispatcher(batch_size=settings.DISPATCH_BATCH_SIZE, matching=settings.DISPATCH_MATCHING)
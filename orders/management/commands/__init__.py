@@ -0,0 +1 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 20:10
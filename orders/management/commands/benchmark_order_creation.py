@@ -0,0 +1,97 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 20:10
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from drivers.models import DriverProfileModel
+from orders.serializers import OrderDetailSerializer
+from shops.models import (ShopProfileModel, ShopAddressModel, ProductModel, AddOnModel,
+                          OptionGroupModel, OptionModel)
+
+
+class Command(BaseCommand):
+    """Django command to measure the queries and time
+    taken to validate and create orders of different sizes.
+
+    The shop, products and orders are created inside
+    a transaction that is rolled back at the end.
+    """
+
+    help = 'Benchmarks validating and creating orders with many items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1, 10, 50],
+                            help='numbers of items in the orders')
+        parser.add_argument('--runs', type=int, default=10,
+                            help='number of orders created for every size')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        self.stdout.write('%10s %15s %15s %15s %15s' % ('items', 'validate (q)', 'create (q)',
+                                                        'validate (ms)', 'create (ms)'))
+        with transaction.atomic():
+            items = self.seed(max(options['sizes']))
+            for size in options['sizes']:
+                results = [self.create_order(items[:size]) for _ in range(options['runs'])]
+                self.stdout.write('%10d %15d %15d %15.3f %15.3f' % (
+                    size, results[-1][0], results[-1][1],
+                    sum(result[2] for result in results) / len(results) * 1000,
+                    sum(result[3] for result in results) / len(results) * 1000))
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def seed(size):
+        """creates a shop with size products and returns an order item for each"""
+        now = timezone.now()
+        shop = ShopProfileModel.objects.create(account=User.objects.create(username='benchmark-shop'),
+                                               profile_photo='benchmark.jpg', cover_photo='benchmark.jpg',
+                                               phone_number=123, description='text', shop_type='F',
+                                               name='benchmark shop', currency='$', delivery_fee=5,
+                                               opens_at=(now - timezone.timedelta(hours=1)).time(),
+                                               closes_at=(now + timezone.timedelta(hours=1)).time(),
+                                               time_to_prepare=20, vat=14, is_active=True)
+        ShopAddressModel.objects.create(shop=shop, area='area', street='street', building='building',
+                                        location_longitude=31.2357, location_latitude=30.0444)
+        DriverProfileModel.objects.create(account=User.objects.create(username='benchmark-driver'),
+                                          phone_number=123, profile_photo='benchmark.jpg',
+                                          is_active=True, is_available=True,
+                                          last_time_online=now + timezone.timedelta(minutes=30),
+                                          live_location_longitude=31.2357, live_location_latitude=30.0444)
+
+        items = []
+        for i in range(size):
+            product = ProductModel.objects.create(shop=shop, photo='benchmark.jpg', title='product %d' % i,
+                                                  price=10, description='text')
+            add_on = AddOnModel.objects.create(product=product, title='add-on', added_price=2)
+            option_group = OptionGroupModel.objects.create(product=product, title='size', changes_price=True)
+            option = OptionModel.objects.create(option_group=option_group, title='large', price=15)
+            items.append({'product': product.pk, 'quantity': 2, 'add_ons_sorts': [add_on.sort],
+                          'choices': [{'option_group_id': option_group.sort,
+                                       'choosed_option_id': option.sort}]})
+        return items
+
+    @staticmethod
+    def create_order(items):
+        """returns the queries and time taken to validate and create an order"""
+        DriverProfileModel.objects.filter(account__username='benchmark-driver').update(is_busy=False)
+        serializer = OrderDetailSerializer(data={'items': items,
+                                                 'shipping_address': {'area': 'area', 'type': 'A',
+                                                                      'street': 'street',
+                                                                      'building': 'building',
+                                                                      'location_longitude': 31.2357,
+                                                                      'location_latitude': 30.0444}})
+        with CaptureQueriesContext(connection) as validate_queries:
+            start = time.perf_counter()
+            serializer.is_valid(raise_exception=True)
+            validate_time = time.perf_counter() - start
+
+        with CaptureQueriesContext(connection) as create_queries:
+            start = time.perf_counter()
+            serializer.save()
+            create_time = time.perf_counter() - start
+
+        return len(validate_queries), len(create_queries), validate_time, create_time
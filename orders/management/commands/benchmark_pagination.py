@@ -0,0 +1,97 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 01:10
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from koshkie.pagination import KeysetPagination, approximate_count, paginate
+from orders.models import OrderModel
+from users.models import UserProfileModel
+
+ORDERING = ('-ordered_at', '-id')  # the ordering of the orders list
+BATCH_SIZE = 1000  # orders made in the same minute
+
+
+class Command(BaseCommand):
+    """Django command to compare the latency of the pages of a user's
+    orders list paginated by offset and by keys as the pages get deeper.
+
+    The user and the orders are created inside
+    a transaction that is rolled back at the end.
+    """
+
+    help = 'Benchmarks offset and keyset pagination of the orders list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000000)
+        parser.add_argument('--limit', type=int, default=15)
+        parser.add_argument('--pages', nargs='+', type=int, default=[1, 100, 1000, 10000, 60000])
+        parser.add_argument('--runs', type=int, default=5,
+                            help='number of times every page is read')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        factory = APIRequestFactory()
+        limit = options['limit']
+
+        with transaction.atomic():
+            queryset = self.seed(options['orders'])
+
+            start = time.perf_counter()
+            count = queryset.count()
+            exact = time.perf_counter() - start
+            start = time.perf_counter()
+            estimate = approximate_count(queryset)
+            approximate = time.perf_counter() - start
+            self.stdout.write('count %d in %.3f ms, approximate count %d in %.3f ms' %
+                              (count, exact * 1000, estimate, approximate * 1000))
+
+            self.stdout.write('%10s %15s %15s' % ('page', 'offset (ms)', 'keyset (ms)'))
+            for page in options['pages']:
+                offset = (page - 1) * limit
+                if offset >= count:
+                    break
+                cursor = ''
+                if offset:
+                    # the cursor a client gets with the page before
+                    cursor = KeysetPagination(ORDERING).encode_cursor(queryset.order_by(*ORDERING)[offset - 1])
+
+                times = []
+                for params in ({'limit': limit, 'offset': offset}, {'limit': limit, 'cursor': cursor}):
+                    request = Request(factory.get('/orders/', params))
+                    start = time.perf_counter()
+                    for _ in range(options['runs']):
+                        paginate(queryset, request, ORDERING, default_limit=limit)
+                    times.append((time.perf_counter() - start) / options['runs'])
+                self.stdout.write('%10d %15.3f %15.3f' % (page, times[0] * 1000, times[1] * 1000))
+
+            transaction.set_rollback(True)
+
+    def seed(self, size):
+        """creates a user with size orders and returns the user's orders"""
+        account = User.objects.create(username='benchmark-user')
+        profile = UserProfileModel.objects.create(account=account, phone_number=123)
+
+        # ordered_at is set to now when an order is made, every batch is moved a minute
+        # after the one before. they are moved after now so the versions of the rows
+        # left by the UPDATE are the oldest in the index and the pages don't walk over them
+        start = timezone.now() + timezone.timedelta(minutes=1)
+        last_id = 0
+        for batch in range(0, size, BATCH_SIZE):
+            OrderModel.objects.bulk_create([OrderModel(user=profile, final_price=10, subtotal=10,
+                                                       delivery_fee=0, vat=0, status='D')
+                                            for _ in range(min(BATCH_SIZE, size - batch))])
+            OrderModel.objects.filter(user=profile, id__gt=last_id).update(
+                ordered_at=start + timezone.timedelta(minutes=batch // BATCH_SIZE))
+            last_id = OrderModel.objects.filter(user=profile).order_by('-id').values_list('id', flat=True)[0]
+            if batch and not batch % 100000:
+                self.stdout.write('%d orders made' % batch)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:  # the estimates come from the statistics
+                cursor.execute('ANALYZE %s' % OrderModel._meta.db_table)
+        return profile.orders.all()
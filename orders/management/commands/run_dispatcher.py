@@ -0,0 +1,38 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 21:00
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.dispatch import get_dispatcher
+
+
+class Command(BaseCommand):
+    """Django command to assign drivers to the orders waiting for one"""
+
+    help = 'Assigns drivers to pending orders as they become available'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='dispatches one batch and exits')
+        parser.add_argument('--interval', type=float, default=settings.DISPATCH_INTERVAL,
+                            help='seconds to wait when no batch is full')
+        parser.add_argument('--stats-every', type=int, default=60,
+                            help='seconds between printing the dispatch metrics')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        dispatcher = get_dispatcher()
+        if options['once']:
+            self.stdout.write('Assigned %d orders' % dispatcher.dispatch())
+            return
+
+        self.stdout.write('Dispatching orders...')
+        last_stats = time.monotonic()
+        while True:
+            if dispatcher.dispatch() < dispatcher.batch_size:
+                time.sleep(options['interval'])
+
+            if time.monotonic() - last_stats >= options['stats_every']:
+                last_stats = time.monotonic()
+                self.stdout.write(' '.join('%s=%s' % item for item in dispatcher.stats().items()))
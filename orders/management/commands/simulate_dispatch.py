@@ -0,0 +1,103 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 21:40
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from koshkie.distance import distances_from
+from orders.matching import match
+
+CENTER_LATITUDE = 30.0444  # Cairo
+CENTER_LONGITUDE = 31.2357
+SPREAD = 0.1  # degrees around the center the drivers and orders are spread in
+SPEED = 0.5  # km per minute
+
+
+class Command(BaseCommand):
+    """Django command to replay the same synthetic demand with the
+    greedy and the batch matching and compare them.
+
+    The simulation runs in memory second by second, a matched
+    driver drives to the order, delivers it for --delivery-minutes
+    and becomes free again where the order was.
+    """
+
+    help = 'Compares the greedy and batch order to driver matching on synthetic demand'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drivers', type=int, default=200)
+        parser.add_argument('--orders-per-minute', type=float, default=20)
+        parser.add_argument('--minutes', type=int, default=60)
+        parser.add_argument('--window', type=int, default=10,
+                            help='seconds the batch matching accumulates orders')
+        parser.add_argument('--delivery-minutes', type=float, default=15)
+        parser.add_argument('--radius', type=float, default=2.5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        self.stdout.write('%8s %10s %10s %18s %18s %15s' % ('mode', 'orders', 'assigned', 'pickup (km)',
+                                                            'time to assign (s)', 'matching (ms)'))
+        for mode in ('greedy', 'batch'):
+            results = self.simulate(mode, options)
+            self.stdout.write('%8s %10d %10d %18.3f %18.1f %15.3f' % ((mode,) + results))
+
+    @staticmethod
+    def demand(options):
+        """returns the arrival second and location of every order"""
+        random = np.random.RandomState(options['seed'])
+        seconds = options['minutes'] * 60
+        count = random.poisson(options['orders_per_minute'] * options['minutes'])
+        arrivals = np.sort(random.randint(0, seconds, count))
+        locations = random.uniform(-SPREAD, SPREAD, (count, 2)) + (CENTER_LATITUDE, CENTER_LONGITUDE)
+        drivers = random.uniform(-SPREAD, SPREAD, (options['drivers'], 2)) + (CENTER_LATITUDE, CENTER_LONGITUDE)
+        return arrivals, locations, drivers
+
+    def simulate(self, mode, options):
+        """returns (orders, assigned, average pickup distance,
+        average time to assign, average matching time) of a run"""
+        arrivals, locations, drivers = self.demand(options)
+        free_at = np.zeros(len(drivers))  # second every driver becomes free
+        radius = options['radius']
+
+        pending = []
+        next_order = 0
+        pickups, waits, matching_times = [], [], []
+        for second in range(options['minutes'] * 60):
+            while next_order < len(arrivals) and arrivals[next_order] <= second:
+                pending.append(next_order)
+                next_order += 1
+
+            if not pending or (mode == 'batch' and second % options['window']):
+                continue
+
+            free = np.nonzero(free_at <= second)[0]
+            start = time.perf_counter()
+            if mode == 'batch':
+                pairs = [(pending[order], free[driver]) for order, driver in
+                         match(locations[pending].tolist(), drivers[free].tolist(), radius)]
+            else:
+                pairs = []
+                for order in pending:
+                    if not len(free):
+                        break
+                    distances = distances_from(locations[order, 0], locations[order, 1],
+                                               drivers[free, 0], drivers[free, 1])
+                    nearest = int(np.argmin(distances))
+                    if distances[nearest] <= radius:
+                        pairs.append((order, free[nearest]))
+                        free = np.delete(free, nearest)
+            matching_times.append(time.perf_counter() - start)
+
+            for order, driver in pairs:
+                pickup = distances_from(locations[order, 0], locations[order, 1],
+                                        drivers[driver, 0], drivers[driver, 1])
+                pickups.append(pickup)
+                waits.append(second - arrivals[order])
+                free_at[driver] = second + (pickup / SPEED + options['delivery_minutes']) * 60
+                drivers[driver] = locations[order]
+            assigned = {order for order, driver in pairs}
+            pending = [order for order in pending if order not in assigned]
+
+        return (len(arrivals), len(pickups), np.mean(pickups) if pickups else 0,
+                np.mean(waits) if waits else 0, np.mean(matching_times) * 1000 if matching_times else 0)
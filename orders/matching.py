@@ -0,0 +1,93 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 21:40
+import numpy as np
+
+from koshkie.distance import distance_matrix
+
+INFEASIBLE = 1e9  # cost of pairs that can't be matched
+
+
+def linear_sum_assignment(cost):
+    """Solves the assignment problem with the hungarian algorithm.
+
+    Returns (rows, columns) of the pairs with the lowest total cost where
+    every row and every column is used at most once, all rows are matched
+    if there are fewer rows than columns and all columns if not.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    rows_count, columns_count = cost.shape
+
+    # potentials of the rows and columns and the row matched to every column,
+    # index 0 is a dummy column the new row starts from and rows are 1 based
+    u = np.zeros(rows_count + 1)
+    v = np.zeros(columns_count + 1)
+    matched = np.zeros(columns_count + 1, dtype=int)
+    way = np.zeros(columns_count + 1, dtype=int)
+
+    for row in range(1, rows_count + 1):
+        matched[0] = row
+        column = 0
+        min_reduced = np.full(columns_count + 1, np.inf)
+        used = np.zeros(columns_count + 1, dtype=bool)
+
+        # finds the shortest augmenting path from the new row to a free column
+        while True:
+            used[column] = True
+            reduced = cost[matched[column] - 1] - u[matched[column]] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = column
+
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+
+            u[matched[used]] += delta
+            v[used] -= delta
+            min_reduced[~used] -= delta
+
+            column = next_column
+            if matched[column] == 0:
+                break
+
+        # flips the matches along the path
+        while column:
+            previous = way[column]
+            matched[column] = matched[previous]
+            column = previous
+
+    columns = np.nonzero(matched[1:])[0]
+    rows = matched[1:][columns] - 1
+    order = np.argsort(rows)
+    rows, columns = rows[order], columns[order]
+    if transposed:
+        rows, columns = columns, rows
+        order = np.argsort(rows)
+        rows, columns = rows[order], columns[order]
+    return rows, columns
+
+
+def match(order_locations, driver_locations, radius=2.5):
+    """Returns (order index, driver index) pairs of the matching with
+    the lowest total pickup distance where no driver is farther than
+    radius (km) from their order, some orders may stay unmatched"""
+    if not order_locations or not driver_locations:
+        return []
+
+    orders = np.asarray(order_locations, dtype=float)
+    drivers = np.asarray(driver_locations, dtype=float)
+    distances = distance_matrix(orders[:, 0], orders[:, 1], drivers[:, 0], drivers[:, 1])
+
+    # drivers out of reach of every order only make the problem bigger
+    reachable = np.nonzero((distances <= radius).any(axis=0))[0]
+    if not len(reachable):
+        return []
+    distances = distances[:, reachable]
+
+    cost = np.where(distances <= radius, distances, INFEASIBLE)
+    rows, columns = linear_sum_assignment(cost)
+    return [(int(row), int(reachable[column])) for row, column in zip(rows, columns)
+            if cost[row, column] < INFEASIBLE]
@@ -0,0 +1,23 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 21:00
+
+# Generated by Django 3.0.7 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('orders', '0004_auto_20200221_1807'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordermodel',
+            name='assigned_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ordermodel',
+            index=models.Index(condition=models.Q(('driver', None), ('status', 'C')), fields=['ordered_at'], name='order_pending_dispatch_idx'),
+        ),
+    ]
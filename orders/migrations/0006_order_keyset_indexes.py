@@ -0,0 +1,22 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 01:10
+
+# Generated by Django 3.0.7 on 2026-10-19 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('orders', '0005_order_assigned_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordermodel',
+            index=models.Index(fields=['user', 'ordered_at', 'id'], name='order_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordermodel',
+            index=models.Index(fields=['driver', 'ordered_at', 'id'], name='order_driver_keyset_idx'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
 from drivers.models import DriverProfileModel
+from koshkie.geocoding import Geocoded
 from shops.models import ShopProfileModel, ProductModel, AddOnModel, OptionGroupModel, OptionModel
 from users.models import UserProfileModel
 
@@ -23,12 +24,21 @@ class OrderModel(models.Model):
     shipping_address = models.OneToOneField(to='orders.OrderAddressModel', on_delete=models.SET_NULL,
                                             null=True, related_name='order')
     ordered_at = models.DateTimeField(auto_now_add=True)
+    assigned_at = models.DateTimeField(null=True)  # when a driver took the order
     status = models.CharField(max_length=2, choices=status, default='C')
     final_price = models.FloatField()
     subtotal = models.FloatField()
     delivery_fee = models.FloatField()
     vat = models.FloatField()
 
+    class Meta:
+        # the orders waiting for a driver, oldest first
+        indexes = [models.Index(fields=['ordered_at'], condition=models.Q(driver=None, status='C'),
+                                name='order_pending_dispatch_idx'),
+                   # the pages of the orders of a user or a driver, by the keys of the last order
+                   models.Index(fields=['user', 'ordered_at', 'id'], name='order_user_keyset_idx'),
+                   models.Index(fields=['driver', 'ordered_at', 'id'], name='order_driver_keyset_idx')]
+
 
 class OrderItemsGroupModel(models.Model):
     """The Model of the Order's items' groups."""
@@ -79,7 +89,7 @@ class OrderItemModel(models.Model):
         return self.get_item_price() * (self.product.shop.vat / 100)
 
 
-class OrderAddressModel(models.Model):
+class OrderAddressModel(Geocoded, models.Model):
     """The Model of the Order's Address, it is used
     as an alias to user address because the user
     may delete or change his addresses list in the future
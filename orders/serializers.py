@@ -1,19 +1,33 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 25/02/2020, 22:30
 
-from django.db.models import F
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F, Prefetch, Case, When, IntegerField
 from django.utils import timezone
 from rest_framework import serializers
 
-from drivers.models import DriverProfileModel
 from drivers.serializers import DriverProfileSerializer
-from koshkie import haversine
+from koshkie.distance import distances_from
+from koshkie.ordering import number, number_siblings
+from orders.dispatch import claim_driver, get_dispatcher
 from orders.models import OrderModel, OrderItemModel, Choice, OrderAddressModel, OrderItemsGroupModel
-from shops.models import ProductModel
+from shops.models import ProductModel, RelyOn
 from shops.serializers import (ShopProfileSerializer, ProductSerializer,
                                AddOnSerializer, OptionGroupSerializer, OptionSerializer)
 from users.serializers import UserProfileSerializer
 
 
+class ChoiceListSerializer(serializers.ListSerializer):
+    """The serializer for a list of order item choices, it numbers
+    the option groups and options of all the choices at once"""
+
+    def to_representation(self, data):
+        choices = list(data.all() if isinstance(data, models.Manager) else data)
+        number([choice.option_group for choice in choices])
+        number([choice.choosed_option for choice in choices])
+        return super(ChoiceListSerializer, self).to_representation(choices)
+
+
 class ChoiceSerializer(serializers.ModelSerializer):
     """The serializer for the order item choices model"""
 
@@ -25,6 +39,7 @@ class ChoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Choice
         fields = ('option_group', 'option_group_id', 'choosed_option', 'choosed_option_id')
+        list_serializer_class = ChoiceListSerializer
 
 
 class OrderAddressSerializer(serializers.ModelSerializer):
@@ -35,12 +50,76 @@ class OrderAddressSerializer(serializers.ModelSerializer):
         exclude = ('id', 'country', 'city')
 
 
+# the products with everything needed to validate and price an order item
+PRODUCTS_WITH_MENU = ProductModel.objects.select_related('shop__address').prefetch_related(
+    'add_ons', 'option_groups__options',
+    Prefetch('option_groups__rely_on', queryset=RelyOn.objects.select_related('choosed_option_group', 'option')))
+
+
+def number_menu(product):
+    """sets the sorts of the loaded add-ons, option groups and options
+    of a product, and of the ones its rely-ons point to, without queries"""
+    number_siblings(product.add_ons.all())
+    option_groups = {option_group.pk: option_group
+                     for option_group in number_siblings(product.option_groups.all())}
+    options = {option.pk: option for option_group in option_groups.values()
+               for option in number_siblings(option_group.options.all())}
+
+    for option_group in option_groups.values():
+        if hasattr(option_group, 'rely_on'):
+            rely_on = option_group.rely_on
+            rely_on.choosed_option_group.sort = option_groups[rely_on.choosed_option_group_id].sort
+            rely_on.option.sort = options[rely_on.option_id].sort
+
+
+def bulk_create(model, objs):
+    """saves new model instances with one query when the database
+    returns the ids of the inserted rows (they are needed to link
+    other rows to them), if not they are saved one by one"""
+    if connection.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(objs)
+    else:
+        for obj in objs:
+            obj.save(force_insert=True)
+
+
+class OrderProductField(serializers.PrimaryKeyRelatedField):
+    """The product of an order item, taken from the products
+    loaded together for the whole order when there are any"""
+
+    def to_internal_value(self, data):
+        products = getattr(self.parent.parent, 'products', None)
+        if products is not None:
+            try:
+                return products[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass  # fails the same way as a single product
+        return super(OrderProductField, self).to_internal_value(data)
+
+
+class OrderItemListSerializer(serializers.ListSerializer):
+    """The serializer for a list of order items,
+    it loads the products of all items with one query for each relation"""
+
+    products = None
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            pks = set()
+            for item in data:
+                try:
+                    pks.add(int(item.get('product')))
+                except (AttributeError, TypeError, ValueError):
+                    pass
+            self.products = self.child.fields['product'].get_queryset().in_bulk(pks)
+        return super(OrderItemListSerializer, self).to_internal_value(data)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     """The serializer for the order item model"""
 
     ordered_product = ProductSerializer(read_only=True, keep_only=('id', 'title'), source='product')
-    product = serializers.PrimaryKeyRelatedField(write_only=True,
-                                                 queryset=ProductModel.objects.all())
+    product = OrderProductField(write_only=True, queryset=PRODUCTS_WITH_MENU)
     add_ons_sorts = serializers.ListField(child=serializers.IntegerField(), required=False,
                                           write_only=True)
     add_ons = AddOnSerializer(many=True, read_only=True, keep_only=('sort', 'title'))
@@ -50,6 +129,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItemModel
         fields = ('ordered_product', 'product', 'quantity', 'price', 'choices', 'add_ons', 'add_ons_sorts',
                   'special_request')
+        list_serializer_class = OrderItemListSerializer
         extra_kwargs = {
             'special_request': {'required': False},
             'price': {'read_only': True}
@@ -65,9 +145,16 @@ class OrderItemSerializer(serializers.ModelSerializer):
         if not product.is_available:  # may be out of order
             raise serializers.ValidationError("this product is not available right now")
 
+        # the product's menu is already loaded, nothing here queries the database
+        number_menu(product)
+        add_ons_sorts = {add_on.sort for add_on in product.add_ons.all()}
+        option_groups = {option_group.sort: option_group for option_group in product.option_groups.all()}
+
         if add_ons:
+            if len(set(add_ons)) != len(add_ons):  # each add-on is added and priced once
+                raise serializers.ValidationError("duplicate add-ons for the order item")
             for add_on in add_ons:
-                if not product.add_ons.filter(sort=add_on).exists():  # checks for add-ons sorts
+                if add_on not in add_ons_sorts:  # checks for add-ons sorts
                     raise serializers.ValidationError("add-on Doesn't Exist")
 
         if choices:
@@ -78,10 +165,10 @@ class OrderItemSerializer(serializers.ModelSerializer):
                 seen.append(choice)
 
                 # checks for option group sorts
-                if product.option_groups.filter(sort=choice.get('option_group_id')).exists():
+                option_group = option_groups.get(choice.get('option_group_id'))
+                if option_group is not None:
                     # checks for options inside an option group sorts
-                    if not product.option_groups.get(sort=choice.get('option_group_id')).options.filter(
-                        sort=choice.get('choosed_option_id')).exists():
+                    if choice.get('choosed_option_id') not in {option.sort for option in option_group.options.all()}:
                         raise serializers.ValidationError("chosen option doesn't exist")
                 else:
                     raise serializers.ValidationError("option group doesn't exist")
@@ -93,7 +180,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
                     return True
             return False
 
-        for option_group in product.option_groups.all():
+        for option_group in option_groups.values():
             # checks whether all option group in the product are choosed
             if option_group.sort in [choice.get('option_group_id') for choice in choices]:
                 #  checks that that option group doesn't have a rely_on
@@ -141,10 +228,10 @@ class OrderDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderModel
-        fields = ('id', 'user', 'driver', 'items', 'item_groups', 'ordered_at', 'status',
+        fields = ('id', 'user', 'driver', 'items', 'item_groups', 'ordered_at', 'assigned_at', 'status',
                   'shipping_address', 'final_price', 'delivery_fee', 'vat')
 
-        read_only_fields = ('id', 'user', 'driver', 'ordered_at', 'final_price',
+        read_only_fields = ('id', 'user', 'driver', 'ordered_at', 'assigned_at', 'final_price',
                             'delivery_fee', 'vat')
 
     def validate(self, attrs):
@@ -156,35 +243,24 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             user_longitude = float(attrs.get('shipping_address', '').get('location_longitude', ''))
             user_latitude = float(attrs.get('shipping_address', '').get('location_latitude', ''))
 
-            # checks if there are any drivers available at user's location
-            min_active_time = timezone.now() - timezone.timedelta(seconds=10)
-            driver_available = DriverProfileModel.objects.annotate(distance=haversine(user_latitude, user_longitude,
-                                                                                      F('live_location_latitude'),
-                                                                                      F('live_location_longitude'))
-                                                                   ).filter(distance__lte=2.5, is_busy=False,
-                                                                            is_active=True, is_available=True,
-                                                                            last_time_online__gte=min_active_time
-                                                                            ).exists()
-
-            if not driver_available:
-                raise serializers.ValidationError("there are no drivers in your area")
-
+            # orders with no driver available near them are still
+            # accepted and wait for one in the dispatch queue
             # checks if every item's shop is available and near the user's location
+            shops = []
             for item in attrs['items']:
                 product = item['product']
                 shop = product.shop
-                shops = []
                 if shop not in shops:
                     shops.append(shop)
 
-                    if not shop.is_active or not shop.is_open or shop.opens_at > timezone.now().time() or shop.closes_at < timezone.now().time():
+                    if not shop.is_active or not shop.is_open or not shop.is_open_now:
                         raise serializers.ValidationError("this product's shop is not available right now")
 
-                    shop_longitude = shop.address.location_longitude
-                    shop_latitude = shop.address.location_latitude
-                    distance = haversine(user_latitude, user_longitude, shop_latitude, shop_longitude)
-                    if distance > 2.5:
-                        raise serializers.ValidationError("these products are not available in you area")
+            distances = distances_from(user_latitude, user_longitude,
+                                       [shop.address.location_latitude for shop in shops],
+                                       [shop.address.location_longitude for shop in shops])
+            if (distances > 2.5).any():
+                raise serializers.ValidationError("these products are not available in you area")
         return attrs
 
     def validate_status(self, data):
@@ -200,80 +276,102 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        """Creates a new Order"""
+        """Creates a new Order.
+
+        Every price is calculated from the products' menus loaded
+        while validating, then everything is saved with a few bulk
+        queries in one transaction.
+        """
 
         items_data = validated_data.pop('items')
 
-        shops = set()
-        item_groups = set()
+        item_groups = {}  # shop -> item group
+        items = []
+        choices = []  # (item index, Choice)
+        add_ons = []  # (item index, add-on)
+        num_sold = {}  # product id -> number of items
         delivery_fee = 0
         vat = 0
         subtotal = 0
 
         for item in items_data:
-            choices = item.pop('choices', [])
-            add_ons_ids = item.pop('add_ons_sorts', [])
-            order_item = OrderItemModel.objects.create(**item)
-            # increase the product's number of sells
-            order_item.product.num_sold = F('num_sold') + 1
-            order_item.product.save()
-            for choice in choices:
+            product = item['product']
+            option_groups = {option_group.sort: option_group for option_group in product.option_groups.all()}
+            product_add_ons = {add_on.sort: add_on for add_on in product.add_ons.all()}
+
+            product_price = product.price
+            for choice in item.pop('choices', []):
                 # creates a new choice model with choosed option group and option
-                option_group = order_item.product.option_groups.get(sort=choice['option_group_id'])
-                choosed_option = option_group.options.get(sort=choice['choosed_option_id'])
-                Choice.objects.create(order_item=order_item, option_group=option_group,
-                                      choosed_option=choosed_option)
-            for add_on_id in add_ons_ids:
+                option_group = option_groups[choice['option_group_id']]
+                choosed_option = [option for option in option_group.options.all()
+                                  if option.sort == choice['choosed_option_id']][0]
+                choices.append((len(items), Choice(option_group=option_group, choosed_option=choosed_option)))
+                if option_group.changes_price:
+                    product_price = choosed_option.price
+
+            add_ons_price = 0
+            for add_on_id in item.pop('add_ons_sorts', []):
                 # adds all add-ons to that item
-                add_on = order_item.product.add_ons.get(sort=add_on_id)
-                order_item.add_ons.add(add_on)
-            order_item.price = order_item.get_item_price()
-            shop = order_item.product.shop
-            if shop not in shops:
-                # creates a new item group that for that shop
-                shops.add(shop)
-                delivery_fee += shop.delivery_fee  # adds the shop's delivery_fee to the orders total
+                add_ons.append((len(items), product_add_ons[add_on_id]))
+                add_ons_price += product_add_ons[add_on_id].added_price
 
-                item_group = OrderItemsGroupModel.objects.create(shop=shop)
-                item_groups.add(item_group)
-            else:
-                # sets the item group of that item if it already exists and in item_groups list
-                item_group = [x for x in item_groups if x.shop == shop][0]  # only one shop in that list
+            order_item = OrderItemModel(**item)
+            order_item.price = (product_price + add_ons_price) * order_item.quantity
+            items.append(order_item)
+            # increase the product's number of sells
+            num_sold[product.pk] = num_sold.get(product.pk, 0) + 1
 
-            order_item.item_group = item_group
-            order_item.save()
+            shop = product.shop
+            if shop not in item_groups:
+                # creates a new item group that for that shop
+                item_groups[shop] = OrderItemsGroupModel(shop=shop)
+                delivery_fee += shop.delivery_fee  # adds the shop's delivery_fee to the orders total
 
             # adds up that item's prices to the whole order
-            vat += order_item.calculate_vat()
-            subtotal += order_item.get_item_price()
+            vat += order_item.price * (shop.vat / 100)
+            subtotal += order_item.price
 
         final_price = subtotal + vat + delivery_fee
 
-        address_data = validated_data.pop('shipping_address')
-        shipping_address = OrderAddressModel.objects.create(**address_data)
-
-        user_longitude = float(shipping_address.location_longitude)
-        user_latitude = float(shipping_address.location_latitude)
-        min_active_time = timezone.now() - timezone.timedelta(seconds=10)
-        # gets the nearest driver available
-        driver = DriverProfileModel.objects.annotate(distance=haversine(user_latitude, user_longitude,
-                                                                        F('live_location_latitude'),
-                                                                        F('live_location_longitude'))
-                                                     ).filter(distance__lte=2.5, is_busy=False,
-                                                              is_active=True, is_available=True,
-                                                              last_time_online__gte=min_active_time
-                                                              ).order_by('distance')[0]
-        # the driver now is busy and CAN'T deliver new orders
-        driver.is_busy = True
-        driver.save()
-
-        # creates the final order
-        order = OrderModel.objects.create(driver=driver, shipping_address=shipping_address,
-                                          status='C', final_price=final_price,
-                                          delivery_fee=delivery_fee, vat=vat,
-                                          subtotal=subtotal, **validated_data)
-        order.shops.set(shops)
-        order.item_groups.set(item_groups)
+        with transaction.atomic():
+            address_data = validated_data.pop('shipping_address')
+            shipping_address = OrderAddressModel.objects.create(**address_data)
+
+            user_longitude = float(shipping_address.location_longitude)
+            user_latitude = float(shipping_address.location_latitude)
+            # claims the nearest driver available, the driver
+            # now is busy and CAN'T deliver new orders,
+            # if there is none the order waits for the dispatcher
+            driver = None
+            if settings.DISPATCH_MATCHING == 'greedy':
+                driver = claim_driver(user_latitude, user_longitude)
+
+            # creates the final order
+            order = OrderModel.objects.create(driver=driver, shipping_address=shipping_address,
+                                              assigned_at=timezone.now() if driver else None,
+                                              status='C', final_price=final_price,
+                                              delivery_fee=delivery_fee, vat=vat,
+                                              subtotal=subtotal, **validated_data)
+            OrderModel.shops.through.objects.bulk_create(
+                [OrderModel.shops.through(ordermodel=order, shopprofilemodel=shop) for shop in item_groups])
+
+            for item_group in item_groups.values():
+                item_group.order = order
+            bulk_create(OrderItemsGroupModel, item_groups.values())
+            for order_item in items:
+                order_item.item_group = item_groups[order_item.product.shop]
+            bulk_create(OrderItemModel, items)
+
+            for index, choice in choices:
+                choice.order_item = items[index]
+            Choice.objects.bulk_create([choice for index, choice in choices])
+            OrderItemModel.add_ons.through.objects.bulk_create(
+                [OrderItemModel.add_ons.through(orderitemmodel=items[index], addonmodel=add_on)
+                 for index, add_on in add_ons])
+
+            ProductModel.objects.filter(pk__in=num_sold).update(
+                num_sold=F('num_sold') + Case(*[When(pk=pk, then=count) for pk, count in num_sold.items()],
+                                              output_field=IntegerField()))
         return order
 
     def update(self, instance, validated_data):
@@ -283,12 +381,15 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         status = validated_data.get('status', None)
         if status:
             instance.status = status
-            if status == 'D':
+            if status == 'D' and instance.driver:
                 # means that the order is well done and delivered
                 # the driver will be marked as not busy and
                 # can deliver other orders
-                instance.driver.is_busy = False
-                instance.driver.save()
+                driver = instance.driver
+                driver.is_busy = False
+                driver.save(update_fields=['is_busy'])
+                # gives them an order waiting for a driver near them
+                transaction.on_commit(lambda: get_dispatcher().assign_to(driver))
             instance.save()
         return instance
 
@@ -0,0 +1,209 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 20:40
+import threading
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from drivers.models import DriverProfileModel
+from drivers.spatial import get_driver_index
+from orders.dispatch import claim_driver, Dispatcher
+from orders.models import OrderModel, OrderAddressModel
+from orders.serializers import OrderDetailSerializer
+from shops.models import ShopProfileModel, ShopAddressModel, ProductModel
+
+
+def create_drivers(count, latitude=30):
+    drivers = []
+    for i in range(count):
+        account = User.objects.create(username='driver%d' % i, password='password')
+        drivers.append(DriverProfileModel.objects.create(account=account, phone_number=123,
+                                                         profile_photo='/orders/tests/sample.jpg',
+                                                         is_active=True, is_available=True,
+                                                         last_time_online=timezone.now(),
+                                                         live_location_longitude=30,
+                                                         live_location_latitude=latitude + i * 0.001))
+    return drivers
+
+
+class TestClaimDriver(TestCase):
+    """Unittest for claiming drivers for orders"""
+
+    def setUp(self):
+        """setup for unittest"""
+        self.drivers = create_drivers(2)
+
+    def test_nearest_first(self):
+        """test that the nearest free driver is claimed"""
+        self.assertEqual(claim_driver(30, 30), self.drivers[0])
+        self.assertEqual(claim_driver(30, 30), self.drivers[1])
+        self.assertIsNone(claim_driver(30, 30))
+        self.assertEqual(DriverProfileModel.objects.filter(is_busy=True).count(), 2)
+
+    def test_busy_in_between(self):
+        """test that a driver who got busy after being found is skipped"""
+        DriverProfileModel.objects.filter(pk=self.drivers[0].pk).update(is_busy=True)
+        self.assertEqual(claim_driver(30, 30), self.drivers[1])
+
+
+@override_settings(DRIVERS_INDEX_BACKEND='drivers.spatial.LocalDriverIndex')
+class TestClaimedDriversIndex(TransactionTestCase):
+    """Unittest for removing claimed drivers from the drivers index"""
+
+    def setUp(self):
+        """setup for unittest"""
+        # the drivers of the previous tests were flushed without signals
+        get_driver_index().clear()
+        self.drivers = create_drivers(2)
+
+    def test_removed_from_index(self):
+        """test that claimed drivers are removed from the drivers index"""
+        claim_driver(30, 30)
+        self.assertEqual(get_driver_index().nearest(30, 30), [self.drivers[1].pk])
+
+    def test_kept_in_index_on_rollback(self):
+        """test that drivers claimed in a rolled back transaction stay in the drivers index"""
+        try:
+            with transaction.atomic():
+                claim_driver(30, 30)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(get_driver_index().nearest(30, 30), [self.drivers[0].pk, self.drivers[1].pk])
+
+
+def create_pending_order(longitude=30):
+    address = OrderAddressModel.objects.create(area='area', type='A', street='street', building='building',
+                                               location_longitude=longitude, location_latitude=30)
+    return OrderModel.objects.create(shipping_address=address, final_price=0, subtotal=0,
+                                     delivery_fee=0, vat=0)
+
+
+class TestDispatcher(TestCase):
+    """Unittest for assigning drivers to orders waiting for one"""
+
+    def setUp(self):
+        """setup for unittest"""
+        self.orders = [create_pending_order() for _ in range(3)] + [create_pending_order(longitude=40)]
+        self.dispatcher = Dispatcher(batch_size=2)
+
+    def test_dispatch(self):
+        """test that pending orders get drivers oldest first in batches"""
+        create_drivers(3)
+
+        self.assertEqual(self.dispatcher.dispatch(), 2)
+        self.assertEqual(self.dispatcher.dispatch(), 1)  # the other drivers are busy now
+        self.assertEqual(self.dispatcher.dispatch(), 0)
+
+        assigned = OrderModel.objects.exclude(driver=None)
+        self.assertEqual(set(assigned), set(self.orders[:3]))
+        self.assertEqual(assigned.values('driver').distinct().count(), 3)
+        self.assertTrue(all(order.assigned_at >= order.ordered_at for order in assigned))
+
+        stats = self.dispatcher.stats()
+        self.assertEqual(stats['queue_length'], 1)  # no driver near the last one
+        self.assertEqual(stats['assigned'], 3)
+        self.assertEqual(stats['batches'], 3)
+        self.assertGreaterEqual(stats['max_time_to_assign'], stats['average_time_to_assign'])
+
+    def test_assign_to_free_driver(self):
+        """test that a driver who just became free takes the oldest order near them"""
+        driver = create_drivers(1)[0]
+
+        self.assertEqual(self.dispatcher.assign_to(driver), self.orders[0])
+        self.assertTrue(DriverProfileModel.objects.get(pk=driver.pk).is_busy)
+        self.assertIsNone(self.dispatcher.assign_to(driver))  # busy now
+
+    def test_assign_to_unavailable_driver(self):
+        """test that a driver who went off duty, was deactivated or is offline takes no order"""
+        drivers = create_drivers(3)
+        DriverProfileModel.objects.filter(pk=drivers[0].pk).update(is_available=False)
+        DriverProfileModel.objects.filter(pk=drivers[1].pk).update(is_active=False)
+        DriverProfileModel.objects.filter(pk=drivers[2].pk).update(
+            last_time_online=timezone.now() - timezone.timedelta(minutes=5))
+
+        for driver in drivers:
+            self.assertIsNone(self.dispatcher.assign_to(driver))
+        self.assertFalse(DriverProfileModel.objects.filter(is_busy=True).exists())
+        self.assertFalse(OrderModel.objects.exclude(driver=None).exists())
+
+
+@override_settings(GEOCODING_BACKEND='koshkie.geocoding.StubGeocoder', GEOCODING_ASYNC=False)
+class TestDeliveredOrder(TransactionTestCase):
+    """Unittest for giving pending orders to drivers who deliver their orders"""
+
+    def test_delivered_order_frees_driver(self):
+        """test that delivering an order gives the driver a pending order"""
+        pending_order = create_pending_order()
+        driver = create_drivers(1)[0]
+        driver.is_busy = True
+        driver.save()
+        order = OrderModel.objects.create(driver=driver, final_price=0, subtotal=0, delivery_fee=0, vat=0)
+
+        # the transaction commits right away, so the pending order is given after saving
+        serializer = OrderDetailSerializer(order, data={'status': 'D'}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+
+        pending_order.refresh_from_db()
+        self.assertEqual(pending_order.driver, driver)
+        self.assertTrue(DriverProfileModel.objects.get(pk=driver.pk).is_busy)
+
+
+@skipUnlessDBFeature('has_select_for_update')  # databases with row level locking
+@override_settings(GEOCODING_BACKEND='koshkie.geocoding.StubGeocoder', GEOCODING_ASYNC=False)
+class TestConcurrentOrders(TransactionTestCase):
+    """Stress test for creating orders at the same time"""
+
+    def setUp(self):
+        """setup for unittest"""
+        shop_user = User.objects.create(username='shop_user', password='password')
+        shop = ShopProfileModel.objects.create(account=shop_user, profile_photo='/orders/tests/sample.jpg',
+                                               cover_photo='/orders/tests/sample.jpg', phone_number=123,
+                                               description='text', shop_type='F', name='shop',
+                                               slug='shop', currency='$', delivery_fee=0,
+                                               opens_at=timezone.now() - timezone.timedelta(hours=2),
+                                               closes_at=timezone.now() + timezone.timedelta(hours=2),
+                                               time_to_prepare=20, vat=14, is_active=True)
+        ShopAddressModel.objects.create(shop=shop, area='area', street='street', building='building',
+                                        location_longitude=30, location_latitude=30)
+        self.product = ProductModel.objects.create(shop=shop, photo='/orders/tests/sample.jpg',
+                                                   title='product', slug='product', price=5,
+                                                   description='text')
+        self.drivers = create_drivers(5)
+
+    def create_order(self, barrier, errors):
+        serializer = OrderDetailSerializer(data={'items': [{'product': self.product.pk}],
+                                                 'shipping_address': {'area': 'area', 'type': 'A',
+                                                                      'street': 'street',
+                                                                      'building': 'building',
+                                                                      'location_longitude': 30,
+                                                                      'location_latitude': 30}})
+        try:
+            barrier.wait()
+            if serializer.is_valid():
+                serializer.save()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_no_driver_double_booked(self):
+        """test that every driver gets at most one order"""
+        threads_count = 20
+        barrier = threading.Barrier(threads_count)
+        errors = []
+        threads = [threading.Thread(target=self.create_order, args=(barrier, errors))
+                   for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(OrderModel.objects.count(), threads_count)
+        assigned_orders = OrderModel.objects.exclude(driver=None)
+        self.assertEqual(assigned_orders.count(), len(self.drivers))  # the others wait for a driver
+        self.assertEqual(assigned_orders.values('driver').distinct().count(), len(self.drivers))
+        self.assertEqual(DriverProfileModel.objects.filter(is_busy=True).count(), len(self.drivers))
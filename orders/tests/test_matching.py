@@ -0,0 +1,67 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 21:40
+import itertools
+import random
+
+from django.test import TestCase, override_settings
+
+from orders.dispatch import Dispatcher, get_dispatcher
+from orders.matching import linear_sum_assignment, match
+from orders.models import OrderModel
+from orders.tests.test_dispatch import create_drivers, create_pending_order
+
+
+class TestMatching(TestCase):
+    """Unittest for the order to driver matching"""
+
+    def test_assignment(self):
+        """test that the assignment has the lowest total cost"""
+        random.seed(0)
+        for _ in range(50):
+            rows_count, columns_count = random.randint(1, 5), random.randint(1, 5)
+            cost = [[random.randint(0, 20) for _ in range(columns_count)] for _ in range(rows_count)]
+            rows, columns = linear_sum_assignment(cost)
+
+            self.assertEqual(len(rows), min(rows_count, columns_count))
+            self.assertEqual(len(set(rows)), len(rows))
+            self.assertEqual(len(set(columns)), len(columns))
+
+            best = min(sum(cost[row][column] for row, column in pairs) for pairs in (
+                zip(rows_order, columns_order)
+                for rows_order in itertools.permutations(range(rows_count), len(rows))
+                for columns_order in itertools.combinations(range(columns_count), len(rows))))
+            self.assertEqual(sum(cost[row][column] for row, column in zip(rows, columns)), best)
+
+    def test_match(self):
+        """test that the total pickup distance is lowest and out of range drivers are not used"""
+        # the first order's nearest driver is the only one near the second order
+        orders = [(30, 30), (30, 30.02)]
+        drivers = [(30, 30.009), (30, 29.987), (40, 40)]
+        self.assertEqual(match(orders, drivers), [(0, 1), (1, 0)])
+
+        self.assertEqual(match([(30, 30), (35, 35)], drivers), [(0, 0)])  # the nearest one
+        self.assertEqual(match(orders, []), [])
+        self.assertEqual(match(orders, [(40, 40)]), [])
+
+
+class TestBatchDispatch(TestCase):
+    """Unittest for the batch matching mode of the dispatcher"""
+
+    def test_dispatch(self):
+        """test that the batch gets the drivers with the lowest total pickup distance,
+        the greedy matching would give the first order the only driver near the second"""
+        orders = [create_pending_order(longitude=30), create_pending_order(longitude=30.02)]
+        create_pending_order(longitude=40)  # no driver near it
+        drivers = create_drivers(2, latitude=30)
+        drivers[0].live_location_longitude = 30.009
+        drivers[0].save()
+        drivers[1].live_location_longitude = 29.987
+        drivers[1].save()
+
+        self.assertEqual(Dispatcher(matching='batch').dispatch(), 2)
+        self.assertEqual(OrderModel.objects.get(pk=orders[0].pk).driver, drivers[1])
+        self.assertEqual(OrderModel.objects.get(pk=orders[1].pk).driver, drivers[0])
+
+    @override_settings(DISPATCH_MATCHING='batch')
+    def test_configured(self):
+        """test that the dispatcher follows the settings"""
+        self.assertEqual(get_dispatcher().matching, 'batch')
@@ -25,7 +25,7 @@ class TestOrderItemsGroup(TestCase):
     def test_str(self):
         """test for string function"""
         group = OrderItemsGroupModel.objects.create(order=self.order, shop=self.shop)
-        self.assertEqual(group.__str__(), '1: shop')
+        self.assertEqual(group.__str__(), '%s: shop' % self.order.pk)
 
         group = OrderItemsGroupModel.objects.create()
         self.assertNotEqual(group.__str__(), '1: shop')
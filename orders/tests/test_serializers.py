@@ -1,11 +1,13 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 25/02/2020, 22:30
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from drivers.models import DriverProfileModel
-from orders.models import OrderModel
-from orders.serializers import OrderDetailSerializer, OrderItemSerializer, OrderAddressSerializer
+from orders.models import OrderModel, OrderItemModel, Choice
+from orders.serializers import OrderDetailSerializer, OrderItemSerializer, OrderAddressSerializer, ChoiceSerializer
 from shops.models import ShopProfileModel, ProductModel, ShopAddressModel, AddOnModel, OptionGroupModel, OptionModel, \
     RelyOn
 
@@ -49,7 +51,7 @@ class TestOrder(TestCase):
                                                         live_location_latitude=30)
 
     def test_driver_available(self):
-        """test if there are any drivers available or not"""
+        """test that orders are accepted whether there are drivers available or not"""
 
         # true
         serializer = OrderDetailSerializer(data={'items': [{'product': self.product.pk}],
@@ -62,14 +64,32 @@ class TestOrder(TestCase):
         self.assertTrue(serializer.is_valid())
 
         # no driver in this range
+        self.shop_address.location_longitude = 30.1
+        self.shop_address.save()
         serializer = OrderDetailSerializer(data={'items': [{'product': self.product.pk}],
                                                  'shipping_address': {'area': 'area', 'type': 'A',
                                                                       'street': 'street',
                                                                       'building': 'building',
-                                                                      'location_longitude': 12,
-                                                                      'location_latitude': 43}})
+                                                                      'location_longitude': 30.1,
+                                                                      'location_latitude': 30}})
 
-        self.assertFalse(serializer.is_valid())
+        self.assertTrue(serializer.is_valid())
+        # waits for a driver in the dispatch queue
+        order = serializer.save()
+        self.assertIsNone(order.driver)
+        self.assertIsNone(order.assigned_at)
+
+    @override_settings(DISPATCH_MATCHING='batch')
+    def test_batch_matching(self):
+        """test that orders wait for the next batch in the batch matching mode"""
+        serializer = OrderDetailSerializer(data={'items': [{'product': self.product.pk}],
+                                                 'shipping_address': {'area': 'area', 'type': 'A',
+                                                                      'street': 'street',
+                                                                      'building': 'building',
+                                                                      'location_longitude': 30,
+                                                                      'location_latitude': 30}})
+        self.assertTrue(serializer.is_valid())
+        self.assertIsNone(serializer.save().driver)
 
     def test_shops_nearby(self):
         """test whether all shop are near the shipping address"""
@@ -436,6 +456,113 @@ class TestOrderItem(TestCase):
         self.assertTrue(serializer.is_valid())
 
 
+class TestOrderQueries(TestCase):
+    """Unittest for the number of queries made for an order"""
+
+    def setUp(self):
+        """setup for unittest"""
+        shop_user = User.objects.create(username='shop_user', password='password')
+        self.shop = ShopProfileModel.objects.create(account=shop_user, profile_photo='/orders/tests/sample.jpg',
+                                                    cover_photo='/orders/tests/sample.jpg', phone_number=123,
+                                                    description='text', shop_type='F', name='shop',
+                                                    slug='shop', currency='$', delivery_fee=0,
+                                                    opens_at=timezone.now() - timezone.timedelta(hours=2),
+                                                    closes_at=timezone.now() + timezone.timedelta(hours=2),
+                                                    time_to_prepare=20, vat=14, is_active=True)
+        ShopAddressModel.objects.create(shop=self.shop, area='area', street='street', building='building',
+                                        location_longitude=30, location_latitude=30)
+        driver_user = User.objects.create(username='driver_user', password='password')
+        DriverProfileModel.objects.create(account=driver_user, phone_number=123,
+                                          profile_photo='/orders/tests/sample.jpg',
+                                          is_active=True, is_available=True,
+                                          last_time_online=timezone.now(),
+                                          live_location_longitude=30,
+                                          live_location_latitude=30)
+
+        self.items = []
+        for i in range(10):
+            product = ProductModel.objects.create(shop=self.shop, photo='/orders/tests/sample.jpg',
+                                                  title='product%d' % i, price=5, description='text')
+            addon = AddOnModel.objects.create(product=product, title='addon', added_price=5)
+            option_group1 = OptionGroupModel.objects.create(product=product, title='group1', changes_price=True)
+            option1 = OptionModel.objects.create(option_group=option_group1, title='option1', price=3.2)
+            option_group2 = OptionGroupModel.objects.create(product=product, title='group2')
+            option2 = OptionModel.objects.create(option_group=option_group2, title='option2')
+            RelyOn.objects.create(option_group=option_group2, choosed_option_group=option_group1, option=option1)
+            self.items.append({'product': product.pk, 'add_ons_sorts': [addon.sort],
+                               'choices': [{'option_group_id': option_group1.sort,
+                                            'choosed_option_id': option1.sort},
+                                           {'option_group_id': option_group2.sort,
+                                            'choosed_option_id': option2.sort}]})
+
+    def get_serializer(self, items):
+        return OrderDetailSerializer(data={'items': items,
+                                           'shipping_address': {'area': 'area', 'type': 'A',
+                                                                'street': 'street',
+                                                                'building': 'building',
+                                                                'location_longitude': 30,
+                                                                'location_latitude': 30}})
+
+    def count_validation_queries(self, items):
+        serializer = self.get_serializer(items)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(serializer.is_valid())
+        return len(queries)
+
+    def count_creation_queries(self, items):
+        DriverProfileModel.objects.update(is_busy=False)
+        serializer = self.get_serializer(items)
+        self.assertTrue(serializer.is_valid())
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+        return len(queries)
+
+    def test_validation_queries(self):
+        """test that validating a cart makes the same number of queries whatever its size"""
+        self.assertEqual(self.count_validation_queries(self.items[:1]),
+                         self.count_validation_queries(self.items))
+
+    @skipUnlessDBFeature('can_return_rows_from_bulk_insert')
+    def test_creation_queries(self):
+        """test that creating an order makes the same number of queries whatever its size"""
+        self.assertEqual(self.count_creation_queries(self.items[:1]),
+                         self.count_creation_queries(self.items))
+
+    def test_created_order(self):
+        """test the saved items and prices of a created order"""
+        self.items[1]['quantity'] = 2
+        serializer = self.get_serializer(self.items[:2] + [{'product': self.items[0]['product'],
+                                                            'add_ons_sorts': [],
+                                                            'choices': self.items[0]['choices']}])
+        self.assertTrue(serializer.is_valid())
+        order = serializer.save()
+
+        items = OrderItemModel.objects.filter(item_group__order=order).order_by('pk')
+        self.assertEqual([item.price for item in items], [3.2 + 5, (3.2 + 5) * 2, 3.2])
+        self.assertEqual([item.get_item_price() for item in items], [item.price for item in items])
+        self.assertEqual(items[0].choices.count(), 2)
+        self.assertEqual(items[1].add_ons.count(), 1)
+        self.assertEqual(order.item_groups.get().items.count(), 3)
+        self.assertEqual(list(order.shops.all()), [self.shop])
+
+        self.assertAlmostEqual(order.subtotal, 8.2 * 3 + 3.2)
+        self.assertAlmostEqual(order.vat, order.subtotal * 0.14)
+        self.assertAlmostEqual(order.final_price, order.subtotal + order.vat)
+        self.assertEqual(ProductModel.objects.get(pk=self.items[0]['product']).num_sold, 2)
+        self.assertEqual(ProductModel.objects.get(pk=self.items[1]['product']).num_sold, 1)
+
+    def test_choices_sorts(self):
+        """test that the option groups and options of the choices are numbered together"""
+        serializer = self.get_serializer(self.items)
+        self.assertTrue(serializer.is_valid())
+        order = serializer.save()
+
+        choices = Choice.objects.filter(order_item__item_group__order=order).order_by('pk')
+        with self.assertNumQueries(1 + 2 * 20 + 2):  # the choices, their groups and options, and their sorts
+            data = ChoiceSerializer(choices, many=True).data
+        self.assertEqual([(choice['option_group']['sort'], choice['choosed_option']['sort']) for choice in data],
+                         [(1, 1), (2, 1)] * 10)
+
 class TestOrderAddress(TestCase):
     """Unittest for order address serializer"""
 
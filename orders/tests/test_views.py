@@ -8,7 +8,7 @@ from django.utils import timezone
 
 from drivers.models import DriverProfileModel
 from orders.models import OrderModel
-from shops.models import ShopProfileModel, ProductModel, ShopAddressModel
+from shops.models import ShopProfileModel, ProductModel, ShopAddressModel, AddOnModel
 from users.models import UserProfileModel
 
 
@@ -103,6 +103,43 @@ class TestOrders(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(json.loads(response.content)['orders']), 1)
 
+    def test_list_orders_by_cursor(self):
+        """test for paginating the orders list by keys"""
+        url = reverse('orders:orders-list')
+        user = User.objects.create(username='username', password='password')
+        user_profile = UserProfileModel.objects.create(account=user, phone_number=123)
+        self.client.force_login(user)
+
+        orders = [OrderModel.objects.create(user=user_profile, final_price=0, subtotal=0, delivery_fee=0, vat=0)
+                  for _ in range(5)]
+        OrderModel.objects.filter(pk__in=[order.pk for order in orders[:3]]).update(
+            ordered_at=timezone.now() - timezone.timedelta(hours=1))  # the same time, ordered by id
+        expected = [order.pk for order in orders[3:][::-1] + orders[:3][::-1]]
+
+        ids, cursor = [], ''
+        while cursor is not None:
+            response = self.client.get(url, {'cursor': cursor, 'limit': 2})
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            self.assertIsNone(data['count'])
+            self.assertNotIn('offset', data)
+            ids += [order['id'] for order in data['orders']]
+            cursor = data['next']
+        self.assertEqual(ids, expected)
+
+        response = self.client.get(url, {'cursor': '', 'count': 'exact'})
+        self.assertEqual(json.loads(response.content)['count'], 5)
+        response = self.client.get(url, {'cursor': '', 'count': 'approximate'})
+        self.assertEqual(json.loads(response.content)['count'], 5)  # small estimates are counted
+
+        # offset pagination is still used without a cursor
+        response = self.client.get(url, {'limit': 2, 'offset': 4})
+        self.assertEqual(json.loads(response.content)['count'], 5)
+        self.assertEqual(len(json.loads(response.content)['orders']), 1)
+
+        response = self.client.get(url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 404)
+
     def test_get_order(self):
         """test for orders get view"""
         url = reverse('orders:orders-detail', kwargs={'pk': 3})
@@ -246,6 +283,18 @@ class TestOrders(TestCase):
                                     content_type='application/json')
         self.assertEqual(response.status_code, 400)
 
+        # duplicate add-ons
+        AddOnModel.objects.create(product=self.product, title='add-on', added_price=2)  # the first, sort 1
+        response = self.client.post(url, {'shipping_address': {'area': 'area', 'type': 'A',
+                                                               'street': 'street', 'building': 'b',
+                                                               'location_longitude': 30,
+                                                               'location_latitude': 30},
+                                          'items': [{'product': self.product.pk,
+                                                     'add_ons_sorts': [1, 1]}]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(OrderModel.objects.filter(user__account=user3).count(), 1)
+
     def test_update_order(self):
         """test for orders update view"""
 
@@ -2,9 +2,9 @@
 
 from rest_framework import viewsets, status
 from rest_framework.generics import get_object_or_404
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 
+from koshkie.pagination import paginate
 from orders.models import OrderModel
 from orders.permissions import OrderPermissions
 from orders.serializers import OrderSerializer, OrderDetailSerializer
@@ -42,14 +42,11 @@ class OrderView(viewsets.ViewSet):
         if hasattr(request.user, 'shop_profile'):
             queryset = request.user.shop_profile.served_orders.all()  # this is a shop
 
-        paginator = LimitOffsetPagination()
-        paginator.default_limit = 15
-        paginator.max_limit = 100
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        serializer = OrderSerializer(paginated_queryset, many=True)
+        # newest first with a cursor, the id orders the ones made at the same time
+        page, pagination = paginate(queryset, request, ('-ordered_at', '-id'), default_limit=15)
+        serializer = OrderSerializer(page, many=True)
 
-        return Response(data={'limit': paginator.limit, 'offset': paginator.offset,
-                              'count': paginator.count, 'orders': serializer.data})
+        return Response(data=dict(pagination, orders=serializer.data))
 
     def retrieve(self, request, pk=None):
         """Retrieves a certain order from the user's list
@@ -1,9 +1,13 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 07/02/2020, 21:40
-
 import re
 
+from django.db import IntegrityError, transaction
 from django.template.defaultfilters import slugify
 
+default_app_config = 'shops.apps.ShopsConfig'
+
+SLUG_SUFFIX_LENGTH = 11  # the longest '-n' suffix a cut slug is expected to get
+
 
 def unique_slugify(instance, value, slug_field_name='slug', queryset=None,
                    slug_separator='-'):
@@ -17,13 +21,21 @@ def unique_slugify(instance, value, slug_field_name='slug', queryset=None,
     slug = _slug_strip(slug, slug_separator)
     original_slug = slug
 
-    if not queryset:
+    if queryset is None:
         queryset = instance.__class__.objects.all()
         if instance.pk:
             queryset = queryset.exclude(pk=instance.pk)
 
+    # gets every slug the new one may collide with in one query,
+    # the slugs cut to make room for their suffix start with prefix too
+    prefix = original_slug
+    if slug_len and len(prefix) > slug_len - SLUG_SUFFIX_LENGTH:
+        prefix = _slug_strip(prefix[:slug_len - SLUG_SUFFIX_LENGTH], slug_separator)
+    taken = set(queryset.filter(**{slug_field_name + '__startswith': prefix})
+                .values_list(slug_field_name, flat=True))
+
     next = 2
-    while not slug or queryset.filter(**{slug_field_name: slug}):
+    while not slug or slug in taken:
         slug = original_slug
         end = '-%s' % next
         if slug_len and len(slug) + len(end) > slug_len:
@@ -35,6 +47,63 @@ def unique_slugify(instance, value, slug_field_name='slug', queryset=None,
     setattr(instance, slug_field.attname, slug)
 
 
+class Slugged:
+    """A mixin for the models with a unique slug made from another field, the models
+    set slug_source to the name of that field and slug_parent to the name of the
+    foreign key the slug is unique in, if it isn't unique in the whole model.
+
+    The slug is only made again when the field changes, and if another
+    object takes the slug before the save the slug is made again.
+    slug_changed() tells the post_save receivers if the save changed the slug."""
+
+    slug_source = None
+    slug_parent = None
+    slug_retries = 3
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Slugged, cls).from_db(db, field_names, values)
+        instance._slugged_value = instance.__dict__.get(cls.slug_source)
+        instance._saved_slug = instance.__dict__.get('slug')
+        return instance
+
+    def slug_changed(self):
+        """returns whether the slug isn't the one read or last saved, it's
+        always true for the objects that weren't read from the database"""
+        return self.slug != getattr(self, '_saved_slug', None)
+
+    def slug_siblings(self):
+        """returns the objects the slug has to be unique in, without this one"""
+        queryset = type(self).objects.all()
+        if self.slug_parent:
+            parent_id = self.slug_parent + '_id'
+            queryset = queryset.filter(**{parent_id: getattr(self, parent_id)})
+        if self.pk:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
+    def save(self, *args, **kwargs):
+        value = getattr(self, self.slug_source)
+        if self.slug and value == getattr(self, '_slugged_value', None):
+            super(Slugged, self).save(*args, **kwargs)
+            self._saved_slug = self.slug
+            return
+
+        for attempt in range(self.slug_retries):
+            unique_slugify(self, value, queryset=self.slug_siblings())
+            try:
+                with transaction.atomic():
+                    super(Slugged, self).save(*args, **kwargs)
+            except IntegrityError:
+                # the error is raised again if it isn't about the slug
+                if attempt == self.slug_retries - 1 or not self.slug_siblings().filter(slug=self.slug).exists():
+                    raise
+            else:
+                self._slugged_value = value
+                self._saved_slug = self.slug
+                return
+
+
 def _slug_strip(value, separator=None):
     if separator == '-' or not separator:
         re_sep = '-'
@@ -1,5 +1,10 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:40
+
 from django.apps import AppConfig
 
 
 class ShopsConfig(AppConfig):
     name = 'shops'
+
+    def ready(self):
+        import shops.signals
@@ -0,0 +1,102 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 05:00
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+
+from shops.models import ShopProfileModel, ShopOpenIntervalModel
+
+MINUTES_IN_DAY = 24 * 60
+MINUTES_IN_WEEK = 7 * MINUTES_IN_DAY
+BATCH_SIZE = 500  # shops rebuilt at once
+
+_held = threading.local()
+
+
+def minute_of_week(moment=None):
+    """returns the minutes since monday midnight of a moment
+    in the current time zone, of now by default"""
+    moment = timezone.localtime(moment)
+    return moment.weekday() * MINUTES_IN_DAY + moment.hour * 60 + moment.minute
+
+
+def week_intervals(hours):
+    """returns the minutes of the week a shop with (weekday, opens_at, closes_at) hours
+    is open between, the hours that run past the end of the week are split in two"""
+    intervals = []
+    for weekday, opens_at, closes_at in hours:
+        opens_minute = weekday * MINUTES_IN_DAY + opens_at.hour * 60 + opens_at.minute
+        closes_minute = weekday * MINUTES_IN_DAY + closes_at.hour * 60 + closes_at.minute
+        if closes_minute == opens_minute:
+            continue
+        if closes_minute < opens_minute:  # closes the next day
+            closes_minute += MINUTES_IN_DAY
+        if closes_minute > MINUTES_IN_WEEK:
+            intervals.append((0, closes_minute - MINUTES_IN_WEEK))
+            closes_minute = MINUTES_IN_WEEK
+        intervals.append((opens_minute, closes_minute))
+    return intervals
+
+
+def shop_hours(shop):
+    """returns the (weekday, opens_at, closes_at) hours of a shop,
+    its opens_at and closes_at every day if it has no hours"""
+    to_time = ShopProfileModel._meta.get_field('opens_at').to_python  # the times may be set as datetimes
+    hours = [(hours.weekday, to_time(hours.opens_at), to_time(hours.closes_at)) for hours in shop.hours.all()]
+    if not hours:
+        hours = [(weekday, to_time(shop.opens_at), to_time(shop.closes_at)) for weekday in range(7)]
+    return hours
+
+
+def rebuild_open_intervals(shops):
+    """rebuilds the open intervals of shops from their hours and whether they are open now"""
+    now = minute_of_week()
+    shops = list(shops)
+    for start in range(0, len(shops), BATCH_SIZE):
+        batch = shops[start:start + BATCH_SIZE]
+        intervals = []
+        for shop in batch:
+            shop_intervals = week_intervals(shop_hours(shop))
+            shop.is_open_now = any(opens <= now < closes for opens, closes in shop_intervals)
+            intervals.extend(ShopOpenIntervalModel(shop=shop, opens_minute=opens, closes_minute=closes)
+                             for opens, closes in shop_intervals)
+
+        with transaction.atomic():
+            ShopOpenIntervalModel.objects.filter(shop__in=batch).delete()
+            ShopOpenIntervalModel.objects.bulk_create(intervals)
+            for is_open_now in (True, False):
+                shop_ids = [shop.pk for shop in batch if shop.is_open_now == is_open_now]
+                if shop_ids:
+                    ShopProfileModel.objects.filter(pk__in=shop_ids).update(is_open_now=is_open_now)
+
+
+def held_shops():
+    """returns the ids of the shops whose open intervals
+    the receivers don't rebuild in this thread"""
+    if not hasattr(_held, 'shop_ids'):
+        _held.shop_ids = set()
+    return _held.shop_ids
+
+
+@contextmanager
+def hold_open_intervals(shop_id):
+    """Keeps the receivers from rebuilding the open intervals of a shop
+    after every one of its hours is saved or deleted, while all of
+    them are replaced together. They are rebuilt once after by the caller."""
+    held_shops().add(shop_id)
+    try:
+        yield
+    finally:
+        held_shops().discard(shop_id)
+
+
+def refresh_open_shops(moment=None):
+    """opens the shops that are open at a moment, now by default, and closes
+    the others. returns the number of shops opened and the number closed"""
+    minute = minute_of_week(moment)
+    open_shops = ShopOpenIntervalModel.objects.filter(opens_minute__lte=minute,
+                                                      closes_minute__gt=minute).values('shop')
+    opened = ShopProfileModel.objects.filter(is_open_now=False, pk__in=open_shops).update(is_open_now=True)
+    closed = ShopProfileModel.objects.filter(is_open_now=True).exclude(pk__in=open_shops).update(is_open_now=False)
+    return opened, closed
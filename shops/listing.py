@@ -0,0 +1,88 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 04:00
+import hashlib
+import math
+
+from django.conf import settings
+
+from koshkie import nearby
+from koshkie.caching import VersionedCache, settings_singleton
+from shops.models import ShopProfileModel
+from shops.search import get_shop_search
+from shops.serializers import ShopProfileSerializer
+
+
+def open_shops_near(latitude, longitude):
+    """returns the open shops near a location, nearest first"""
+    queryset = ShopProfileModel.objects.filter(is_active=True, is_open=True, is_open_now=True)
+    return nearby(queryset, latitude, longitude, 2.5,
+                  'address__location_latitude', 'address__location_longitude')
+
+
+def build_shops_list(latitude, longitude, shop_type, search, limit, offset):
+    """returns a page of the serialized open shops near a location with
+    their count, of a type and matching a search if they are given"""
+    queryset = ShopProfileSerializer.setup_eager_loading(open_shops_near(latitude, longitude))
+    if shop_type:
+        queryset = queryset.filter(shop_type__iexact=shop_type)
+    if search:
+        queryset = get_shop_search().search(queryset, search)
+
+    count = queryset.count()
+    shops = queryset[offset:offset + limit] if count and offset < count else []
+    return {'limit': limit, 'offset': offset, 'count': count,
+            'shops': ShopProfileSerializer(shops, many=True).data}
+
+
+class ShopsListCache(VersionedCache):
+    """Keeps the lists of the shops near the users in a django cache.
+
+    The map is divided into cells of cell_size degrees and the users in
+    a cell get the list of its center, so everyone within a few hundred
+    meters reads the same cached list.
+
+    Every list key has the version of the lists, which writing a shop,
+    its address or its tags bumps, and so does the tick_open_shops
+    command when any shop opens or closes. The ratings and offers
+    of the shops are only as fresh as the timeout of the lists.
+    """
+
+    key_prefix = 'shops'
+
+    def __init__(self, cache_alias='default', cell_size=0.002, timeout=60):
+        super(ShopsListCache, self).__init__(cache_alias=cache_alias, timeout=timeout)
+        self.cell_size = cell_size
+
+    def cell(self, latitude, longitude):
+        """returns the cell of a location"""
+        return math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size)
+
+    def get(self, latitude, longitude, shop_type, search, limit, offset):
+        """returns the list of the cell of a location, built and cached if it isn't cached yet"""
+        version = self.version()
+        row, column = self.cell(latitude, longitude)
+        key = '%s:%s:%s:%s:%s:%s:%s:%s' % (self.key_prefix, version, row, column,
+                                           (shop_type or '').lower(), limit, offset, search or '')
+        if len(key) > 200 or any(ord(character) < 33 or ord(character) > 126 for character in key):
+            key = '%s:%s:%s' % (self.key_prefix, version, hashlib.md5(key.encode()).hexdigest())
+
+        return self.get_or_build(key, build_shops_list, (row + 0.5) * self.cell_size,
+                                 (column + 0.5) * self.cell_size, shop_type, search, limit, offset)
+
+
+@settings_singleton('SHOPS_LIST_CACHE')
+def get_shops_list_cache():
+    """Returns the shops lists cache configured in
+    the SHOPS_LIST_CACHE settings or None if it's disabled"""
+    if settings.SHOPS_LIST_CACHE:
+        return ShopsListCache(cache_alias=settings.SHOPS_LIST_CACHE, cell_size=settings.SHOPS_LIST_CACHE_CELL,
+                              timeout=settings.SHOPS_LIST_CACHE_TIMEOUT)
+    return None
+
+
+def get_shops_list(latitude, longitude, shop_type, search, limit, offset):
+    """returns a page of the shops near a location from the shops lists cache if it's enabled"""
+    cache = get_shops_list_cache()
+    if cache is None:
+        return build_shops_list(latitude, longitude, shop_type, search, limit, offset)
+    return cache.get(latitude, longitude, shop_type, search, limit, offset)
+
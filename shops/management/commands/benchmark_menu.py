@@ -0,0 +1,81 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:40
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from shops.menu import get_menu_cache
+from shops.models import (ShopProfileModel, ProductGroupModel, ProductModel, AddOnModel,
+                          OptionGroupModel, OptionModel)
+from shops.views import ProductView
+
+
+class Command(BaseCommand):
+    """Django command to compare the latency of the shop menu
+    endpoint when the menu is built and when it's cached.
+
+    The shop and its menu are created inside
+    a transaction that is rolled back at the end.
+    """
+
+    help = 'Benchmarks the shop menu endpoint with a cold and a warm menus cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--products', type=int, default=10,
+                            help='number of products in every group')
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--cache', default='default',
+                            help='the django cache the menus are kept in')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        view = ProductView.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+
+        with override_settings(MENU_CACHE=options['cache']), transaction.atomic():
+            shop = self.seed(options['groups'], options['products'])
+            menu_cache = get_menu_cache()
+            self.stdout.write('%8s %10s %15s %15s' % ('cache', 'queries', 'average (ms)', 'max (ms)'))
+
+            for mode in ('cold', 'warm'):
+                times = []
+                for _ in range(options['requests']):
+                    if mode == 'cold':
+                        menu_cache.bump(shop.slug)
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        view(factory.get('/shops/%s/products/' % shop.slug), shop_slug=shop.slug).render()
+                        times.append(time.perf_counter() - start)
+                self.stdout.write('%8s %10d %15.3f %15.3f' % (mode, len(queries), sum(times) / len(times) * 1000,
+                                                              max(times) * 1000))
+
+            self.stdout.write('hit rate: %.2f' % menu_cache.stats()['hit_rate'])
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def seed(groups, products):
+        """creates a shop with a menu of groups * products products"""
+        now = timezone.now()
+        shop = ShopProfileModel.objects.create(account=User.objects.create(username='benchmark-shop'),
+                                               profile_photo='benchmark.jpg', cover_photo='benchmark.jpg',
+                                               phone_number=123, description='text', shop_type='F',
+                                               name='benchmark shop', currency='$', delivery_fee=5,
+                                               opens_at=(now - timezone.timedelta(hours=1)).time(),
+                                               closes_at=(now + timezone.timedelta(hours=1)).time(),
+                                               time_to_prepare=20, vat=14, is_active=True)
+        for i in range(groups):
+            group = ProductGroupModel.objects.create(shop=shop, title='group %d' % i)
+            for j in range(products):
+                product = ProductModel.objects.create(shop=shop, product_group=group, photo='benchmark.jpg',
+                                                      title='product %d %d' % (i, j), price=10,
+                                                      description='text', num_sold=j)
+                AddOnModel.objects.create(product=product, title='add-on', added_price=2)
+                option_group = OptionGroupModel.objects.create(product=product, title='size',
+                                                               changes_price=bool(j % 2))
+                OptionModel.objects.create(option_group=option_group, title='large', price=15 if j % 2 else 0)
+        return shop
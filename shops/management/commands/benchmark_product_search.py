@@ -0,0 +1,94 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 03:00
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from shops.listing import open_shops_near
+from shops.management.commands.benchmark_shop_search import (Command as ShopSearchCommand, CENTER_LATITUDE,
+                                                              CENTER_LONGITUDE, BATCH_SIZE)
+from shops.models import ShopProfileModel, ProductModel
+from shops.search import get_product_search
+from shops.views import product_search
+
+TITLES = ('burger', 'pizza', 'chicken', 'cheese', 'fries', 'salad', 'soup', 'cake', 'juice', 'coffee',
+          'shawarma', 'koshary', 'pasta', 'rice', 'fish', 'steak', 'sandwich', 'wrap', 'tea', 'water')
+DESCRIPTION = ('with', 'spicy', 'sauce', 'fresh', 'large', 'small', 'double', 'grilled', 'fried', 'beef',
+               'tomato', 'garlic', 'onion', 'lemon', 'sugar', 'milk', 'cream', 'honey', 'mushroom', 'olive')
+
+
+def icontains_search(text, limit):
+    """the products of the nearby shops with the text in their titles or descriptions"""
+    shops = open_shops_near(CENTER_LATITUDE, CENTER_LONGITUDE)
+    return list(ProductModel.objects.filter(Q(title__icontains=text) | Q(description__icontains=text),
+                                            shop__in=shops.values('pk'), is_available=True)
+                .select_related('shop')[:limit])
+
+
+class Command(BaseCommand):
+    """Django command to time the products search endpoint over the
+    products of the shops near a location, against filtering them
+    with icontains.
+
+    The shops and products are created inside a transaction that is rolled back at the end.
+    """
+
+    help = 'Benchmarks the products search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=2000)
+        parser.add_argument('--products', type=int, default=25, help='products of every shop')
+        parser.add_argument('--texts', nargs='+', default=['burger', 'chick', 'spicy beef', 'pizza garlic', 'xyz'])
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--runs', type=int, default=10)
+        parser.add_argument('--backend', default=None,
+                            help='the search backend, the one that fits the database by default')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        factory = APIRequestFactory()
+        with override_settings(PRODUCTS_SEARCH_BACKEND=options['backend']), transaction.atomic():
+            ShopSearchCommand.seed(options['shops'])
+            self.seed(options['products'])
+            search = get_product_search()
+            start = time.perf_counter()
+            search.rebuild()
+            self.stdout.write('%d products, %s built in %.3f ms' % (
+                ProductModel.objects.count(), type(search).__name__, (time.perf_counter() - start) * 1000))
+
+            self.stdout.write('%14s %10s %16s %16s' % ('text', 'found', 'icontains (ms)', 'endpoint (ms)'))
+            for text in options['texts']:
+                request = factory.get('/shops/products/', {'latitude': CENTER_LATITUDE, 'search': text,
+                                                           'longitude': CENTER_LONGITUDE,
+                                                           'limit': options['limit']})
+                times = []
+                for function in (lambda: icontains_search(text, options['limit']),
+                                 lambda: product_search(request)):
+                    start = time.perf_counter()
+                    for _ in range(options['runs']):
+                        response = function()
+                    times.append((time.perf_counter() - start) / options['runs'])
+                self.stdout.write('%14s %10d %16.3f %16.3f' % (text, len(response.data['products']),
+                                                               times[0] * 1000, times[1] * 1000))
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def seed(size):
+        """creates size products with random titles and descriptions in every shop"""
+        generator = random.Random(0)
+        products = []
+        for shop_id in ShopProfileModel.objects.filter(slug__startswith='benchmark-').values_list('pk', flat=True):
+            for i in range(size):
+                title = ' '.join(generator.sample(TITLES, 2)).title()
+                products.append(ProductModel(shop_id=shop_id, photo='benchmark.jpg', title=title,
+                                             slug='product-%d' % i, price=generator.randint(5, 100),
+                                             description=' '.join(generator.sample(DESCRIPTION, 6))))
+        ProductModel.objects.bulk_create(products, batch_size=BATCH_SIZE)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:  # the plans come from the statistics
+                cursor.execute('ANALYZE %s' % ProductModel._meta.db_table)
@@ -0,0 +1,82 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 13:20
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from koshkie.ordering import RANK_STEP
+from shops.models import ShopProfileModel, ProductModel, AddOnModel
+
+
+class Command(BaseCommand):
+    """Django command to measure moving the add-ons of a product,
+    every move only writes the rank of the moved add-on until the
+    gap it moves into runs out and the product's add-ons are respaced.
+
+    The product and its add-ons are created inside
+    a transaction that is rolled back at the end.
+    """
+
+    help = 'Benchmarks reordering the add-ons of a product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=500,
+                            help='number of add-ons of the product')
+        parser.add_argument('--crowd', type=int, default=40,
+                            help='moves into the same gap, to count the respacing')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        size = options['size']
+        moves = (('first to last', 1, size), ('last to first', size, 1),
+                 ('middle down one', size // 2, size // 2 + 1))
+
+        with transaction.atomic():
+            product = self.seed(size)
+            self.stdout.write('%16s %10s %10s' % ('move', 'queries', 'ms'))
+            for name, old_sort, new_sort in moves:
+                queries, seconds = self.measure(product, old_sort, new_sort)
+                self.stdout.write('%16s %10d %10.3f' % (name, queries, seconds * 1000))
+
+            # moving the last add-on to the second sort again and again halves
+            # the same gap every time, until it's respaced
+            counts = []
+            for _ in range(options['crowd']):
+                counts.append(self.measure(product, size, 2, back=False)[0])
+            self.stdout.write('%d moves into the same gap: %d queries at most, %.2f on average '
+                              '(a gap of %d halves %d times before the respacing)'
+                              % (len(counts), max(counts), sum(counts) / len(counts),
+                                 RANK_STEP, RANK_STEP.bit_length() - 1))
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def measure(product, old_sort, new_sort, back=True):
+        """returns the queries and time taken to move an add-on (and back)"""
+        moves = ((old_sort, new_sort), (new_sort, old_sort)) if back else ((old_sort, new_sort),)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for sort, to in moves:
+                add_on = product.add_ons.all()[sort - 1]
+                add_on.move_to(to)
+                add_on.save()
+            return len(queries) // len(moves), (time.perf_counter() - start) / len(moves)
+
+    @staticmethod
+    def seed(size):
+        """creates a product with size add-ons"""
+        now = timezone.now()
+        shop = ShopProfileModel.objects.create(account=User.objects.create(username='benchmark-shop'),
+                                               profile_photo='benchmark.jpg', cover_photo='benchmark.jpg',
+                                               phone_number=123, description='text', shop_type='F',
+                                               name='benchmark shop', currency='$', delivery_fee=5,
+                                               opens_at=(now - timezone.timedelta(hours=1)).time(),
+                                               closes_at=(now + timezone.timedelta(hours=1)).time(),
+                                               time_to_prepare=20, vat=14, is_active=True)
+        product = ProductModel.objects.create(shop=shop, photo='benchmark.jpg', title='product',
+                                              price=10, description='text', is_offer=True)
+        AddOnModel.objects.bulk_create([AddOnModel(product=product, title='add-on %d' % i, added_price=1,
+                                                   rank=(i + 1) * RANK_STEP) for i in range(size)])
+        return product
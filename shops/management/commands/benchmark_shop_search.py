@@ -0,0 +1,107 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 02:00
+import datetime
+import random
+import time
+from itertools import chain
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from koshkie import nearby
+from shops.models import ShopProfileModel, ShopAddressModel, ShopTagsModel
+from shops.search import get_shop_search
+
+CENTER_LATITUDE = 30.0444  # Cairo
+CENTER_LONGITUDE = 31.2357
+SPREAD = 0.015  # degrees around the center the shops are spread in, all are near the center
+WORDS = ('pizza', 'burger', 'koshary', 'sushi', 'grill', 'cafe', 'house', 'king', 'palace', 'express',
+         'fish', 'chicken', 'bakery', 'juice', 'shawarma', 'pharmacy', 'market', 'sweets')
+TAGS = ('food', 'fast food', 'healthy', 'desserts', 'drinks', 'groceries', 'seafood', 'vegan')
+BATCH_SIZE = 500  # rows inserted at once, sqlite can't take more
+
+
+def chain_search(queryset, text):
+    """the search as it used to be done, two icontains queries chained in python"""
+    return list(chain(queryset.filter(name__icontains=text),
+                      queryset.filter(tags__tag__icontains=text).exclude(name__icontains=text)))
+
+
+class Command(BaseCommand):
+    """Django command to compare searching the nearby shops with the
+    search backends and with the two chained icontains queries,
+    reading the first page of 25 shops like the shops list.
+
+    The shops are created inside a transaction that is rolled back at the end.
+    """
+
+    help = 'Benchmarks the shops search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=50000)
+        parser.add_argument('--texts', nargs='+', default=['pizza', 'piza', 'vegan', 'king house', 'xyz'])
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--backend', default=None,
+                            help='the search backend, the one that fits the database by default')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with override_settings(SHOPS_SEARCH_BACKEND=options['backend']), transaction.atomic():
+            self.seed(options['shops'])
+            search = get_shop_search()
+            start = time.perf_counter()
+            search.rebuild()
+            self.stdout.write('%s, built in %.3f ms' % (type(search).__name__,
+                                                        (time.perf_counter() - start) * 1000))
+
+            queryset = nearby(ShopProfileModel.objects.filter(is_active=True), CENTER_LATITUDE,
+                              CENTER_LONGITUDE, 2.5, 'address__location_latitude', 'address__location_longitude')
+            self.stdout.write('%12s %10s %15s %15s' % ('text', 'found', 'chained (ms)', 'search (ms)'))
+            for text in options['texts']:
+                times = []
+                for function in (lambda: chain_search(queryset, text)[:25],
+                                 lambda: (search.search(queryset, text).count(),
+                                          list(search.search(queryset, text)[:25]))):
+                    start = time.perf_counter()
+                    for _ in range(options['runs']):
+                        function()
+                    times.append((time.perf_counter() - start) / options['runs'])
+                self.stdout.write('%12s %10d %15.3f %15.3f' % (text, search.search(queryset, text).count(),
+                                                               times[0] * 1000, times[1] * 1000))
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def seed(size):
+        """creates size shops near the center with random names and tags"""
+        generator = random.Random(0)
+        accounts = User.objects.bulk_create([User(username='benchmark-shop-%d' % i) for i in range(size)],
+                                            batch_size=BATCH_SIZE)
+        if accounts[0].pk is None:  # the database doesn't return the ids
+            accounts = list(User.objects.filter(username__startswith='benchmark-shop-').order_by('pk'))
+
+        shops = []
+        for i, account in enumerate(accounts):
+            name = '%s %s %d' % (generator.choice(WORDS).title(), generator.choice(WORDS).title(), i)
+            shops.append(ShopProfileModel(account=account, profile_photo='benchmark.jpg',
+                                          cover_photo='benchmark.jpg', phone_number=123, description='text',
+                                          shop_type='F', name=name, slug='benchmark-%d' % i, currency='$',
+                                          delivery_fee=5, opens_at=datetime.time(0, 0),
+                                          closes_at=datetime.time(23, 59), time_to_prepare=20, is_active=True,
+                                          is_open_now=True))  # open for the whole benchmark
+        shops = ShopProfileModel.objects.bulk_create(shops, batch_size=BATCH_SIZE)
+        if shops[0].pk is None:
+            shops = list(ShopProfileModel.objects.filter(slug__startswith='benchmark-').order_by('pk'))
+
+        ShopAddressModel.objects.bulk_create([
+            ShopAddressModel(shop=shop, area='area', street='street', building='building',
+                             location_latitude=CENTER_LATITUDE + generator.uniform(-SPREAD, SPREAD),
+                             location_longitude=CENTER_LONGITUDE + generator.uniform(-SPREAD, SPREAD))
+            for shop in shops], batch_size=BATCH_SIZE)
+        ShopTagsModel.objects.bulk_create([ShopTagsModel(shop=shop, tag=tag) for shop in shops
+                                           for tag in generator.sample(TAGS, 2)], batch_size=BATCH_SIZE)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:  # the plans come from the statistics
+                for model in (User, ShopProfileModel, ShopAddressModel, ShopTagsModel):
+                    cursor.execute('ANALYZE %s' % model._meta.db_table)
@@ -0,0 +1,73 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 04:30
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from shops.listing import get_shops_list_cache
+from shops.management.commands.benchmark_shop_search import (Command as ShopSearchCommand, CENTER_LATITUDE,
+                                                              CENTER_LONGITUDE, SPREAD)
+from shops.models import ShopProfileModel
+from shops.views import ShopProfileView
+
+
+def percentile(times, fraction):
+    """the time fraction of the sorted times are faster than"""
+    return times[min(int(len(times) * fraction), len(times) - 1)]
+
+
+class Command(BaseCommand):
+    """Django command to load the nearby shops list with users
+    spread around the shops, without and with the shops lists cache,
+    saving a shop every few requests to make the cached lists stale.
+
+    The shops are created inside a transaction that is rolled back at the end.
+    """
+
+    help = 'Benchmarks the nearby shops list with and without the shops lists cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--writes', type=int, default=2500,
+                            help='requests between two saves of a shop, 0 never saves')
+        parser.add_argument('--cache', default=None,
+                            help='the django cache the lists are kept in, a large memory cache by default')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        view = ShopProfileView.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+
+        caches = dict(settings.CACHES, benchmark={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                                  'OPTIONS': {'MAX_ENTRIES': 100000}})
+        with override_settings(CACHES=caches), transaction.atomic():
+            ShopSearchCommand.seed(options['shops'])
+            shop = ShopProfileModel.objects.filter(slug__startswith='benchmark-').first()
+            self.stdout.write('%8s %10s %12s %12s' % ('cache', 'hit rate', 'p50 (ms)', 'p99 (ms)'))
+
+            for cache in (None, options['cache'] or 'benchmark'):
+                generator = random.Random(0)  # the same users for both
+                with override_settings(SHOPS_LIST_CACHE=cache):
+                    times = []
+                    for i in range(options['requests']):
+                        if options['writes'] and i % options['writes'] == options['writes'] - 1:
+                            shop.save()
+                        request = factory.get('/shops/', {
+                            'latitude': CENTER_LATITUDE + generator.uniform(-SPREAD, SPREAD),
+                            'longitude': CENTER_LONGITUDE + generator.uniform(-SPREAD, SPREAD),
+                            'type': generator.choice(('', 'F')), 'offset': generator.choice((0, 0, 0, 25))})
+                        start = time.perf_counter()
+                        view(request).render()
+                        times.append(time.perf_counter() - start)
+
+                    times.sort()
+                    hit_rate = get_shops_list_cache().stats()['hit_rate'] if cache else 0
+                    self.stdout.write('%8s %10.2f %12.3f %12.3f' % (cache or 'none', hit_rate,
+                                                                    percentile(times, 0.5) * 1000,
+                                                                    percentile(times, 0.99) * 1000))
+            transaction.set_rollback(True)
@@ -0,0 +1,73 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 05:30
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.template.defaultfilters import slugify
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from shops.models import ShopProfileModel, ProductModel
+
+
+def loop_slugify(queryset, title):
+    """the slug as it used to be made, a query for every suffix,
+    returns the slug and the number of queries it took"""
+    slug = original_slug = slugify(title)
+    next = 2
+    while queryset.filter(slug=slug):
+        slug = '%s-%d' % (original_slug, next)
+        next += 1
+    return slug, next - 1
+
+
+class Command(BaseCommand):
+    """Django command to time creating many products with the same title
+    in a shop, against making their slugs with a query for every suffix.
+
+    The shop and its products are created inside a transaction that is rolled back at the end.
+    """
+
+    help = 'Benchmarks making the slugs of products with the same title'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--title', default='Pizza')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            now = timezone.now()
+            shop = ShopProfileModel.objects.create(account=User.objects.create(username='benchmark-shop'),
+                                                   profile_photo='benchmark.jpg', cover_photo='benchmark.jpg',
+                                                   phone_number=123, description='text', shop_type='F',
+                                                   name='benchmark shop', currency='$', delivery_fee=5,
+                                                   opens_at=(now - timezone.timedelta(hours=1)).time(),
+                                                   closes_at=(now + timezone.timedelta(hours=1)).time(),
+                                                   time_to_prepare=20, vat=14, is_active=True)
+            self.stdout.write('%10s %12s %10s %14s %14s' % ('products', 'create (ms)', 'queries',
+                                                            'loop slug (ms)', 'loop queries'))
+
+            checkpoints = {10 ** power for power in range(1, 7)} | {options['products']}
+            total = time.perf_counter()
+            for i in range(1, options['products'] + 1):
+                product = ProductModel(shop=shop, photo='benchmark.jpg', title=options['title'],
+                                       price=10, description='text')
+                if i not in checkpoints:
+                    product.save()
+                    continue
+
+                reset_queries()  # the queries log is limited
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    product.save()
+                    create_time = time.perf_counter() - start
+                start = time.perf_counter()
+                _, loop_queries = loop_slugify(product.slug_siblings(), options['title'])
+                loop_time = time.perf_counter() - start
+                self.stdout.write('%10d %12.3f %10d %14.3f %14d' % (i, create_time * 1000, len(queries),
+                                                                    loop_time * 1000, loop_queries))
+
+            self.stdout.write('created %d products in %.3f s' % (options['products'], time.perf_counter() - total))
+            transaction.set_rollback(True)
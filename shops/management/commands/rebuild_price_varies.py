@@ -0,0 +1,33 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:55
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from shops.models import ProductModel, price_varies
+
+
+class Command(BaseCommand):
+    """Django command to find the products whose price_varies flag
+    doesn't match their option groups and fix it"""
+
+    help = 'Rebuilds the price_varies flag of the products from their option groups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="only reports the drifted products and fails if there are any")
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        drifted = ProductModel.objects.annotate(actual=price_varies()).filter(
+            Q(price_varies=True, actual=False) | Q(price_varies=False, actual=True))
+        drifted_ids = list(drifted.values_list('pk', flat=True))
+
+        self.stdout.write('%d products drifted' % len(drifted_ids))
+        for product in ProductModel.objects.filter(pk__in=drifted_ids[:10]):
+            self.stdout.write('  %s (pk %d): price_varies is %s' % (product, product.pk, product.price_varies))
+
+        if options['check']:
+            if drifted_ids:
+                raise CommandError('%d products have a wrong price_varies' % len(drifted_ids))
+        else:
+            ProductModel.objects.filter(pk__in=drifted_ids).update(price_varies=price_varies())
+        self.stdout.write(self.style.SUCCESS('price_varies is up to date'))
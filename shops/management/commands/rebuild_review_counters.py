@@ -0,0 +1,35 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:10
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from drivers.models import DriverProfileModel
+from koshkie.ratings import rebuild_counters
+from shops.models import ShopProfileModel, ProductModel
+
+
+class Command(BaseCommand):
+    """Django command to recount the reviews and stars of the shops,
+    products and drivers and fix the stored counters that drifted"""
+
+    help = 'Rebuilds the review counters and ratings from the reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="only reports the drifted counters and fails if there are any")
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        total = 0
+        for model in (ShopProfileModel, ProductModel, DriverProfileModel):
+            with transaction.atomic():
+                drifted = rebuild_counters(model, save=not options['check'])
+            total += len(drifted)
+            self.stdout.write('%s: %d drifted' % (model._meta.verbose_name, len(drifted)))
+            for instance in drifted[:10]:
+                self.stdout.write('  %s (pk %d): %d reviews, %s stars' % (instance, instance.pk,
+                                                                         instance.reviews_count,
+                                                                         instance.stars_sum))
+
+        if options['check'] and total:
+            raise CommandError('%d review counters drifted' % total)
+        self.stdout.write(self.style.SUCCESS('Review counters are up to date'))
@@ -0,0 +1,58 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 05:00
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from shops.hours import BATCH_SIZE, rebuild_open_intervals, refresh_open_shops
+from shops.listing import get_shops_list_cache
+from shops.models import ShopProfileModel
+
+
+class Command(BaseCommand):
+    """Django command to open the shops whose hours started and close the
+    shops whose hours ended, meant to be run every minute by a scheduler
+    (cron or celery beat), or left running with --loop as the open_shops
+    service of docker-compose does.
+
+    The cached shops lists are made stale when any shop opens or closes.
+    """
+
+    help = 'Refreshes which shops are open now'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='rebuilds the open intervals of all the shops from their hours first')
+        parser.add_argument('--loop', action='store_true',
+                            help='keeps refreshing at the start of every minute')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if options['rebuild']:
+            self.rebuild()
+        self.tick(options['rebuild'])
+
+        while options['loop']:
+            time.sleep(60 - time.time() % 60)
+            close_old_connections()  # reconnects after the database went away
+            try:
+                self.tick()
+            except DatabaseError as error:  # the next minute tries again
+                self.stderr.write('Refreshing the open shops failed: %s' % error)
+
+    def rebuild(self):
+        shops = ShopProfileModel.objects.prefetch_related('hours').order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(shops.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not batch:
+                break
+            rebuild_open_intervals(batch)
+            last_pk = batch[-1].pk
+
+    def tick(self, rebuilt=False):
+        opened, closed = refresh_open_shops()
+        cache = get_shops_list_cache()
+        if cache is not None and (rebuilt or opened or closed):
+            cache.bump()
+        self.stdout.write(self.style.SUCCESS('%d shops opened, %d closed' % (opened, closed)))
@@ -0,0 +1,72 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:40
+from django.conf import settings
+
+from koshkie.caching import VersionedCache, settings_singleton
+from shops.models import ProductGroupModel, ProductModel
+from shops.serializers import ProductGroupSerializer, ProductSerializer
+
+
+def build_menu(shop_slug, groups=True):
+    """returns the serialized offers, best selling products
+    and product groups of a shop, without the groups if groups is false"""
+    best_selling_queryset = ProductModel.objects.filter(shop__slug=shop_slug, is_available=True,
+                                                        num_sold__gt=0).order_by('num_sold')
+    offers_queryset = ProductModel.objects.filter(shop__slug=shop_slug, is_offer=True,
+                                                  is_available=True)
+
+    menu = {'offers': ProductSerializer(offers_queryset, many=True).data,
+            'best_selling': ProductSerializer(best_selling_queryset[:5], many=True).data}
+    if groups:
+        groups_queryset = ProductGroupModel.objects.filter(shop__slug=shop_slug)
+        menu['groups'] = ProductGroupSerializer(groups_queryset, many=True).data
+    return menu
+
+
+class MenuCache(VersionedCache):
+    """Keeps the serialized menus of the shops in a django cache.
+
+    Every shop has a menu version in the cache which is part of its
+    menu key, writing any part of a menu bumps the version so the old
+    menu is never read again.
+
+    The number of reviews, the ratings and the sold counts are changed
+    with UPDATE queries that don't bump the version, so they are only
+    as fresh as the timeout of the menus.
+    """
+
+    key_prefix = 'menu'
+
+    def __init__(self, cache_alias='default', timeout=300):
+        super(MenuCache, self).__init__(cache_alias=cache_alias, timeout=timeout)
+
+    def _menu_key(self, shop_slug, version):
+        return '%s:%s:%s' % (self.key_prefix, shop_slug, version)
+
+    def get(self, shop_slug):
+        """returns the menu of a shop, built and cached if it isn't cached yet"""
+        return self.get_or_build(self._menu_key(shop_slug, self.version(shop_slug)), build_menu, shop_slug)
+
+
+@settings_singleton('MENU_CACHE')
+def get_menu_cache():
+    """Returns the menus cache configured in
+    the MENU_CACHE settings or None if it's disabled"""
+    if settings.MENU_CACHE:
+        return MenuCache(cache_alias=settings.MENU_CACHE, timeout=settings.MENU_CACHE_TIMEOUT)
+    return None
+
+
+def get_menu(shop_slug, paginator, request):
+    """returns the menu of a shop with the page of its groups the paginator takes from
+    the request, from the menus cache if it's enabled. without the cache only the
+    groups of the page are serialized"""
+    cache = get_menu_cache()
+    if cache is not None:
+        menu = cache.get(shop_slug)
+        return dict(menu, groups=paginator.paginate_queryset(menu['groups'], request))
+
+    menu = build_menu(shop_slug, groups=False)
+    page = paginator.paginate_queryset(ProductGroupModel.objects.filter(shop__slug=shop_slug), request)
+    menu['groups'] = ProductGroupSerializer(page, many=True).data
+    return menu
+
@@ -0,0 +1,22 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 16:17
+
+# Generated by Django 3.0.7 on 2026-10-18 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('shops', '0002_shopprofilemodel_cover_photo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shopaddressmodel',
+            index=models.Index(fields=['location_latitude', 'location_longitude'], name='shop_address_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopprofilemodel',
+            index=models.Index(fields=['is_active', 'is_open'], name='shop_active_open_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:55
+
+# Generated by Django 3.0.7 on 2026-10-18 23:55
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def set_price_varies(apps, schema_editor):
+    product_model = apps.get_model('shops', 'ProductModel')
+    option_group_model = apps.get_model('shops', 'OptionGroupModel')
+    product_model.objects.update(price_varies=Exists(option_group_model.objects.filter(product=OuterRef('pk'),
+                                                                                       changes_price=True)))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('shops', '0004_review_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productmodel',
+            name='price_varies',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(set_price_varies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,153 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 00:30
+
+# Generated by Django 3.0.7 on 2026-10-19 00:30
+
+from django.db import migrations, models
+from django.db.models import F
+
+RANK_STEP = 1 << 16  # koshkie.ordering.RANK_STEP when this migration was written
+
+# model name -> its parent foreign key
+RANKED_MODELS = {'ProductGroupModel': 'shop', 'OptionGroupModel': 'product',
+                 'OptionModel': 'option_group', 'AddOnModel': 'product'}
+
+
+def renumber(apps, step):
+    """sets the ranks of the items of every parent step apart, keeping their order"""
+    for model_name, parent in RANKED_MODELS.items():
+        model = apps.get_model('shops', model_name)
+        items = model.objects.order_by(parent + '_id', F('rank').asc(nulls_last=True),
+                                       'pk').only('pk', parent, 'rank')
+        position, last_parent = 0, None
+        for item in items:
+            parent_id = getattr(item, parent + '_id')
+            position = position + 1 if parent_id == last_parent else 1
+            last_parent = parent_id
+            item.rank = position * step
+        model.objects.bulk_update(items, ['rank'], batch_size=1000)
+
+
+def sparse_ranks(apps, schema_editor):
+    renumber(apps, RANK_STEP)
+
+
+def dense_sorts(apps, schema_editor):
+    renumber(apps, 1)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('shops', '0005_product_price_varies'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='productgroupmodel',
+            unique_together={('shop', 'title')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='optiongroupmodel',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='optionmodel',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='addonmodel',
+            unique_together=set(),
+        ),
+        migrations.RenameField(
+            model_name='productgroupmodel',
+            old_name='sort',
+            new_name='rank',
+        ),
+        migrations.RenameField(
+            model_name='optiongroupmodel',
+            old_name='sort',
+            new_name='rank',
+        ),
+        migrations.RenameField(
+            model_name='optionmodel',
+            old_name='sort',
+            new_name='rank',
+        ),
+        migrations.RenameField(
+            model_name='addonmodel',
+            old_name='sort',
+            new_name='rank',
+        ),
+        migrations.AlterField(
+            model_name='productgroupmodel',
+            name='rank',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='optiongroupmodel',
+            name='rank',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='optionmodel',
+            name='rank',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='addonmodel',
+            name='rank',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(sparse_ranks, dense_sorts),
+        migrations.AlterField(
+            model_name='productgroupmodel',
+            name='rank',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='optiongroupmodel',
+            name='rank',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='optionmodel',
+            name='rank',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='addonmodel',
+            name='rank',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterModelOptions(
+            name='addonmodel',
+            options={'ordering': ['rank']},
+        ),
+        migrations.AlterModelOptions(
+            name='optiongroupmodel',
+            options={'ordering': ['rank']},
+        ),
+        migrations.AlterModelOptions(
+            name='optionmodel',
+            options={'ordering': ['rank']},
+        ),
+        migrations.AlterModelOptions(
+            name='productgroupmodel',
+            options={'ordering': ['rank']},
+        ),
+        migrations.AlterUniqueTogether(
+            name='productgroupmodel',
+            unique_together={('shop', 'rank'), ('shop', 'title')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='optiongroupmodel',
+            unique_together={('product', 'rank')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='optionmodel',
+            unique_together={('option_group', 'rank')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='addonmodel',
+            unique_together={('product', 'rank')},
+        ),
+    ]
@@ -0,0 +1,43 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 02:00
+
+# Generated by Django 3.0.7 on 2026-10-19 02:00
+
+from django.db import migrations
+
+# the trigram indexes only exist on postgres, icontains compares UPPER() of
+# the columns and the similarity (%) operator compares the names as they are
+INDEXES = (
+    ('shop_name_upper_trgm_idx', 'shops_shopprofilemodel', 'UPPER(name::text)'),
+    ('shop_name_trgm_idx', 'shops_shopprofilemodel', 'name'),
+    ('shop_tag_upper_trgm_idx', 'shops_shoptagsmodel', 'UPPER(tag::text)'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return  # postgres was installed without its contrib extensions, the search stays in memory
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, expression in INDEXES:
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS %s ON %s USING gin ((%s) gin_trgm_ops)'
+                              % (name, table, expression))
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression in INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % name)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('shops', '0006_menu_ranks'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
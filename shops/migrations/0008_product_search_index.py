@@ -0,0 +1,32 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 03:00
+
+# Generated by Django 3.0.7 on 2026-10-19 03:00
+
+from django.db import migrations
+
+# the full text search index only exists on postgres, its expression is
+# the one of SearchVector('title', 'description', config='simple') in shops.search
+INDEX_EXPRESSION = "to_tsvector('simple'::regconfig, COALESCE(title, '') || ' ' || COALESCE(description, ''))"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS product_search_idx ON shops_productmodel '
+                          'USING gin ((%s))' % INDEX_EXPRESSION)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS product_search_idx')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('shops', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
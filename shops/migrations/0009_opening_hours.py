@@ -0,0 +1,99 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 05:00
+
+# Generated by Django 3.0.7 on 2026-10-19 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+MINUTES_IN_DAY = 24 * 60
+MINUTES_IN_WEEK = 7 * MINUTES_IN_DAY
+
+
+def week_intervals(opens_at, closes_at):
+    """returns the minutes of the week a shop that opens and closes at the
+    same times every day is open between, as shops.hours made them"""
+    intervals = []
+    for weekday in range(7):
+        opens_minute = weekday * MINUTES_IN_DAY + opens_at.hour * 60 + opens_at.minute
+        closes_minute = weekday * MINUTES_IN_DAY + closes_at.hour * 60 + closes_at.minute
+        if closes_minute == opens_minute:
+            continue
+        if closes_minute < opens_minute:  # closes the next day
+            closes_minute += MINUTES_IN_DAY
+        if closes_minute > MINUTES_IN_WEEK:
+            intervals.append((0, closes_minute - MINUTES_IN_WEEK))
+            closes_minute = MINUTES_IN_WEEK
+        intervals.append((opens_minute, closes_minute))
+    return intervals
+
+
+def build_open_intervals(apps, schema_editor):
+    shop_model = apps.get_model('shops', 'ShopProfileModel')
+    interval_model = apps.get_model('shops', 'ShopOpenIntervalModel')
+    now = timezone.localtime()
+    now = now.weekday() * MINUTES_IN_DAY + now.hour * 60 + now.minute
+
+    intervals, open_ids = [], []
+    for shop_id, opens_at, closes_at in shop_model.objects.values_list('pk', 'opens_at', 'closes_at'):
+        shop_intervals = week_intervals(opens_at, closes_at)
+        intervals.extend(interval_model(shop_id=shop_id, opens_minute=opens, closes_minute=closes)
+                         for opens, closes in shop_intervals)
+        if any(opens <= now < closes for opens, closes in shop_intervals):
+            open_ids.append(shop_id)
+    interval_model.objects.bulk_create(intervals, batch_size=500)
+    for start in range(0, len(open_ids), 500):
+        shop_model.objects.filter(pk__in=open_ids[start:start + 500]).update(is_open_now=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('shops', '0008_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shopprofilemodel',
+            name='is_open_now',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RemoveIndex(
+            model_name='shopprofilemodel',
+            name='shop_active_open_idx',
+        ),
+        migrations.AddIndex(
+            model_name='shopprofilemodel',
+            index=models.Index(fields=['is_active', 'is_open', 'is_open_now'], name='shop_open_now_idx'),
+        ),
+        migrations.CreateModel(
+            name='ShopHoursModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(
+                    choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'),
+                             (5, 'Saturday'), (6, 'Sunday')])),
+                ('opens_at', models.TimeField()),
+                ('closes_at', models.TimeField()),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hours',
+                                           to='shops.ShopProfileModel')),
+            ],
+            options={
+                'ordering': ['weekday', 'opens_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopOpenIntervalModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('opens_minute', models.PositiveIntegerField()),
+                ('closes_minute', models.PositiveIntegerField()),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='open_intervals', to='shops.ShopProfileModel')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='shopopenintervalmodel',
+            index=models.Index(fields=['opens_minute', 'closes_minute'], name='shop_open_interval_idx'),
+        ),
+        migrations.RunPython(build_open_intervals, migrations.RunPython.noop),
+    ]
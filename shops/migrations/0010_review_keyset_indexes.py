@@ -0,0 +1,22 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 09:40
+
+# Generated by Django 3.0.7 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('shops', '0009_opening_hours'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shopreviewmodel',
+            index=models.Index(fields=['shop', 'time_stamp', 'id'], name='shop_review_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreviewmodel',
+            index=models.Index(fields=['product', 'time_stamp', 'id'], name='product_review_keyset_idx'),
+        ),
+    ]
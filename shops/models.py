@@ -5,9 +5,11 @@ import uuid
 from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import F, Avg
+from django.db.models import Exists, OuterRef
 
-from . import unique_slugify
+from koshkie.ordering import Ranked, close_gap
+from koshkie.ratings import Rated
+from . import Slugged
 
 
 def shop_photo_upload(instance, filename):
@@ -18,7 +20,7 @@ def product_photo_upload(instance, filename):
     return 'shops/products/{0}.{1}'.format(uuid.uuid4().hex, os.path.splitext(filename))
 
 
-class ShopProfileModel(models.Model):
+class ShopProfileModel(Rated, Slugged, models.Model):
     shop_type_choices = [
         ('F', 'Food'),
         ('G', 'Groceries'),
@@ -40,6 +42,8 @@ class ShopProfileModel(models.Model):
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
     rating = models.DecimalField(default=0, decimal_places=1, max_digits=2)
+    reviews_count = models.PositiveIntegerField(default=0)
+    stars_sum = models.FloatField(default=0)
     is_active = models.BooleanField(default=False)
     is_open = models.BooleanField(default=True)
     currency = models.CharField(max_length=3, choices=currencies)
@@ -51,27 +55,39 @@ class ShopProfileModel(models.Model):
     ])
     opens_at = models.TimeField()
     closes_at = models.TimeField()
+    is_open_now = models.BooleanField(default=False)  # kept by shops.hours
     time_to_prepare = models.IntegerField()
 
+    slug_source = 'name'
+
+    class Meta:
+        indexes = [models.Index(fields=['is_active', 'is_open', 'is_open_now'], name='shop_open_now_idx')]
+
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        unique_slugify(self, self.name)
-
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(ShopProfileModel, cls).from_db(db, field_names, values)
+        instance._saved_times = (instance.__dict__.get('opens_at'), instance.__dict__.get('closes_at'))
+        return instance
+
+    def save(self, *args, open_intervals=True, **kwargs):
+        """saves the shop, its open intervals are rebuilt after the save when it's new or
+        its opens_at or closes_at changed unless open_intervals is False, as when the caller
+        adds the hours of the shop right after and rebuilds them once from them"""
+        times = (self.opens_at, self.closes_at)
+        self._times_changed = open_intervals and times != getattr(self, '_saved_times', None)
         super(ShopProfileModel, self).save(*args, **kwargs)
+        self._saved_times = times
 
-    def calculate_rating(self):
-        self.rating = self.reviews.aggregate(Avg('stars'))['stars__avg'] or 0
+    def times_changed(self):
+        """returns whether the last save made the shop or changed its
+        opens_at or closes_at, the hours of a shop with no hours"""
+        return getattr(self, '_times_changed', True)
 
     def resort_reviews(self, sort):
-        self.reviews.filter(sort__gt=sort).update(sort=F('sort') - 1)
-
-    def resort_product_groups(self, sort):
-        product_groups = self.product_groups.filter(sort__gt=sort)
-        for product_group in product_groups:
-            product_group.sort -= 1
-            product_group.save()
+        close_gap(self.reviews, sort)
 
     def update_attrs(self, **kwargs):
         for key, value in kwargs.items():
@@ -88,27 +104,58 @@ class ShopTagsModel(models.Model):
     tag = models.CharField(max_length=10)
 
 
-class ProductGroupModel(models.Model):
+class ShopHoursModel(models.Model):
+    """The hours a shop opens in a day of the week, it closes the next
+    day if closes_at is before opens_at. A shop with no hours opens
+    between its opens_at and closes_at every day"""
+
+    weekdays = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday')
+    ]
+
+    shop = models.ForeignKey(ShopProfileModel, on_delete=models.CASCADE, related_name='hours')
+    weekday = models.PositiveSmallIntegerField(choices=weekdays)
+    opens_at = models.TimeField()
+    closes_at = models.TimeField()
+
+    class Meta:
+        ordering = ['weekday', 'opens_at']
+
+
+class ShopOpenIntervalModel(models.Model):
+    """The minutes of the week a shop is open between,
+    built from its hours by shops.hours"""
+
+    shop = models.ForeignKey(ShopProfileModel, on_delete=models.CASCADE, related_name='open_intervals')
+    opens_minute = models.PositiveIntegerField()
+    closes_minute = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['opens_minute', 'closes_minute'], name='shop_open_interval_idx')]
+
+
+class ProductGroupModel(Ranked, models.Model):
     shop = models.ForeignKey(to=ShopProfileModel, related_name="product_groups", on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
-    sort = models.PositiveIntegerField(null=True)
+    rank = models.BigIntegerField()
+
+    parent_field = 'shop'
 
     class Meta:
-        unique_together = (("shop", "sort"), ("shop", "title"))
-        ordering = ['sort']
+        unique_together = (("shop", "rank"), ("shop", "title"))
+        ordering = ['rank']
 
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if self.pk is None:
-            latest_sort = ProductGroupModel.objects.filter(shop=self.shop).count()
-            self.sort = latest_sort + 1
-
-        super(ProductGroupModel, self).save(*args, **kwargs)
 
-
-class ProductModel(models.Model):
+class ProductModel(Rated, Slugged, models.Model):
     shop = models.ForeignKey(to=ShopProfileModel, related_name="products", on_delete=models.CASCADE)
     product_group = models.ForeignKey(to=ProductGroupModel, related_name="products",
                                       on_delete=models.CASCADE, null=True)
@@ -118,9 +165,15 @@ class ProductModel(models.Model):
     description = models.TextField()
     price = models.FloatField()
     rating = models.DecimalField(default=0, decimal_places=1, max_digits=2)
+    reviews_count = models.PositiveIntegerField(default=0)
+    stars_sum = models.FloatField(default=0)
     is_available = models.BooleanField(default=True)
     is_offer = models.BooleanField(default=False)
     num_sold = models.PositiveIntegerField(default=0)
+    price_varies = models.BooleanField(default=False)  # has an option group that changes the price
+
+    slug_source = 'title'
+    slug_parent = 'shop'
 
     class Meta:
         unique_together = ("shop", "slug")
@@ -128,98 +181,62 @@ class ProductModel(models.Model):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        unique_slugify(self, self.title)
-
-        super(ProductModel, self).save(*args, **kwargs)
-
-    def calculate_rating(self):
-        self.rating = self.reviews.aggregate(Avg('stars'))['stars__avg'] or 0
-
     def resort_reviews(self, sort):
-        self.reviews.filter(sort__gt=sort).update(sort=F('sort') - 1)
-
-    def resort_addons(self, sort):
-        addons = self.add_ons.filter(sort__gt=sort)
-        for addon in addons:
-            addon.sort -= 1
-            addon.save()
+        close_gap(self.reviews, sort)
 
-    def resort_option_groups(self, sort):
-        option_groups = self.option_groups.filter(sort__gt=sort)
-        for option_group in option_groups:
-            option_group.sort -= 1
-            option_group.save()
 
-
-class OptionGroupModel(models.Model):
+class OptionGroupModel(Ranked, models.Model):
     product = models.ForeignKey(to=ProductModel, related_name="option_groups", on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
-    sort = models.PositiveIntegerField(null=True)
+    rank = models.BigIntegerField()
     changes_price = models.BooleanField(default=False)
 
+    parent_field = 'product'
+
     class Meta:
-        unique_together = ("product", "sort")
-        ordering = ['sort']
+        unique_together = ("product", "rank")
+        ordering = ['rank']
 
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if self.pk is None:
-            latest_sort = OptionGroupModel.objects.filter(product=self.product).count()
-            self.sort = latest_sort + 1
-
-        super(OptionGroupModel, self).save(*args, **kwargs)
 
-    def resort_options(self, sort):
-        options = self.options.filter(sort__gt=sort)
-        for option in options:
-            option.sort -= 1
-            option.save()
+def price_varies():
+    """returns an expression of whether a product has an option group that changes its price"""
+    return Exists(OptionGroupModel.objects.filter(product=OuterRef('pk'), changes_price=True))
 
 
-class OptionModel(models.Model):
+class OptionModel(Ranked, models.Model):
     option_group = models.ForeignKey(to=OptionGroupModel, on_delete=models.CASCADE, related_name="options")
     title = models.CharField(max_length=255)
-    sort = models.PositiveIntegerField(null=True)
+    rank = models.BigIntegerField()
     price = models.FloatField(null=True)
 
+    parent_field = 'option_group'
+
     class Meta:
-        unique_together = ("option_group", "sort")
-        ordering = ['sort']
+        unique_together = ("option_group", "rank")
+        ordering = ['rank']
 
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if self.pk is None:
-            latest_sort = OptionModel.objects.filter(option_group=self.option_group).count()
-            self.sort = latest_sort + 1
-
-        super(OptionModel, self).save(*args, **kwargs)
-
 
-class AddOnModel(models.Model):
+class AddOnModel(Ranked, models.Model):
     product = models.ForeignKey(to=ProductModel, related_name="add_ons", on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     added_price = models.FloatField()
-    sort = models.PositiveIntegerField(null=True)
+    rank = models.BigIntegerField()
+
+    parent_field = 'product'
 
     class Meta:
-        unique_together = ("product", "sort")
-        ordering = ['sort']
+        unique_together = ("product", "rank")
+        ordering = ['rank']
 
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if self.pk is None:
-            latest_sort = AddOnModel.objects.filter(product=self.product).count()
-            self.sort = latest_sort + 1
-
-        super(AddOnModel, self).save(*args, **kwargs)
-
 
 class RelyOn(models.Model):
     option_group = models.OneToOneField(to=OptionGroupModel, on_delete=models.CASCADE, related_name='rely_on')
@@ -244,6 +261,10 @@ class ShopAddressModel(models.Model):
         MinValueValidator(-90)
     ])
 
+    class Meta:
+        indexes = [models.Index(fields=['location_latitude', 'location_longitude'],
+                                name='shop_address_location_idx')]
+
     def update_attrs(self, **kwargs):
         for key, value in kwargs.items():
             if hasattr(self, key):
@@ -268,13 +289,14 @@ class ShopReviewModel(models.Model):
     class Meta:
         unique_together = ("shop", "sort")
         ordering = ['sort']
+        indexes = [models.Index(fields=['shop', 'time_stamp', 'id'], name='shop_review_keyset_idx')]
 
     def __str__(self):
         return self.text
 
     def save(self, *args, **kwargs):
         if self.pk is None:
-            latest_sort = ShopReviewModel.objects.filter(shop=self.shop).count()
+            latest_sort = ShopReviewModel.objects.filter(shop_id=self.shop_id).count()
             self.sort = latest_sort + 1
 
         super(ShopReviewModel, self).save(*args, **kwargs)
@@ -294,6 +316,7 @@ class ProductReviewModel(models.Model):
     class Meta:
         unique_together = ("product", "sort")
         ordering = ['sort']
+        indexes = [models.Index(fields=['product', 'time_stamp', 'id'], name='product_review_keyset_idx')]
 
     def __str__(self):
         return self.text
@@ -1,8 +1,6 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 09/01/2020, 14:45
 from rest_framework import permissions
 
-from shops.models import ShopProfileModel, ProductModel, ProductGroupModel, AddOnModel, OptionGroupModel, OptionModel
-
 
 class ShopProfilePermissions(permissions.BasePermission):
     safe_methods = {'GET', 'POST', 'HEAD', 'OPTIONS'}
@@ -15,7 +13,7 @@ class ShopProfilePermissions(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if obj.account == request.user:
+        if obj.account_id == request.user.pk:
             return True
         return False
 
@@ -31,7 +29,7 @@ class ShopReviewPermissions(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if obj.user == request.user.profile:
+        if obj.user_id == request.user.profile.pk:
             return True
         return False
 
@@ -43,12 +41,9 @@ class ProductGroupPermissions(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if type(obj) == ShopProfileModel:
-            if obj.account == request.user:
-                return True
-        elif type(obj) == ProductGroupModel:
-            if obj.shop.account == request.user:
-                return True
+        # obj is the shop or the route of the url, which have the id of the shop's account
+        if obj.account_id == request.user.pk:
+            return True
         return False
 
 
@@ -63,12 +58,8 @@ class ProductPermissions(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if type(obj) == ShopProfileModel:
-            if obj.account == request.user:
-                return True
-        elif type(obj) == ProductModel:
-            if obj.shop.account == request.user:
-                return True
+        if obj.account_id == request.user.pk:
+            return True
         return False
 
 
@@ -83,7 +74,7 @@ class ProductReviewPermissions(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if obj.user.account == request.user:
+        if obj.user.account_id == request.user.pk:
             return True
         return False
 
@@ -95,12 +86,8 @@ class OptionGroupPermissions(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if type(obj) == ProductModel:
-            if obj.shop.account == request.user:
-                return True
-        elif type(obj) == OptionGroupModel:
-            if obj.product.shop.account == request.user:
-                return True
+        if obj.account_id == request.user.pk:
+            return True
         return False
 
 
@@ -111,12 +98,8 @@ class OptionPermissions(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if type(obj) == OptionGroupModel:
-            if obj.product.shop.account == request.user:
-                return True
-        elif type(obj) == OptionModel:
-            if obj.option_group.product.shop.account == request.user:
-                return True
+        if obj.account_id == request.user.pk:
+            return True
         return False
 
 
@@ -127,10 +110,6 @@ class AddOnPermission(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if type(obj) == ProductModel:
-            if obj.shop.account == request.user:
-                return True
-        elif type(obj) == AddOnModel:
-            if obj.product.shop.account == request.user:
-                return True
+        if obj.account_id == request.user.pk:
+            return True
         return False
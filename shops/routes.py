@@ -0,0 +1,167 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 06:30
+import hashlib
+from collections import namedtuple, OrderedDict
+
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404
+from rest_framework.generics import get_object_or_404
+
+from koshkie.caching import VersionedCache, settings_singleton
+from shops.models import ShopProfileModel, ProductModel
+
+# the ids a shop or a product slug in a url stands for
+# and the id of the account that owns the shop
+ShopRoute = namedtuple('ShopRoute', ['shop_id', 'account_id'])
+ProductRoute = namedtuple('ProductRoute', ['shop_id', 'product_id', 'account_id'])
+
+
+def find_shop_route(shop_slug):
+    """returns the route of a shop slug from the database or None"""
+    row = ShopProfileModel.objects.filter(slug=shop_slug).values_list('pk', 'account_id').first()
+    return ShopRoute(*row) if row else None
+
+
+def find_product_route(shop_slug, product_slug):
+    """returns the route of a shop and a product slug from the database or None"""
+    row = ProductModel.objects.filter(shop__slug=shop_slug, slug=product_slug) \
+        .values_list('shop_id', 'pk', 'shop__account_id').first()
+    return ProductRoute(*row) if row else None
+
+
+class RoutesCache(VersionedCache):
+    """Keeps the routes of the shop and product slugs in the urls in an
+    in-process LRU of max_size routes and in a django cache shared by the
+    processes, so the nested routes of the shops fetch their objects by
+    their primary keys and check who owns them without more queries.
+
+    Every route key has the version of the routes, which changing the slug
+    of a shop or a product or deleting it bumps, so no process reads a route
+    of an old slug again. The slugs that aren't found aren't cached.
+    """
+
+    key_prefix = 'routes'
+
+    def __init__(self, cache_alias='default', max_size=10000):
+        super(RoutesCache, self).__init__(cache_alias=cache_alias)
+        self.max_size = max_size
+        self._routes = OrderedDict()
+
+    def _key(self, *slugs):
+        key = '%s:%s:%s' % (self.key_prefix, self.version(), ':'.join(slugs))
+        if len(key) > 200:
+            key = '%s:%s' % (self.key_prefix, hashlib.md5(key.encode()).hexdigest())
+        return key
+
+    def _get(self, key, find, *slugs):
+        with self._lock:
+            route = self._routes.get(key)
+            if route is not None:
+                self._routes.move_to_end(key)
+                self.hits += 1
+                return route
+
+        route = self.cache.get(key)
+        with self._lock:
+            if route is not None:
+                self.hits += 1
+                self._remember(key, route)
+                return route
+            self.misses += 1
+
+        route = find(*slugs)
+        if route is not None:
+            self.cache.set(key, route, timeout=None)
+            with self._lock:
+                self._remember(key, route)
+        return route
+
+    def _remember(self, key, route):
+        self._routes[key] = route
+        self._routes.move_to_end(key)
+        while len(self._routes) > self.max_size:
+            self._routes.popitem(last=False)
+
+    def shop(self, shop_slug):
+        """returns the route of a shop slug or None"""
+        return self._get(self._key('shop', shop_slug), find_shop_route, shop_slug)
+
+    def product(self, shop_slug, product_slug):
+        """returns the route of a shop and a product slug or None"""
+        return self._get(self._key('product', shop_slug, product_slug), find_product_route,
+                         shop_slug, product_slug)
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        stats = super(RoutesCache, self).stats()
+        stats['size'] = len(self._routes)
+        return stats
+
+
+@settings_singleton('ROUTES_CACHE')
+def get_routes_cache():
+    """Returns the routes cache configured in
+    the ROUTES_CACHE settings or None if it's disabled"""
+    if settings.ROUTES_CACHE:
+        return RoutesCache(cache_alias=settings.ROUTES_CACHE, max_size=settings.ROUTES_CACHE_SIZE)
+    return None
+
+
+def get_shop_route_or_404(shop_slug):
+    """returns the route of a shop slug (taken from the url)
+    from the routes cache if it's enabled or raises Http404"""
+    cache = get_routes_cache()
+    route = find_shop_route(shop_slug) if cache is None else cache.shop(shop_slug)
+    if route is None:
+        raise Http404
+    return route
+
+
+def get_product_route_or_404(shop_slug, product_slug):
+    """returns the route of a shop and a product slug (taken from
+    the url) from the routes cache if it's enabled or raises Http404"""
+    cache = get_routes_cache()
+    route = find_product_route(shop_slug, product_slug) if cache is None else cache.product(shop_slug,
+                                                                                            product_slug)
+    if route is None:
+        raise Http404
+    return route
+
+
+def get_product_or_404(shop_slug, product_slug):
+    """returns the product of a shop and a product slug (taken from the url) and its route,
+    the product is fetched by its primary key if the route is cached, or joined through
+    the slugs with the account of its shop in one query if the routes cache is disabled"""
+    if get_routes_cache() is None:
+        product = get_object_or_404(ProductModel.objects.annotate(shop_account_id=F('shop__account_id')),
+                                    shop__slug=shop_slug, slug=product_slug)
+        return product, ProductRoute(product.shop_id, product.pk, product.shop_account_id)
+
+    route = get_product_route_or_404(shop_slug, product_slug)
+    return get_object_or_404(ProductModel, pk=route.product_id), route
+
+
+def shop_lookups(shop_slug, field='shop'):
+    """returns the filters of the objects of a shop slug (taken from the url) through
+    their field, by the shop id if the routes cache is enabled or else by the slug"""
+    cache = get_routes_cache()
+    if cache is None:
+        return {field + '__slug': shop_slug}
+    route = cache.shop(shop_slug)
+    # no object has a null shop, so an unknown slug finds nothing as the join would
+    return {field + '_id': route.shop_id if route else None}
+
+
+def product_lookups(shop_slug, product_slug, field='product'):
+    """returns the filters of the objects of a shop and a product slug (taken from the url)
+    through their field, by the product id if the routes cache is enabled or else by the slugs"""
+    cache = get_routes_cache()
+    if cache is None:
+        return {field + '__shop__slug': shop_slug, field + '__slug': product_slug}
+    route = cache.product(shop_slug, product_slug)
+    return {field + '_id': route.product_id if route else None}
+
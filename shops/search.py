@@ -0,0 +1,397 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 19/10/2026, 02:00
+import bisect
+import heapq
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+
+from koshkie.caching import settings_singleton
+from shops.models import ShopProfileModel, ShopTagsModel, ProductModel
+
+# the ranks of the shops found, shops whose names have the text come first,
+# then the ones whose names look like it (typos) then the ones with a tag that has it
+NAME_HIT = 3
+SIMILAR_NAME_HIT = 2
+TAG_HIT = 1
+
+SIMILARITY_THRESHOLD = 0.3  # the default pg_trgm.similarity_threshold
+
+# the ranks of the products found, products with all the words in their titles
+# come before the ones with some of them only in their descriptions
+TITLE_HIT = 2
+DESCRIPTION_HIT = 1
+
+logger = logging.getLogger(__name__)
+
+
+def words(text):
+    """returns the lowercased words of a text"""
+    return re.findall(r'\w+', text.lower())
+
+
+def trigrams(text):
+    """returns the trigrams of a text the way pg_trgm makes them,
+    every word is lowercased and padded with two spaces before it and one after"""
+    grams = set()
+    for word in words(text):
+        word = '  %s ' % word
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def similarity(grams, other_grams):
+    """returns the similarity of two sets of trigrams like pg_trgm's similarity()"""
+    if not grams or not other_grams:
+        return 0
+    return len(grams & other_grams) / len(grams | other_grams)
+
+
+class BaseShopSearch:
+    """The base class for the shops search backends.
+
+    A search filters a queryset of shops to the ones matching a text
+    and orders them by their search_rank then by the queryset's own
+    ordering (the distance for the nearby shops), in one query
+    that can still be paginated in SQL.
+    """
+
+    def search(self, queryset, text):
+        text = text.strip()
+        if not text:
+            return queryset
+
+        ordering = queryset.query.order_by
+        queryset = self.matches(queryset, text)
+        if isinstance(queryset.query.annotations['search_rank'], Value):
+            # all the shops have the same rank, and a constant
+            # in ORDER BY is read as the position of a column
+            return queryset.order_by(*ordering)
+        return queryset.order_by(F('search_rank').desc(), *ordering)
+
+    def matches(self, queryset, text):
+        """returns the shops of the queryset matching a text annotated with their search_rank"""
+        raise NotImplementedError
+
+    def update(self, shop):
+        """called after a shop or its tags are saved"""
+
+    def remove(self, shop_id):
+        """called after a shop is deleted"""
+
+    def rebuild(self):
+        """fills the index from scratch, if the backend keeps one"""
+
+
+class PostgresShopSearch(BaseShopSearch):
+    """Searches the shops with the trigram indexes of postgres
+    (pg_trgm) over the shop names and tags, nothing is kept in memory."""
+
+    def matches(self, queryset, text):
+        name_hits = ShopProfileModel.objects.filter(Q(name__icontains=text) |
+                                                    Q(name__trigram_similar=text)).values('pk')
+        tag_hits = ShopTagsModel.objects.filter(tag__icontains=text).values('shop_id')
+
+        return queryset.filter(Q(pk__in=name_hits) | Q(pk__in=tag_hits)).annotate(
+            search_rank=Case(When(name__icontains=text, then=Value(NAME_HIT)),
+                             When(name__trigram_similar=text, then=Value(SIMILAR_NAME_HIT)),
+                             default=Value(TAG_HIT), output_field=IntegerField()))
+
+
+class LocalShopSearch(BaseShopSearch):
+    """Searches the shops with an inverted index kept in the memory of
+    the current process, for the databases without trigram indexes.
+
+    Every three characters of the names and tags point to the shops
+    they are in to find the substrings, and the trigrams of the names'
+    words point to the shops to find the similar names. Each process
+    only sees its own updates, so it's meant for tests and single
+    process servers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._built = False
+        self._names = {}  # shop id -> [lowercased name]
+        self._tags = {}  # shop id -> lowercased tags
+        self._name_grams = {}  # shop id -> trigrams of the name
+        self._substrings = {}  # three characters -> ids of the shops with them in their names
+        self._tag_substrings = {}  # three characters -> ids of the shops with them in their tags
+        self._trigrams = {}  # trigram -> ids of the shops with it in their names
+
+    @staticmethod
+    def _chunks(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _discard(self, shop_id):
+        for name in self._names.pop(shop_id, ()):
+            for chunk in self._chunks(name):
+                self._substrings[chunk].discard(shop_id)
+            for gram in self._name_grams.pop(shop_id):
+                self._trigrams[gram].discard(shop_id)
+        for tag in self._tags.pop(shop_id, ()):
+            for chunk in self._chunks(tag):
+                self._tag_substrings[chunk].discard(shop_id)
+
+    def _add(self, shop_id, name, tags):
+        name = name.lower()
+        tags = [tag.lower() for tag in tags]
+        self._names[shop_id] = [name]
+        self._tags[shop_id] = tags
+        self._name_grams[shop_id] = trigrams(name)
+        for chunk in self._chunks(name):
+            self._substrings.setdefault(chunk, set()).add(shop_id)
+        for gram in self._name_grams[shop_id]:
+            self._trigrams.setdefault(gram, set()).add(shop_id)
+        for tag in tags:
+            for chunk in self._chunks(tag):
+                self._tag_substrings.setdefault(chunk, set()).add(shop_id)
+
+    def _containing(self, text, texts, substrings):
+        """returns the ids of the shops whose texts contain a text,
+        only the shops having all its three characters are checked"""
+        chunks = self._chunks(text)
+        if chunks:
+            candidates = set.intersection(*(substrings.get(chunk, set()) for chunk in chunks))
+        else:  # shorter than three characters
+            candidates = texts.keys()
+        return {shop_id for shop_id in candidates if any(text in value for value in texts[shop_id])}
+
+    def find(self, text):
+        """returns the ids of the shops with the text in their
+        names, with similar names and with the text in their tags"""
+        if not self._built:
+            self.rebuild()
+
+        text = text.lower()
+        grams = trigrams(text)
+        with self._lock:
+            names = self._containing(text, self._names, self._substrings)
+            candidates = set().union(*(self._trigrams.get(gram, ()) for gram in grams)) - names
+            similar = {shop_id for shop_id in candidates
+                       if similarity(grams, self._name_grams[shop_id]) >= SIMILARITY_THRESHOLD}
+            tags = self._containing(text, self._tags, self._tag_substrings) - names - similar
+        return names, similar, tags
+
+    def matches(self, queryset, text):
+        names, similar, tags = self.find(text)
+        ranks = {NAME_HIT: names, SIMILAR_NAME_HIT: similar, TAG_HIT: tags}
+        # every row is checked against the ids of the ranks before its own,
+        # so the biggest set is left to the default and never checked
+        default = max(ranks, key=lambda rank: len(ranks[rank]))
+        whens = [When(pk__in=ids, then=Value(rank)) for rank, ids in ranks.items() if rank != default and ids]
+        search_rank = Value(default, output_field=IntegerField())
+        if whens:
+            search_rank = Case(*whens, default=search_rank, output_field=IntegerField())
+        return queryset.filter(pk__in=names | similar | tags).annotate(search_rank=search_rank)
+
+    def update(self, shop):
+        if not self._built:
+            return  # everything is read when it's built
+        tags = list(ShopTagsModel.objects.filter(shop=shop).values_list('tag', flat=True))
+        with self._lock:
+            self._discard(shop.pk)
+            self._add(shop.pk, shop.name, tags)
+
+    def remove(self, shop_id):
+        with self._lock:
+            self._discard(shop_id)
+
+    def rebuild(self):
+        """fills the index from scratch with the shops in the database"""
+        tags = {}
+        for shop_id, tag in ShopTagsModel.objects.values_list('shop_id', 'tag').iterator():
+            tags.setdefault(shop_id, []).append(tag)
+
+        with self._lock:
+            self._reset()
+            for shop_id, name in ShopProfileModel.objects.values_list('pk', 'name').iterator():
+                self._add(shop_id, name, tags.get(shop_id, []))
+            self._built = True
+
+
+class BaseProductSearch:
+    """The base class for the products search backends.
+
+    A search finds the available products of a queryset of shops
+    with every word of a text at the start of a word of their titles
+    or descriptions (so the last word can still be being typed) and
+    returns the top ones, by their rank then by the order of their
+    shops (nearest first). Only the ids of the products found are
+    read, the top ones are then read whole in one query.
+    """
+
+    def search(self, shops, text, limit):
+        """returns the top limit products of the shops matching a text, best first"""
+        text_words = words(text)
+        if not text_words:
+            return []
+
+        positions = {shop_id: position for position, shop_id in enumerate(shops.values_list('pk', flat=True))}
+        hits = heapq.nsmallest(limit, ((-rank, positions[shop_id], product_id)
+                                       for product_id, shop_id, rank in self.find(text_words, shops)
+                                       if shop_id in positions))
+        product_ids = [product_id for rank, position, product_id in hits]
+        products = ProductModel.objects.select_related('shop').prefetch_related('shop__tags').in_bulk(product_ids)
+        return [products[product_id] for product_id in product_ids if product_id in products]
+
+    def find(self, text_words, shops):
+        """returns (id, shop id, rank) of the available products matching the words,
+        of the shops in the queryset at least (the others are left out by search)"""
+        raise NotImplementedError
+
+    def update(self, product):
+        """called after a product is saved"""
+
+    def remove(self, product_id):
+        """called after a product is deleted"""
+
+    def rebuild(self):
+        """fills the index from scratch, if the backend keeps one"""
+
+
+class PostgresProductSearch(BaseProductSearch):
+    """Searches the products with the full text search of postgres,
+    the GIN index over the words of the titles and descriptions
+    is kept up to date by postgres on every write."""
+
+    config = 'simple'  # the words as they are, no stemming or stop words
+
+    def find(self, text_words, shops):
+        query = SearchQuery(' & '.join('%s:*' % word for word in text_words),
+                            config=self.config, search_type='raw')
+        return ProductModel.objects.filter(shop__in=shops.values('pk'), is_available=True).annotate(
+            text_vector=SearchVector('title', 'description', config=self.config),
+            title_vector=SearchVector('title', config=self.config),
+        ).filter(text_vector=query).annotate(
+            search_rank=Case(When(title_vector=query, then=Value(TITLE_HIT)),
+                             default=Value(DESCRIPTION_HIT), output_field=IntegerField())
+        ).values_list('pk', 'shop_id', 'search_rank')
+
+
+class LocalProductSearch(BaseProductSearch):
+    """Searches the products with an inverted index kept in the memory
+    of the current process, for the databases without full text search.
+
+    Every word of the titles and descriptions of the available products
+    points to the products it's in, and all the words are kept sorted
+    to find the ones starting with a word. Like LocalShopSearch each
+    process only sees its own updates.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._built = False
+        self._shops = {}  # product id -> shop id
+        self._product_words = {}  # product id -> (words of the title, all the words)
+        self._title_index = {}  # word -> ids of the products with it in their titles
+        self._index = {}  # word -> ids of the products with it in their titles or descriptions
+        self._sorted_words = []  # the words of the index sorted, never removed
+
+    def _discard(self, product_id):
+        self._shops.pop(product_id, None)
+        title_words, all_words = self._product_words.pop(product_id, ((), ()))
+        for word in title_words:
+            self._title_index[word].discard(product_id)
+        for word in all_words:
+            self._index[word].discard(product_id)
+
+    def _add(self, product_id, shop_id, title, description):
+        title_words = set(words(title))
+        all_words = title_words | set(words(description))
+        self._shops[product_id] = shop_id
+        self._product_words[product_id] = (title_words, all_words)
+        for word in title_words:
+            self._title_index.setdefault(word, set()).add(product_id)
+        for word in all_words:
+            if word not in self._index:
+                self._index[word] = set()
+                bisect.insort(self._sorted_words, word)
+            self._index[word].add(product_id)
+
+    def _starting(self, word, index):
+        """returns the ids of the products with a word starting with word in an index"""
+        ids = set()
+        for i in range(bisect.bisect_left(self._sorted_words, word), len(self._sorted_words)):
+            if not self._sorted_words[i].startswith(word):
+                break
+            ids.update(index.get(self._sorted_words[i], ()))
+        return ids
+
+    def find(self, text_words, shops):
+        if not self._built:
+            self.rebuild()
+
+        with self._lock:
+            hits = set.intersection(*(self._starting(word, self._index) for word in text_words))
+            titles = set.intersection(hits, *(self._starting(word, self._title_index) for word in text_words))
+            return [(product_id, self._shops[product_id], TITLE_HIT if product_id in titles else DESCRIPTION_HIT)
+                    for product_id in hits]
+
+    def update(self, product):
+        if not self._built:
+            return  # everything is read when it's built
+        with self._lock:
+            self._discard(product.pk)
+            if product.is_available:
+                self._add(product.pk, product.shop_id, product.title, product.description)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._discard(product_id)
+
+    def rebuild(self):
+        """fills the index from scratch with the available products in the database"""
+        products = ProductModel.objects.filter(is_available=True).values_list('pk', 'shop_id', 'title',
+                                                                              'description')
+        with self._lock:
+            self._reset()
+            for product_id, shop_id, title, description in products.iterator():
+                self._add(product_id, shop_id, title, description)
+            self._built = True
+
+
+def has_trigrams():
+    """returns whether the database has the pg_trgm extension of postgres"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+@settings_singleton('SHOPS_SEARCH_BACKEND')
+def get_shop_search():
+    """Returns the shops search backend in SHOPS_SEARCH_BACKEND, or if it's None the
+    postgres one when the database has trigrams and the local one with a warning if not"""
+    backend = settings.SHOPS_SEARCH_BACKEND
+    if not backend:
+        backend = 'shops.search.PostgresShopSearch'
+        if not has_trigrams():
+            backend = 'shops.search.LocalShopSearch'
+            logger.warning('the database has no pg_trgm extension, searching the shops with LocalShopSearch '
+                           'which only sees the changes made in its own process, set SHOPS_SEARCH_BACKEND '
+                           'to choose the backend')
+    return import_string(backend)()
+
+
+@settings_singleton('PRODUCTS_SEARCH_BACKEND')
+def get_product_search():
+    """Returns the products search backend in PRODUCTS_SEARCH_BACKEND, or if
+    it's None the postgres one on postgres and the local one on other databases"""
+    backend = settings.PRODUCTS_SEARCH_BACKEND
+    if not backend:
+        backend = 'shops.search.PostgresProductSearch' if connection.vendor == 'postgresql' \
+            else 'shops.search.LocalProductSearch'
+    return import_string(backend)()
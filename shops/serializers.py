@@ -1,14 +1,36 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 21/02/2020, 17:27
 
 from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import Exists, OuterRef
 from rest_framework import serializers
 
+from koshkie.ordering import at_position, number, number_siblings
+from koshkie.ratings import update_rating
+from shops.hours import hold_open_intervals, rebuild_open_intervals
 from shops.models import (ShopProfileModel, ProductGroupModel, ProductModel,
                           OptionGroupModel, OptionModel, AddOnModel, RelyOn,
-                          ShopAddressModel, ShopReviewModel, ProductReviewModel, ShopTagsModel)
+                          ShopAddressModel, ShopReviewModel, ProductReviewModel, ShopTagsModel, ShopHoursModel)
 from users.serializers import UserProfileSerializer, UserSerializer
 
 
+class RankedListSerializer(serializers.ListSerializer):
+    """The serializer for a list of ranked menu items, it numbers
+    all the items at once instead of counting every item's sort"""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        field = getattr(data, 'field', None)
+        if field is not None and field.name == getattr(field.model, 'parent_field', None):
+            # all the items of one parent, already in their order
+            items = number_siblings(iterable)
+        else:
+            items = number(iterable)
+        if hasattr(self.child, 'number_related'):
+            self.child.number_related(items)
+        return [self.child.to_representation(item) for item in items]
+
+
 class RelyOnSerializer(serializers.ModelSerializer):
     choosed_option_group = serializers.IntegerField(source='choosed_option_group.sort', required=False)
     option = serializers.IntegerField(source='option.sort', required=False)
@@ -19,12 +41,12 @@ class RelyOnSerializer(serializers.ModelSerializer):
 
 
 class AddOnSerializer(serializers.ModelSerializer):
+    sort = serializers.IntegerField(required=False)
+
     class Meta:
         model = AddOnModel
         fields = ('sort', 'title', 'added_price')
-        extra_kwargs = {
-            'sort': {'required': False},
-        }
+        list_serializer_class = RankedListSerializer
 
     def __init__(self, *args, **kwargs):
         keep_only_fields = kwargs.pop('keep_only', None)
@@ -49,41 +71,22 @@ class AddOnSerializer(serializers.ModelSerializer):
         instance.added_price = validated_data.get('added_price', instance.added_price)
 
         if validated_data.get('sort', None):
-            old_sort = instance.sort
-            new_sort = validated_data.get('sort')
-
-            instance.sort = None
-            instance.save()
-
-            if new_sort - old_sort > 0:
-                addons = instance.product.add_ons.filter(sort__gt=old_sort,
-                                                         sort__lte=new_sort,
-                                                         sort__isnull=False)
-                for addon in addons:
-                    addon.sort -= 1
-                    addon.save()
-
-            elif new_sort - old_sort < 0:
-                addons = instance.product.add_ons.filter(sort__lt=old_sort,
-                                                         sort__gte=new_sort,
-                                                         sort__isnull=False).order_by('-sort')
-                for addon in addons:
-                    addon.sort += 1
-                    addon.save()
-
-            instance.sort = new_sort
-            instance.save()
+            instance.move_to(validated_data['sort'])
+
+        instance.save()
 
         return instance
 
 
 class OptionSerializer(serializers.ModelSerializer):
+    sort = serializers.IntegerField(required=False)
+
     class Meta:
         model = OptionModel
         fields = ('sort', 'title', 'price')
+        list_serializer_class = RankedListSerializer
         extra_kwargs = {
-            'price': {'required': False},
-            'sort': {'required': False}
+            'price': {'required': False}
         }
 
     def __init__(self, *args, **kwargs):
@@ -125,30 +128,9 @@ class OptionSerializer(serializers.ModelSerializer):
         instance.price = validated_data.get('price', instance.price)
 
         if validated_data.get('sort', None):
-            old_sort = instance.sort
-            new_sort = validated_data.get('sort')
-
-            instance.sort = None
-            instance.save()
-
-            if new_sort - old_sort > 0:
-                options = instance.option_group.options.filter(sort__gt=old_sort,
-                                                               sort__lte=new_sort,
-                                                               sort__isnull=False)
-                for option in options:
-                    option.sort -= 1
-                    option.save()
-
-            elif new_sort - old_sort < 0:
-                options = instance.option_group.options.filter(sort__lt=old_sort,
-                                                               sort__gte=new_sort,
-                                                               sort__isnull=False).order_by('-sort')
-                for option in options:
-                    option.sort += 1
-                    option.save()
-
-            instance.sort = new_sort
-            instance.save()
+            instance.move_to(validated_data['sort'])
+
+        instance.save()
 
         return instance
 
@@ -156,13 +138,12 @@ class OptionSerializer(serializers.ModelSerializer):
 class OptionGroupSerializer(serializers.ModelSerializer):
     options = OptionSerializer(many=True, read_only=True)
     rely_on = RelyOnSerializer(required=False)
+    sort = serializers.IntegerField(required=False)
 
     class Meta:
         model = OptionGroupModel
         fields = ('sort', 'title', 'changes_price', 'rely_on', 'options')
-        extra_kwargs = {
-            'sort': {'required': False},
-        }
+        list_serializer_class = RankedListSerializer
 
     def __init__(self, *args, **kwargs):
         keep_only_fields = kwargs.pop('keep_only', None)
@@ -200,7 +181,7 @@ class OptionGroupSerializer(serializers.ModelSerializer):
     def validate_changes_price(self, data):
         product = self.context['product']
         if data:
-            if product.option_groups.filter(changes_price=True).exists():
+            if product.price_varies:
                 raise serializers.ValidationError("A Product Can't have multiple price changing option group")
         return data
 
@@ -212,14 +193,13 @@ class OptionGroupSerializer(serializers.ModelSerializer):
 
         if data:
             product = self.context['product']
-            option_group_qs = product.option_groups.filter(sort=data['choosed_option_group']['sort'])
+            option_group = at_position(product.option_groups, data['choosed_option_group']['sort'])
 
-            if option_group_qs.exists():
-                option_group = option_group_qs.get()
-                if self.instance and option_group.sort == self.instance.sort:
+            if option_group is not None:
+                if self.instance and option_group.pk == self.instance.pk:
                     raise serializers.ValidationError("option group must be different than the current one")
 
-                if not option_group.options.filter(sort=data['option']['sort']).exists():
+                if at_position(option_group.options, data['option']['sort']) is None:
                     raise serializers.ValidationError("option doesn't exist")
             else:
                 raise serializers.ValidationError("option group doesn't exist")
@@ -233,6 +213,19 @@ class OptionGroupSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("invalid sort number")
         return attrs
 
+    def number_related(self, option_groups):
+        """numbers the option groups and options the rely-ons of
+        the option groups point to, with one query for each"""
+        if 'rely_on' in self.fields:
+            rely_ons = [option_group.rely_on for option_group in option_groups
+                        if getattr(option_group, 'rely_on', None) is not None]
+            number([rely_on.choosed_option_group for rely_on in rely_ons])
+            number([rely_on.option for rely_on in rely_ons])
+
+    def to_representation(self, instance):
+        self.number_related([instance])  # already numbered in a list
+        return super(OptionGroupSerializer, self).to_representation(instance)
+
     def create(self, validated_data):
         product = self.context['product']
 
@@ -241,8 +234,8 @@ class OptionGroupSerializer(serializers.ModelSerializer):
         option_group = OptionGroupModel.objects.create(**validated_data)
 
         if rely_on_data:
-            choosed_option_group = product.option_groups.get(sort=rely_on_data['choosed_option_group']['sort'])
-            option = choosed_option_group.options.get(sort=rely_on_data['option']['sort'])
+            choosed_option_group = at_position(product.option_groups, rely_on_data['choosed_option_group']['sort'])
+            option = at_position(choosed_option_group.options, rely_on_data['option']['sort'])
             RelyOn.objects.create(option_group=option_group,
                                   choosed_option_group=choosed_option_group, option=option)
 
@@ -255,11 +248,10 @@ class OptionGroupSerializer(serializers.ModelSerializer):
 
         if rely_on_data is not None and rely_on_data != {}:
 
-            choosed_option_group = product.option_groups.get(
-                sort=rely_on_data['choosed_option_group']['sort'])
+            choosed_option_group = at_position(product.option_groups,
+                                               rely_on_data['choosed_option_group']['sort'])
 
-            option = choosed_option_group.options.get(
-                sort=rely_on_data['option']['sort'])
+            option = at_position(choosed_option_group.options, rely_on_data['option']['sort'])
 
             defaults = {'choosed_option_group': choosed_option_group, 'option': option}
             RelyOn.objects.update_or_create(option_group=instance, defaults=defaults)
@@ -273,29 +265,7 @@ class OptionGroupSerializer(serializers.ModelSerializer):
         instance.changes_price = validated_data.get('changes_price', instance.changes_price)
 
         if validated_data.get('sort', None):
-            old_sort = instance.sort
-            new_sort = validated_data.get('sort')
-
-            instance.sort = None
-            instance.save()
-
-            if new_sort - old_sort > 0:
-                option_groups = instance.product.option_groups.filter(sort__gt=old_sort,
-                                                                      sort__lte=new_sort,
-                                                                      sort__isnull=False)
-                for option_group in option_groups:
-                    option_group.sort -= 1
-                    option_group.save()
-
-            elif new_sort - old_sort < 0:
-                option_groups = instance.product.option_groups.filter(sort__lt=old_sort,
-                                                                      sort__gte=new_sort,
-                                                                      sort__isnull=False).order_by('-sort')
-                for option_group in option_groups:
-                    option_group.sort += 1
-                    option_group.save()
-
-            instance.sort = new_sort
+            instance.move_to(validated_data['sort'])
 
         instance.save()
 
@@ -325,18 +295,17 @@ class ProductReviewSerializer(serializers.ModelSerializer):
         product = validated_data['product']
         review = ProductReviewModel.objects.create(**validated_data)
 
-        product.calculate_rating()
-        product.save()
+        update_rating(product, 1, review.stars)
 
         return review
 
     def update(self, instance, validated_data):
+        old_stars = instance.stars
         instance.stars = validated_data.get('stars', instance.stars)
         instance.text = validated_data.get('text', instance.text)
         instance.save()
 
-        instance.product.calculate_rating()
-        instance.product.save()
+        update_rating(instance.product, 0, instance.stars - old_stars)
         return instance
 
 
@@ -344,7 +313,6 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
     group_id = serializers.IntegerField(write_only=True, required=False)
     option_groups = OptionGroupSerializer(many=True, read_only=True)
     add_ons = AddOnSerializer(many=True, read_only=True)
-    reviews_count = serializers.SerializerMethodField(read_only=True, source='get_reviews_count')
 
     class Meta:
         model = ProductModel
@@ -354,6 +322,7 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
             'id': {'read_only': True},
             'slug': {'read_only': True},
             'rating': {'read_only': True},
+            'reviews_count': {'read_only': True},
         }
 
     def validate(self, attrs):
@@ -364,18 +333,14 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
         return attrs
 
     def to_representation(self, instance):
-        if instance.option_groups.filter(changes_price=True).exists():
+        if instance.price_varies:
             rep = super(ProductDetailsSerializer, self).to_representation(instance)
             rep.pop('price')
             return rep
         return super(ProductDetailsSerializer, self).to_representation(instance)
 
-    def get_reviews_count(self, obj):
-        return obj.reviews.count()
-
 
 class ProductSerializer(serializers.ModelSerializer):
-    reviews_count = serializers.SerializerMethodField(source='get_reviews_count')
 
     class Meta:
         model = ProductModel
@@ -394,26 +359,22 @@ class ProductSerializer(serializers.ModelSerializer):
                     self.fields.pop(field)
 
     def to_representation(self, instance):
-        if instance.option_groups.filter(changes_price=True).exists():
+        if instance.price_varies:
             rep = super(ProductSerializer, self).to_representation(instance)
             rep.pop('price')
             return rep
 
         return super(ProductSerializer, self).to_representation(instance)
 
-    def get_reviews_count(self, obj):
-        return obj.reviews.count()
-
 
 class ProductGroupSerializer(serializers.ModelSerializer):
     products = serializers.SerializerMethodField(read_only=True, source='get_products')
+    sort = serializers.IntegerField(required=False)
 
     class Meta:
         model = ProductGroupModel
         fields = ('title', 'sort', 'products')
-        extra_kwargs = {
-            'sort': {'required': False}
-        }
+        list_serializer_class = RankedListSerializer
 
     def get_products(self, obj):
         queryset = obj.products.filter(is_available=True)
@@ -431,30 +392,9 @@ class ProductGroupSerializer(serializers.ModelSerializer):
         instance.title = validated_data.get('title', instance.title)
 
         if validated_data.get('sort', None):
-            old_sort = instance.sort
-            new_sort = validated_data.get('sort')
-
-            instance.sort = None
-            instance.save()
-
-            if new_sort - old_sort > 0:
-                product_groups = instance.shop.product_groups.filter(sort__gt=old_sort,
-                                                                     sort__lte=new_sort,
-                                                                     sort__isnull=False)
-                for product_group in product_groups:
-                    product_group.sort -= 1
-                    product_group.save()
-
-            elif new_sort - old_sort < 0:
-                product_groups = instance.shop.product_groups.filter(sort__lt=old_sort,
-                                                                     sort__gte=new_sort,
-                                                                     sort__isnull=False).order_by('-sort')
-                for product_group in product_groups:
-                    product_group.sort += 1
-                    product_group.save()
-
-            instance.sort = new_sort
-            instance.save()
+            instance.move_to(validated_data['sort'])
+
+        instance.save()
 
         return instance
 
@@ -468,6 +408,12 @@ class ShopAddressSerializer(serializers.ModelSerializer):
         }
 
 
+class ShopHoursSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShopHoursModel
+        fields = ('weekday', 'opens_at', 'closes_at')
+
+
 class ShopReviewSerializer(serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
 
@@ -488,41 +434,41 @@ class ShopReviewSerializer(serializers.ModelSerializer):
         return stars
 
     def create(self, validated_data):
-        shop = validated_data['shop']
         review = ShopReviewModel.objects.create(**validated_data)
 
-        shop.calculate_rating()
-        shop.save()
+        update_rating(review.shop, 1, review.stars)
 
         return review
 
     def update(self, instance, validated_data):
+        old_stars = instance.stars
         instance.stars = validated_data.get('stars', instance.stars)
         instance.text = validated_data.get('text', instance.text)
         instance.save()
 
-        instance.shop.calculate_rating()
-        instance.shop.save()
+        update_rating(instance.shop, 0, instance.stars - old_stars)
         return instance
 
 
 class ShopProfileDetailSerializer(serializers.ModelSerializer):
     account = UserSerializer()
     address = ShopAddressSerializer()
-    reviews_count = serializers.SerializerMethodField(read_only=True, source='get_reviews_count')
     shop_tags = serializers.ListField(child=serializers.CharField(max_length=10, min_length=1),
                                       write_only=True, max_length=3)
+    hours = ShopHoursSerializer(many=True, required=False)
 
     class Meta:
         model = ShopProfileModel
         fields = ('slug', 'account', 'profile_photo', 'phone_number', 'cover_photo',
                   'description', 'shop_type', 'name', 'tags', 'shop_tags', 'rating',
-                  'reviews_count', 'is_open', 'opens_at', 'closes_at', 'currency',
-                  'minimum_charge', 'delivery_fee', 'time_to_prepare', 'address')
+                  'reviews_count', 'is_open', 'opens_at', 'closes_at', 'hours', 'is_open_now',
+                  'currency', 'minimum_charge', 'delivery_fee', 'time_to_prepare', 'address')
         extra_kwargs = {
             'slug': {'read_only': True},
             'tags': {'read_only': True},
             'rating': {'read_only': True},
+            'reviews_count': {'read_only': True},
+            'is_open_now': {'read_only': True},
         }
 
     def __init__(self, *args, **kwargs):
@@ -540,19 +486,27 @@ class ShopProfileDetailSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         address_data = validated_data.pop('address')
         shop_tags = validated_data.pop('shop_tags')
+        hours_data = validated_data.pop('hours', [])
 
         account_data = validated_data.pop('account')
         account = User(**account_data)
         account.set_password(account.password)
         account.save()
 
-        shop_profile = ShopProfileModel.objects.create(account=account, **validated_data)
+        shop_profile = ShopProfileModel(account=account, **validated_data)
+        # the open intervals of a shop with hours are built once from them below
+        shop_profile.save(open_intervals=not hours_data)
 
         for tag in shop_tags:
             ShopTagsModel.objects.create(tag=tag, shop=shop_profile)
 
         ShopAddressModel.objects.create(shop=shop_profile, **address_data)
 
+        if hours_data:
+            ShopHoursModel.objects.bulk_create([ShopHoursModel(shop=shop_profile, **hours)
+                                                for hours in hours_data])
+            rebuild_open_intervals([shop_profile])
+
         return shop_profile
 
     def update(self, instance, validated_data):
@@ -570,6 +524,14 @@ class ShopProfileDetailSerializer(serializers.ModelSerializer):
             for tag in shop_tags:
                 ShopTagsModel.objects.create(tag=tag, shop=instance)
 
+        hours_data = validated_data.pop('hours', None)
+        if hours_data is not None:
+            # replaces all the hours, the open intervals are rebuilt once below
+            with hold_open_intervals(instance.pk):
+                instance.hours.all().delete()
+                ShopHoursModel.objects.bulk_create([ShopHoursModel(shop=instance, **hours)
+                                                    for hours in hours_data])
+
         account_data = validated_data.pop('account', {})
         account = instance.account
         account.first_name = account_data.get('first_name', account.first_name)
@@ -580,16 +542,14 @@ class ShopProfileDetailSerializer(serializers.ModelSerializer):
         account.save()
 
         instance.update_attrs(**validated_data)
+        if hours_data is not None and not instance.times_changed():  # not rebuilt by the save
+            rebuild_open_intervals([instance])
 
         return instance
 
-    def get_reviews_count(self, obj):
-        return obj.reviews.count()
-
 
 class ShopProfileSerializer(serializers.ModelSerializer):
     has_offers = serializers.SerializerMethodField(read_only=True)
-    reviews_count = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = ShopProfileModel
@@ -608,13 +568,28 @@ class ShopProfileSerializer(serializers.ModelSerializer):
                 if field not in keep_only_fields:
                     self.fields.pop(field)
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """adds what the serializer reads for every shop to a queryset,
+        so a list of shops is serialized without a query per shop"""
+        return queryset.prefetch_related('tags').annotate(
+            has_offers=Exists(ProductModel.objects.filter(shop=OuterRef('pk'), is_offer=True)))
+
     def to_representation(self, instance):
         rep = super().to_representation(instance)
         rep['tags'] = [x.tag for x in instance.tags.all()]
         return rep
 
-    def get_reviews_count(self, obj):
-        return obj.reviews.count()
-
     def get_has_offers(self, obj):
+        if hasattr(obj, 'has_offers'):
+            return obj.has_offers
         return obj.products.filter(is_offer=True).exists()
+
+
+class ProductSearchSerializer(ProductSerializer):
+    shop = ShopProfileSerializer(read_only=True, keep_only=('slug', 'profile_photo', 'name', 'tags', 'rating',
+                                                             'currency', 'minimum_charge', 'delivery_fee',
+                                                             'time_to_prepare'))
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ('shop',)
@@ -0,0 +1,176 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 23:40
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from koshkie.caching import bump_after_commit
+from shops.hours import held_shops, rebuild_open_intervals
+from shops.listing import get_shops_list_cache
+from shops.menu import get_menu_cache
+from shops.models import (ShopProfileModel, ShopAddressModel, ShopTagsModel, ShopHoursModel, ProductGroupModel,
+                          ProductModel, OptionGroupModel, OptionModel, AddOnModel, RelyOn, price_varies)
+from shops.routes import get_routes_cache
+from shops.search import get_shop_search, get_product_search
+
+# the path from every part of a menu to its shop
+MENU_MODELS = {
+    ProductGroupModel: ('shop',),
+    ProductModel: ('shop',),
+    OptionGroupModel: ('product', 'shop'),
+    AddOnModel: ('product', 'shop'),
+    OptionModel: ('option_group', 'product', 'shop'),
+    RelyOn: ('option_group', 'product', 'shop'),
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_menu_version(sender, **kwargs):
+    """The receiver called after a part of a shop's menu is
+    saved or deleted to make the cached menu of the shop stale"""
+
+    if sender not in MENU_MODELS:
+        return
+    cache = get_menu_cache()
+    if cache is None:
+        return
+
+    shop = kwargs['instance']
+    try:
+        for field in MENU_MODELS[sender]:
+            shop = getattr(shop, field)
+    except ObjectDoesNotExist:  # deleted with the shop
+        return
+
+    bump_after_commit(cache, shop.slug)
+
+
+@receiver(post_save, sender=ShopProfileModel)
+@receiver(post_delete, sender=ShopProfileModel)
+@receiver(post_save, sender=ShopAddressModel)
+@receiver(post_delete, sender=ShopAddressModel)
+@receiver(post_save, sender=ShopTagsModel)
+@receiver(post_delete, sender=ShopTagsModel)
+def bump_shops_list_version(sender, **kwargs):
+    """The receiver called after a shop, its address or one of its tags
+    is saved or deleted to make the cached lists of the shops stale"""
+
+    cache = get_shops_list_cache()
+    if cache is None:
+        return
+
+    bump_after_commit(cache)
+
+
+@receiver(post_save, sender=ShopProfileModel)
+@receiver(post_delete, sender=ShopProfileModel)
+@receiver(post_save, sender=ProductModel)
+@receiver(post_delete, sender=ProductModel)
+def bump_routes_version(sender, **kwargs):
+    """The receiver called after a shop or a product is deleted or
+    its slug is changed to make the cached routes of the slugs stale"""
+
+    cache = get_routes_cache()
+    if cache is None:
+        return
+    if 'created' in kwargs and (kwargs['created'] or not kwargs['instance'].slug_changed()):
+        return
+
+    bump_after_commit(cache)
+
+
+@receiver(post_save, sender=ShopProfileModel)
+def update_open_intervals(sender, **kwargs):
+    """The receiver called after a shop is saved to rebuild its open intervals
+    and whether it's open now when it's new or its opens_at or closes_at changed"""
+
+    shop = kwargs['instance']
+    if not kwargs['raw'] and shop.times_changed():
+        rebuild_open_intervals([shop])
+
+
+@receiver(post_save, sender=ShopHoursModel)
+@receiver(post_delete, sender=ShopHoursModel)
+def update_hours_open_intervals(sender, **kwargs):
+    """The receiver called after some hours of a shop are saved or
+    deleted to rebuild its open intervals and whether it's open now"""
+
+    shop_id = kwargs['instance'].shop_id
+    if not kwargs.get('raw') and shop_id not in held_shops():
+        rebuild_open_intervals(ShopProfileModel.objects.filter(pk=shop_id))
+
+
+@receiver(pre_delete, sender=ShopProfileModel)
+@receiver(post_delete, sender=ShopProfileModel)
+def hold_deleted_open_intervals(sender, **kwargs):
+    """The receiver called before and after a shop is deleted to keep its
+    hours, deleted before it, from rebuilding the open intervals of the shop"""
+
+    if kwargs['signal'] is pre_delete:
+        held_shops().add(kwargs['instance'].pk)
+    else:
+        held_shops().discard(kwargs['instance'].pk)
+
+
+@receiver(post_save, sender=OptionGroupModel)
+@receiver(post_delete, sender=OptionGroupModel)
+def update_price_varies(sender, **kwargs):
+    """The receiver called after an option group is saved or
+    deleted to update whether its product's price varies"""
+
+    option_group = kwargs['instance']
+    ProductModel.objects.filter(pk=option_group.product_id).update(price_varies=price_varies())
+    if OptionGroupModel.product.is_cached(option_group):
+        product = option_group.product
+        product.price_varies = ProductModel.objects.filter(pk=product.pk) \
+            .values_list('price_varies', flat=True).first() or False
+
+
+@receiver(post_save, sender=ShopProfileModel)
+@receiver(post_save, sender=ShopTagsModel)
+@receiver(post_delete, sender=ShopTagsModel)
+def update_shop_search(sender, **kwargs):
+    """The receiver called after a shop or one of its tags is
+    saved or deleted to update the shops search index"""
+
+    search = get_shop_search()
+    try:
+        shop = kwargs['instance'] if sender is ShopProfileModel else kwargs['instance'].shop
+    except ObjectDoesNotExist:  # deleted with the shop
+        return
+
+    def update_committed():
+        # the shop may be deleted with its tags in the same transaction
+        if ShopProfileModel.objects.filter(pk=shop.pk).exists():
+            search.update(shop)
+
+    # updated again after the commit with what was committed
+    search.update(shop)
+    transaction.on_commit(update_committed)
+
+
+@receiver(post_delete, sender=ShopProfileModel)
+def remove_from_shop_search(sender, **kwargs):
+    """The receiver called after a shop is deleted to remove it from the shops search index"""
+
+    get_shop_search().remove(kwargs['instance'].pk)
+
+
+@receiver(post_save, sender=ProductModel)
+def update_product_search(sender, **kwargs):
+    """The receiver called after a product is saved to update the products search index"""
+
+    search = get_product_search()
+    product = kwargs['instance']
+
+    # updated again after the commit with what was committed
+    search.update(product)
+    transaction.on_commit(lambda: search.update(product))
+
+
+@receiver(post_delete, sender=ProductModel)
+def remove_from_product_search(sender, **kwargs):
+    """The receiver called after a product is deleted to remove it from the products search index"""
+
+    get_product_search().remove(kwargs['instance'].pk)
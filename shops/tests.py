@@ -1,3 +1,797 @@
-from django.test import TestCase
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 22:40
+import datetime
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from koshkie.ordering import RANK_STEP, at_position, number
+from shops.hours import MINUTES_IN_DAY, MINUTES_IN_WEEK, week_intervals, refresh_open_shops
+from shops.listing import get_shops_list_cache
+from shops.menu import get_menu_cache
+from shops.routes import ProductRoute, get_product_or_404, get_routes_cache
+from shops.search import LocalShopSearch, get_shop_search, get_product_search, has_trigrams
+from shops.models import (ShopProfileModel, ShopAddressModel, ShopTagsModel, ShopReviewModel, ProductModel,
+                          ProductGroupModel, AddOnModel, OptionGroupModel, OptionModel, ShopOpenIntervalModel, RelyOn,
+                          ShopHoursModel)
+from shops.serializers import (ShopReviewSerializer, ProductSerializer, ProductGroupSerializer,
+                               ProductDetailsSerializer, OptionGroupSerializer, ShopProfileDetailSerializer)
+from users.models import UserProfileModel
+
+
+def create_shops(count, start=0):
+    shops = []
+    for i in range(start, start + count):
+        account = User.objects.create(username='shop%d' % i, password='password')
+        shop = ShopProfileModel.objects.create(account=account, profile_photo='/shops/tests/sample.jpg',
+                                               cover_photo='/shops/tests/sample.jpg', phone_number=123,
+                                               description='text', shop_type='F', name='shop %d' % i,
+                                               currency='$', delivery_fee=0,
+                                               opens_at=datetime.time(0, 0),
+                                               closes_at=datetime.time(23, 59, 59),
+                                               time_to_prepare=20, vat=14, is_active=True)
+        ShopAddressModel.objects.create(shop=shop, area='area', street='street', building='building',
+                                        location_longitude=30, location_latitude=30 + i * 0.0001)
+        ShopTagsModel.objects.create(shop=shop, tag='tag%d' % i)
+        ShopTagsModel.objects.create(shop=shop, tag='food')
+        shops.append(shop)
+    return shops
+
+
+class TestShopsList(TestCase):
+    """Unittest for listing the shops near a location"""
+
+    def setUp(self):
+        """setup for unittest"""
+        self.shops = create_shops(1)
+
+        user = UserProfileModel.objects.create(account=User.objects.create(username='user'),
+                                               phone_number=123)
+        review = ShopReviewSerializer(data={'stars': 5, 'text': 'text'})
+        review.is_valid(raise_exception=True)
+        review.save(user=user, shop=self.shops[0])
+        ProductModel.objects.create(shop=self.shops[0], photo='/shops/tests/sample.jpg', title='product',
+                                    slug='product', price=5, description='text', is_offer=True)
+
+    def test_list_values(self):
+        """test the counters and annotated values of the listed shops"""
+        self.shops += create_shops(1, start=1)
+
+        response = self.client.get('/shops/?latitude=30&longitude=30')
+        self.assertEqual(response.status_code, 200)
+        shops = {shop['name']: shop for shop in response.data['shops']}
+        self.assertEqual(shops['shop 0']['reviews_count'], 1)
+        self.assertTrue(shops['shop 0']['has_offers'])
+        self.assertEqual(shops['shop 1']['reviews_count'], 0)
+        self.assertFalse(shops['shop 1']['has_offers'])
+        self.assertEqual(sorted(shops['shop 0']['tags']), ['food', 'tag0'])
+
+    def test_list_queries(self):
+        """test that the number of queries doesn't grow with the number of shops"""
+        with self.assertNumQueries(3):  # count, shops and tags
+            response = self.client.get('/shops/?latitude=30&longitude=30&limit=100')
+        self.assertEqual(len(response.data['shops']), 1)
+
+        create_shops(99, start=1)
+        with self.assertNumQueries(3):
+            response = self.client.get('/shops/?latitude=30&longitude=30&limit=100')
+        self.assertEqual(len(response.data['shops']), 100)
+
+
+@override_settings(SHOPS_LIST_CACHE='default')
+class TestShopsListCache(TestCase):
+    """Unittest for the nearby shops lists cache"""
+
+    def setUp(self):
+        """setup for unittest"""
+        cache.clear()
+        self.shops = create_shops(2)
+        self.url = '/shops/?latitude=30.0001&longitude=30'
+
+    def test_cache_hit(self):
+        """test that a cached list is served without queries to the users of the same cell"""
+        shops_list = self.client.get(self.url).data
+        self.assertEqual(shops_list['count'], 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/shops/?latitude=30.0002&longitude=30.0001').data, shops_list)
+        self.assertEqual(self.client.get(self.url + '&limit=1').data['count'], 2)
+
+        stats = get_shops_list_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_writes_bump_version(self):
+        """test that closing a shop or moving it makes the cached lists stale"""
+        self.assertEqual(self.client.get(self.url).data['count'], 2)
+
+        self.shops[0].is_open = False
+        self.shops[0].save()
+        self.assertEqual(self.client.get(self.url).data['count'], 1)
+
+        address = self.shops[1].address
+        address.location_latitude = 40
+        address.save()
+        self.assertEqual(self.client.get(self.url).data['count'], 0)
+
+    def test_shops_open_and_close(self):
+        """test that a cached list is made again when the tick opens or closes a shop"""
+        self.assertEqual(self.client.get(self.url).data['count'], 2)
+
+        ShopOpenIntervalModel.objects.filter(shop=self.shops[0]).delete()
+        self.assertEqual(self.client.get(self.url).data['count'], 2)
+        call_command('tick_open_shops', stdout=StringIO())
+        self.assertEqual(self.client.get(self.url).data['count'], 1)
+
+
+class TestOpeningHours(TestCase):
+    """Unittest for the opening hours of the shops"""
+
+    monday = datetime.datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+    def setUp(self):
+        """setup for unittest"""
+        self.shop = create_shops(1)[0]
+
+    def set_hours(self, hours):
+        serializer = ShopProfileDetailSerializer(self.shop, data={'hours': hours}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def is_open_at(self, moment):
+        refresh_open_shops(moment)
+        return ShopProfileModel.objects.get(pk=self.shop.pk).is_open_now
+
+    def test_week_intervals(self):
+        """test the minutes of the week of same day, overnight and end of the week hours"""
+        self.assertEqual(week_intervals([(0, datetime.time(9, 0), datetime.time(17, 30))]), [(540, 1050)])
+        self.assertEqual(week_intervals([(4, datetime.time(22, 0), datetime.time(2, 0))]),
+                         [(4 * MINUTES_IN_DAY + 1320, 5 * MINUTES_IN_DAY + 120)])
+        self.assertEqual(week_intervals([(6, datetime.time(22, 0), datetime.time(2, 0))]),
+                         [(0, 120), (6 * MINUTES_IN_DAY + 1320, MINUTES_IN_WEEK)])
+        self.assertEqual(week_intervals([(2, datetime.time(9, 0), datetime.time(9, 0))]), [])
+
+    def test_daily_hours(self):
+        """test that a shop with no hours opens between its opens_at and closes_at every day"""
+        self.shop.opens_at = datetime.time(20, 0)
+        self.shop.closes_at = datetime.time(3, 0)
+        self.shop.save()
+        self.assertEqual(self.shop.open_intervals.count(), 8)
+
+        self.assertTrue(self.is_open_at(self.monday + datetime.timedelta(hours=2)))
+        self.assertFalse(self.is_open_at(self.monday + datetime.timedelta(hours=3)))
+        self.assertTrue(self.is_open_at(self.monday + datetime.timedelta(days=3, hours=23)))
+
+    def test_weekday_hours(self):
+        """test that a shop with hours opens only in them"""
+        self.set_hours([{'weekday': 0, 'opens_at': '09:00', 'closes_at': '13:00'},
+                        {'weekday': 0, 'opens_at': '17:00', 'closes_at': '23:00'},
+                        {'weekday': 6, 'opens_at': '22:00', 'closes_at': '01:00'}])
+        self.assertEqual(len(ShopProfileDetailSerializer(self.shop).data['hours']), 3)
+
+        self.assertTrue(self.is_open_at(self.monday + datetime.timedelta(hours=12, minutes=59)))
+        self.assertFalse(self.is_open_at(self.monday + datetime.timedelta(hours=13)))
+        self.assertTrue(self.is_open_at(self.monday + datetime.timedelta(hours=17)))
+        self.assertFalse(self.is_open_at(self.monday + datetime.timedelta(days=1, hours=12)))
+        self.assertTrue(self.is_open_at(self.monday + datetime.timedelta(minutes=30)))  # from sunday
+
+        self.set_hours([])
+        self.assertTrue(self.is_open_at(self.monday + datetime.timedelta(days=1, hours=12)))
+
+    def test_rebuilt_on_changes(self):
+        """test that the open intervals are rebuilt once when the hours or the daily times change"""
+        def rebuilds(write):
+            with CaptureQueriesContext(connection) as queries:
+                write()
+            return sum(query['sql'].startswith('DELETE FROM "shops_shopopenintervalmodel"') for query in queries)
+
+        self.shop = ShopProfileModel.objects.get(pk=self.shop.pk)
+        self.shop.name = 'renamed'
+        self.assertEqual(rebuilds(self.shop.save), 0)
+        self.assertEqual(rebuilds(lambda: self.set_hours([{'weekday': 0, 'opens_at': '09:00', 'closes_at': '13:00'},
+                                                          {'weekday': 1, 'opens_at': '09:00', 'closes_at': '13:00'}])),
+                         1)
+        self.assertEqual(self.shop.open_intervals.count(), 2)
+
+        # the hours written one by one, as in the shell
+        hours = ShopHoursModel.objects.create(shop=self.shop, weekday=2, opens_at=datetime.time(9, 0),
+                                              closes_at=datetime.time(13, 0))
+        self.assertEqual(self.shop.open_intervals.count(), 3)
+        hours.delete()
+        self.assertEqual(self.shop.open_intervals.count(), 2)
+
+        self.shop.hours.all().delete()
+        self.shop.opens_at = datetime.time(9, 0)
+        self.assertEqual(rebuilds(self.shop.save), 1)
+        self.assertEqual(self.shop.open_intervals.count(), 7)
+
+    def test_deleted_with_hours(self):
+        """test that deleting a shop with hours doesn't rebuild its open intervals"""
+        self.set_hours([{'weekday': 0, 'opens_at': '09:00', 'closes_at': '13:00'}])
+        self.shop.account.delete()
+        self.assertFalse(ShopOpenIntervalModel.objects.exists())
+
+    def test_refresh_queries(self):
+        """test that the tick takes two queries whatever the number of shops"""
+        create_shops(20, start=1)
+        with self.assertNumQueries(2):
+            refresh_open_shops(self.monday)
+
+
+@override_settings(SHOPS_SEARCH_BACKEND='shops.search.LocalShopSearch')
+class TestShopSearch(TestCase):
+    """Unittest for searching the shops near a location"""
+
+    def setUp(self):
+        """setup for unittest"""
+        self.shops = create_shops(4)
+        for shop, name in zip(self.shops, ('Burger House', 'Pizza Place', 'Pizza Hut', 'Koshary')):
+            shop.name = name
+            shop.save()
+        ShopTagsModel.objects.create(shop=self.shops[3], tag='pizza')
+        get_shop_search().rebuild()
+
+    def search(self, text, **params):
+        response = self.client.get('/shops/', dict(params, latitude=30, longitude=30, search=text))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ranking(self):
+        """test that name hits come before similar names and tag hits, each by distance"""
+        self.assertEqual([shop['name'] for shop in self.search('pizza')['shops']],
+                         ['Pizza Place', 'Pizza Hut', 'Koshary'])
+        self.assertEqual([shop['name'] for shop in self.search('piza')['shops']],
+                         ['Pizza Place', 'Pizza Hut'])
+        self.assertEqual([shop['name'] for shop in self.search('HOUSE')['shops']], ['Burger House'])
+        self.assertEqual(self.search('sushi')['shops'], [])
+
+    def test_paginated_in_sql(self):
+        """test that the search is paginated in the same query as the shops"""
+        self.search('pizza')
+        with self.assertNumQueries(3):  # count, shops and tags
+            data = self.search('pizza', limit=1, offset=1)
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([shop['name'] for shop in data['shops']], ['Pizza Hut'])
+
+    def test_index_follows_writes(self):
+        """test that renamed, deleted and retagged shops are found as they are now"""
+        self.shops[0].name = 'Pizza Burger'
+        self.shops[0].save()
+        self.assertIn('Pizza Burger', [shop['name'] for shop in self.search('pizza')['shops']])
+
+        ShopTagsModel.objects.filter(shop=self.shops[3], tag='pizza').delete()
+        self.shops[1].delete()
+        self.assertEqual([shop['name'] for shop in self.search('pizza')['shops']], ['Pizza Burger', 'Pizza Hut'])
+
+
+@override_settings(SHOPS_SEARCH_BACKEND='shops.search.PostgresShopSearch')
+class TestPostgresShopSearch(TestShopSearch):
+    """Unittest for searching the shops with the trigram indexes of postgres"""
+
+    def setUp(self):
+        """setup for unittest"""
+        if not has_trigrams():
+            self.skipTest('the trigram indexes are only made on postgres with pg_trgm')
+        super(TestPostgresShopSearch, self).setUp()
+
+
+@override_settings(SHOPS_SEARCH_BACKEND='shops.search.LocalShopSearch')
+class TestShopSearchCommits(TransactionTestCase):
+    """Unittest for updating the shops search index after the commits"""
+
+    def test_deleted_with_tags(self):
+        """test that a shop deleted with its tags isn't indexed again when they're committed"""
+        shop = create_shops(1)[0]
+        ShopTagsModel.objects.create(shop=shop, tag='pizza')
+        search = get_shop_search()
+        search.rebuild()
+        with transaction.atomic():
+            ShopTagsModel.objects.filter(shop=shop).delete()
+            shop.delete()
+        self.assertEqual(search.find('pizza'), (set(), set(), set()))
+        self.assertEqual(search.find(shop.name), (set(), set(), set()))
+
+    @override_settings(SHOPS_SEARCH_BACKEND=None)
+    def test_fallback_warning(self):
+        """test that falling back to the local search is logged"""
+        if has_trigrams():
+            self.skipTest('the postgres search is picked when the database has pg_trgm')
+        with self.assertLogs('shops.search', 'WARNING'):
+            self.assertIsInstance(get_shop_search(), LocalShopSearch)
+
+
+@override_settings(PRODUCTS_SEARCH_BACKEND='shops.search.LocalProductSearch')
+class TestProductSearch(TestCase):
+    """Unittest for searching the products of the shops near a location"""
+
+    index_queries = 0  # the queries the backend makes to find the products
+
+    def setUp(self):
+        """setup for unittest"""
+        self.shops = create_shops(3)
+        self.shops[2].is_open = False
+        self.shops[2].save()
+        self.products = []
+        for shop, title, description in ((self.shops[1], 'Cheese Burger', 'beef'),
+                                         (self.shops[0], 'Chicken Burger', 'fried chicken'),
+                                         (self.shops[0], 'Fries', 'with burger sauce'),
+                                         (self.shops[2], 'Burger', 'beef')):
+            self.products.append(ProductModel.objects.create(shop=shop, photo='/shops/tests/sample.jpg',
+                                                             title=title, price=5, description=description))
+        get_product_search().rebuild()
+
+    def search(self, text, **params):
+        response = self.client.get('/shops/products/', dict(params, latitude=30, longitude=30, search=text))
+        self.assertEqual(response.status_code, 200)
+        return [(product['title'], product['shop']['slug']) for product in response.data['products']]
+
+    def test_ranking(self):
+        """test that title hits come before description hits, each by distance, in open shops only"""
+        self.assertEqual(self.search('burger'), [('Chicken Burger', self.shops[0].slug),
+                                                 ('Cheese Burger', self.shops[1].slug),
+                                                 ('Fries', self.shops[0].slug)])
+        self.assertEqual(self.search('burger', limit=1), [('Chicken Burger', self.shops[0].slug)])
+        self.assertEqual(self.search('CHICK bur'), [('Chicken Burger', self.shops[0].slug)])
+        self.assertEqual(self.search('beef'), [('Cheese Burger', self.shops[1].slug)])
+        self.assertEqual(self.search('pizza'), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_queries(self):
+        """test that the products are read with their shops in a fixed number of queries"""
+        self.search('burger')
+        with self.assertNumQueries(3 + self.index_queries):  # shops, products with their shops and tags
+            self.search('burger')
+
+    def test_index_follows_writes(self):
+        """test that edited, unavailable and deleted products are found as they are now"""
+        self.products[2].title = 'Burger Fries'
+        self.products[2].save()
+        self.products[0].is_available = False
+        self.products[0].save()
+        self.assertEqual(self.search('burger'), [('Chicken Burger', self.shops[0].slug),
+                                                 ('Burger Fries', self.shops[0].slug)])
+
+        self.products[1].delete()
+        ProductModel.objects.create(shop=self.shops[1], photo='/shops/tests/sample.jpg',
+                                    title='Double Burger', price=5, description='text')
+        self.assertEqual(self.search('burger'), [('Burger Fries', self.shops[0].slug),
+                                                 ('Double Burger', self.shops[1].slug)])
+
+
+@override_settings(PRODUCTS_SEARCH_BACKEND='shops.search.PostgresProductSearch')
+class TestPostgresProductSearch(TestProductSearch):
+    """Unittest for searching the products with the full text search of postgres"""
+
+    index_queries = 1
+
+    def setUp(self):
+        """setup for unittest"""
+        if connection.vendor != 'postgresql':
+            self.skipTest('the full text search is only on postgres')
+        super(TestPostgresProductSearch, self).setUp()
+
+
+class TestReviewCounters(TestCase):
+    """Unittest for the review counters of the shops"""
+
+    def setUp(self):
+        """setup for unittest"""
+        self.shop = create_shops(1)[0]
+        account = User.objects.create(username='user')
+        self.user = UserProfileModel.objects.create(account=account, phone_number=123)
+        self.client.force_login(account)
+        self.url = '/shops/%s/reviews/' % self.shop.slug
+
+    def assertCounters(self, reviews_count, stars_sum, rating):
+        self.shop.refresh_from_db()
+        self.assertEqual((self.shop.reviews_count, self.shop.stars_sum, float(self.shop.rating)),
+                         (reviews_count, stars_sum, rating))
+
+    def test_review_counters(self):
+        """test that writing reviews updates the counters and rating"""
+        self.client.post(self.url, {'stars': 5, 'text': 'text'})
+        self.client.post(self.url, {'stars': 4, 'text': 'text'})
+        self.assertCounters(2, 9, 4.5)
+
+        self.client.patch(self.url + '2/', {'stars': 3}, content_type='application/json')
+        self.assertCounters(2, 8, 4)
+
+        self.client.delete(self.url + '1/')
+        self.assertCounters(1, 3, 3)
+
+        self.client.delete(self.url + '1/')
+        self.assertCounters(0, 0, 0)
+
+    def test_rounded_rating(self):
+        """test that the stored rating is rounded the same way the counters are rebuilt"""
+        for stars in (5, 5, 4):
+            self.client.post(self.url, {'stars': stars, 'text': 'text'})
+        self.assertCounters(3, 14, 4.7)
+        self.assertTrue(ShopProfileModel.objects.filter(pk=self.shop.pk, rating=Decimal('4.7')).exists())
+
+        ShopProfileModel.objects.update(reviews_count=0)
+        call_command('rebuild_review_counters', stdout=StringIO())
+        self.assertTrue(ShopProfileModel.objects.filter(pk=self.shop.pk, rating=Decimal('4.7')).exists())
+
+    def test_stale_save_keeps_counters(self):
+        """test that saving a shop read before a review doesn't write its old counters back"""
+        shop = ShopProfileModel.objects.get(pk=self.shop.pk)
+        self.client.post(self.url, {'stars': 5, 'text': 'text'})
+
+        shop.description = 'new text'
+        shop.save()
+        self.assertCounters(1, 5, 5)
+        self.assertEqual(self.shop.description, 'new text')
+
+    def test_rebuild_counters(self):
+        """test that the command finds and fixes drifted counters"""
+        self.client.post(self.url, {'stars': 5, 'text': 'text'})
+        ShopReviewModel.objects.create(user=self.user, shop=self.shop, text='text', stars=2)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_review_counters', '--check', stdout=StringIO())
+        self.assertCounters(1, 5, 5)  # only checked
+
+        call_command('rebuild_review_counters', stdout=StringIO())
+        self.assertCounters(2, 7, 3.5)
+        call_command('rebuild_review_counters', '--check', stdout=StringIO())
+
+
+@override_settings(MENU_CACHE='default')
+class TestMenuCache(TestCase):
+    """Unittest for the shops menus cache"""
+
+    def setUp(self):
+        """setup for unittest"""
+        cache.clear()
+        self.shop = create_shops(1)[0]
+        self.group = ProductGroupModel.objects.create(shop=self.shop, title='group')
+        self.product = ProductModel.objects.create(shop=self.shop, product_group=self.group,
+                                                   photo='/shops/tests/sample.jpg', title='product',
+                                                   price=5, description='text')
+        self.url = '/shops/%s/products/' % self.shop.slug
+
+    def test_cache_hit(self):
+        """test that a cached menu is served without queries"""
+        menu = self.client.get(self.url).data
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data, menu)
+        self.assertEqual(menu['groups'][0]['products'][0]['title'], 'product')
+
+        stats = get_menu_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_writes_bump_version(self):
+        """test that writing any part of a menu makes the cached menu stale"""
+        version = get_menu_cache().version(self.shop.slug)
+
+        product = ProductModel.objects.create(shop=self.shop, product_group=self.group,
+                                              photo='/shops/tests/sample.jpg', title='product 2',
+                                              price=5, description='text')
+        self.assertEqual(len(self.client.get(self.url).data['groups'][0]['products']), 2)
+
+        option_group = OptionGroupModel.objects.create(product=product, title='size', changes_price=True)
+        option = OptionModel.objects.create(option_group=option_group, title='large', price=10)
+        AddOnModel.objects.create(product=product, title='add-on', added_price=1)
+        option.delete()
+        self.assertEqual(get_menu_cache().version(self.shop.slug), version + 5)
+
+        self.product.delete()
+        self.assertEqual(len(self.client.get(self.url).data['groups'][0]['products']), 1)
+
+    @override_settings(MENU_CACHE=None)
+    def test_uncached_page(self):
+        """test that without the cache only the groups of the page are serialized"""
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url + '?limit=1')
+        for i in range(20):
+            ProductGroupModel.objects.create(shop=self.shop, title='group %d' % i)
+        with self.assertNumQueries(len(first)):
+            menu = self.client.get(self.url + '?limit=1&offset=2').data
+        self.assertEqual((menu['count'], len(menu['groups'])), (21, 1))
+        self.assertEqual((menu['groups'][0]['title'], menu['groups'][0]['sort']), ('group 1', 3))
+
+
+class TestSlugs(TestCase):
+    """Unittest for making the unique slugs of the shops and products"""
+
+    def setUp(self):
+        """setup for unittest"""
+        self.shops = create_shops(2)
+
+    def create_product(self, title, shop=None):
+        return ProductModel.objects.create(shop=shop or self.shops[0], photo='/shops/tests/sample.jpg',
+                                           title=title, price=5, description='text')
+
+    def test_suffixes(self):
+        """test that products with the same title get suffixes in their shop only"""
+        slugs = [self.create_product('Pizza').slug for _ in range(3)]
+        self.assertEqual(slugs, ['pizza', 'pizza-2', 'pizza-3'])
+        self.assertEqual(self.create_product('Pizza', shop=self.shops[1]).slug, 'pizza')
+        self.assertEqual(self.create_product('Pizza Hut').slug, 'pizza-hut')
+
+        long_slugs = [self.create_product('a' * 255).slug for _ in range(2)]
+        self.assertEqual(long_slugs, ['a' * 255, 'a' * 253 + '-2'])
+
+    def test_queries(self):
+        """test that the queries to make a slug don't grow with the taken slugs"""
+        self.create_product('Pizza')
+        with CaptureQueriesContext(connection) as first:
+            self.create_product('Pizza')
+        for _ in range(20):
+            self.create_product('Pizza')
+        with self.assertNumQueries(len(first)):
+            self.assertEqual(self.create_product('Pizza').slug, 'pizza-23')
+
+    def test_kept_when_unchanged(self):
+        """test that the slug is made again only when the title changes"""
+        self.create_product('Pizza')
+        self.create_product('Pizza')
+        ProductModel.objects.get(slug='pizza').delete()
+
+        product = ProductModel.objects.get(slug='pizza-2')
+        product.price = 10
+        with self.assertNumQueries(1):
+            product.save()
+        self.assertEqual(product.slug, 'pizza-2')
+
+        product.title = 'Pasta'
+        product.save()
+        self.assertEqual(product.slug, 'pasta')
+
+    def test_taken_before_save(self):
+        """test that the slug is made again if another product takes it before the save"""
+        self.create_product('Pizza')
+        product = ProductModel(shop=self.shops[0], photo='/shops/tests/sample.jpg', title='Pizza',
+                               price=5, description='text')
+        siblings = product.slug_siblings
+        calls = []
+
+        def outdated_siblings():  # misses the product created in between the first time
+            calls.append(1)
+            return siblings().none() if len(calls) == 1 else siblings()
+
+        product.slug_siblings = outdated_siblings
+        product.save()
+        self.assertEqual(product.slug, 'pizza-2')
+
+
+@override_settings(ROUTES_CACHE='default')
+class TestRoutesCache(TestCase):
+    """Unittest for the routes cache of the shop and product slugs"""
+
+    def setUp(self):
+        """setup for unittest"""
+        cache.clear()
+        self.shops = create_shops(2)
+        self.product = ProductModel.objects.create(shop=self.shops[0], photo='/shops/tests/sample.jpg',
+                                                   title='Pizza', price=5, description='text')
+        AddOnModel.objects.create(product=self.product, title='cheese', added_price=1)
+        self.url = '/shops/%s/products/pizza/addons/1/' % self.shops[0].slug
+
+    def test_cache_hit(self):
+        """test that a cached route is resolved without queries"""
+        routes = get_routes_cache()
+        route = routes.product(self.shops[0].slug, 'pizza')
+        self.assertEqual(route, ProductRoute(self.shops[0].pk, self.product.pk, self.shops[0].account_id))
+        with self.assertNumQueries(0):
+            self.assertEqual(routes.product(self.shops[0].slug, 'pizza'), route)
+
+        routes.clear()  # the route is read from the django cache
+        with self.assertNumQueries(0):
+            self.assertEqual(routes.product(self.shops[0].slug, 'pizza'), route)
+        self.assertIsNone(routes.product(self.shops[1].slug, 'pizza'))
+        self.assertEqual(self.client.get('/shops/%s/products/pizza/' % self.shops[1].slug).status_code, 404)
+
+    @override_settings(ROUTES_CACHE=None)
+    def test_uncached_product(self):
+        """test that without the cache a product is fetched with its owner in one query"""
+        with self.assertNumQueries(1):
+            product, route = get_product_or_404(self.shops[0].slug, 'pizza')
+        self.assertEqual(product, self.product)
+        self.assertEqual(route, ProductRoute(self.shops[0].pk, self.product.pk, self.shops[0].account_id))
+
+    def test_unknown_slugs(self):
+        """test that the lists of an unknown shop or product are empty with and without the cache"""
+        for routes_cache in ('default', None):
+            with self.settings(ROUTES_CACHE=routes_cache):
+                response = self.client.get('/shops/unknown/reviews/')
+                self.assertEqual((response.status_code, response.data['reviews']), (200, []))
+                response = self.client.get('/shops/%s/products/unknown/reviews/' % self.shops[0].slug)
+                self.assertEqual((response.status_code, response.data['reviews']), (200, []))
+
+    def test_permission_queries(self):
+        """test that a nested route checks who owns the shop without queries"""
+        self.client.force_login(self.shops[0].account)
+        self.client.patch(self.url, {'title': 'cheese'}, content_type='application/json')
+        # the session, user and shop profile, the add-on (at its sort) and its update
+        with self.assertNumQueries(5):
+            response = self.client.patch(self.url, {'title': 'olives'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_login(self.shops[1].account)
+        response = self.client.patch(self.url, {'title': 'olives'}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_slug_changes_bump_version(self):
+        """test that changing or deleting a slug makes the cached routes stale"""
+        version = get_routes_cache().version()
+        self.assertEqual(self.client.get('/shops/%s/products/pizza/' % self.shops[0].slug).status_code, 200)
+
+        self.product.price = 10
+        self.product.save()
+        ProductModel.objects.create(shop=self.shops[0], photo='/shops/tests/sample.jpg',
+                                    title='Pasta', price=5, description='text')
+        self.assertEqual(get_routes_cache().version(), version)
+
+        self.product.title = 'Pizza Margherita'
+        self.product.save()
+        self.assertEqual(get_routes_cache().version(), version + 1)
+        self.assertEqual(self.client.get('/shops/%s/products/pizza/' % self.shops[0].slug).status_code, 404)
+        response = self.client.get('/shops/%s/products/pizza-margherita/' % self.shops[0].slug)
+        self.assertEqual(response.status_code, 200)
+
+        self.shops[0].delete()
+        response = self.client.get('/shops/%s/products/pizza-margherita/' % self.shops[0].slug)
+        self.assertEqual(response.status_code, 404)
+
+
+class TestPriceVaries(TestCase):
+    """Unittest for the price_varies flag of the products"""
+
+    def setUp(self):
+        """setup for unittest"""
+        shop = create_shops(1)[0]
+        self.product = ProductModel.objects.create(shop=shop, photo='/shops/tests/sample.jpg', title='product',
+                                                   price=5, description='text', is_offer=True)
+
+    def assertPriceVaries(self, price_varies):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price_varies, price_varies)
+
+    def test_option_groups_update_flag(self):
+        """test that the flag follows the option groups of the product"""
+        option_group = OptionGroupModel.objects.create(product=self.product, title='size')
+        self.assertPriceVaries(False)
+
+        option_group.changes_price = True
+        option_group.save()
+        self.assertPriceVaries(True)
+        self.assertNotIn('price', ProductSerializer(self.product).data)
+
+        option_group.delete()
+        self.assertPriceVaries(False)
+        self.assertIn('price', ProductSerializer(self.product).data)
+
+    def test_rebuild_price_varies(self):
+        """test that the command finds and fixes drifted flags"""
+        OptionGroupModel.objects.create(product=self.product, title='size', changes_price=True)
+        ProductModel.objects.update(price_varies=False)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_price_varies', '--check', stdout=StringIO())
+        self.assertPriceVaries(False)
+
+        call_command('rebuild_price_varies', stdout=StringIO())
+        self.assertPriceVaries(True)
+        call_command('rebuild_price_varies', '--check', stdout=StringIO())
+
+
+class TestReordering(TestCase):
+    """Unittest for moving the ranked items of a parent"""
+
+    def setUp(self):
+        """setup for unittest"""
+        self.shop = create_shops(1)[0]
+        for i in range(10):
+            ProductGroupModel.objects.create(shop=self.shop, title='group %d' % i)
+
+    def titles(self):
+        return [int(title.split()[1]) for title in self.shop.product_groups.values_list('title', flat=True)]
+
+    def move(self, old_sort, new_sort):
+        group = at_position(self.shop.product_groups, old_sort)
+        group.move_to(new_sort)
+        group.save()
+        return group
+
+    def test_move(self):
+        """test moving an item down and up"""
+        group = self.move(2, 8)
+        self.assertEqual(group.sort, 8)
+        self.assertEqual(self.titles(), [0, 2, 3, 4, 5, 6, 7, 1, 8, 9])
+
+        self.move(8, 1)
+        self.assertEqual(self.titles(), [1, 0, 2, 3, 4, 5, 6, 7, 8, 9])
+        group.sort = None
+        with self.assertRaises(RuntimeError):  # never counted one by one
+            group.sort
+        self.assertEqual(number([group])[0].sort, 1)
+
+    def test_move_writes_one_row(self):
+        """test that a move only changes the rank of the moved item"""
+        ranks = dict(self.shop.product_groups.values_list('title', 'rank'))
+        group = at_position(self.shop.product_groups, 10)
+        with CaptureQueriesContext(connection) as context:
+            group.move_to(1)
+            group.save()
+        self.assertEqual(len(context), 2)  # the ranks around the new sort and the UPDATE
+
+        ranks.pop(group.title)
+        new_ranks = dict(self.shop.product_groups.values_list('title', 'rank'))
+        self.assertEqual(new_ranks.pop(group.title), RANK_STEP // 2)
+        self.assertEqual(new_ranks, ranks)
+
+    def test_respace(self):
+        """test that the items are respaced when a gap runs out"""
+        titles = list(range(10))
+        for i in range(RANK_STEP.bit_length() + 2):  # more moves than halvings of a gap
+            self.move(10, 2)
+            titles.insert(1, titles.pop())
+        self.assertEqual(self.titles(), titles)
+        ranks = list(self.shop.product_groups.values_list('rank', flat=True))
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertTrue(all(later - earlier > 1 for earlier, later in zip(ranks, ranks[1:])))
+
+    def test_serializer_and_delete(self):
+        """test reordering through the serializer and deleting an item"""
+        group = at_position(self.shop.product_groups, 3)
+        serializer = ProductGroupSerializer(group, data={'sort': 1, 'title': 'group 2'})
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.assertEqual(self.titles(), [2, 0, 1, 3, 4, 5, 6, 7, 8, 9])
+
+        ranks = list(self.shop.product_groups.values_list('rank', flat=True))
+        at_position(self.shop.product_groups, 5).delete()
+        self.assertEqual(list(self.shop.product_groups.values_list('rank', flat=True)), ranks[:4] + ranks[5:])
+        self.assertEqual(self.titles(), [2, 0, 1, 3, 5, 6, 7, 8, 9])
+
+        with self.assertNumQueries(2 + 9):  # the groups, their sorts and their products
+            data = ProductGroupSerializer(self.shop.product_groups.all(), many=True).data
+        self.assertEqual([group['sort'] for group in data], list(range(1, 10)))
+
+    def test_number(self):
+        """test numbering the items of different parents with one query"""
+        other_shop = create_shops(1, start=1)[0]
+        for i in range(3):
+            ProductGroupModel.objects.create(shop=other_shop, title='group %d' % i)
+        groups = [self.shop.product_groups.all()[3]] + list(other_shop.product_groups.all())[::-1]
+
+        with self.assertNumQueries(1):
+            number(groups)
+        self.assertEqual([group.sort for group in groups], [4, 3, 2, 1])
+
+    def test_rely_on_sorts(self):
+        """test that the option groups and options the rely-ons point to are numbered, never counted"""
+        product = ProductModel.objects.create(shop=self.shop, photo='/shops/tests/sample.jpg',
+                                              title='product', price=5, description='text')
+        groups = [OptionGroupModel.objects.create(product=product, title='group %d' % i) for i in range(3)]
+        options = [OptionModel.objects.create(option_group=groups[0], title='option %d' % i) for i in range(2)]
+        for group in groups[1:]:
+            RelyOn.objects.create(option_group=group, choosed_option_group=groups[0], option=options[1])
+
+        data = ProductDetailsSerializer(ProductModel.objects.get(pk=product.pk)).data
+        self.assertEqual([group['rely_on'] for group in data['option_groups']],
+                         [None] + [{'choosed_option_group': 1, 'option': 2}] * 2)
+        data = OptionGroupSerializer(at_position(product.option_groups, 3), context={'product': product}).data
+        self.assertEqual(data['rely_on'], {'choosed_option_group': 1, 'option': 2})
+
+    def test_dense_sorts_migration(self):
+        """test that the migration turns dense sorts into spaced ranks"""
+        from importlib import import_module
+        from django.apps import apps
+
+        migration = import_module('shops.migrations.0006_menu_ranks')
+        self.move(2, 8)
+        migration.dense_sorts(apps, None)
+        self.assertEqual(list(self.shop.product_groups.values_list('rank', flat=True)), list(range(1, 11)))
+
+        migration.sparse_ranks(apps, None)
+        self.assertEqual(list(self.shop.product_groups.values_list('rank', flat=True)),
+                         [position * RANK_STEP for position in range(1, 11)])
+        self.assertEqual(self.titles(), [0, 2, 3, 4, 5, 6, 7, 1, 8, 9])
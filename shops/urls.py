@@ -3,7 +3,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from shops.views import (ShopProfileView, ShopReviewView, ProductView, ProductReviewView, ProductGroupView, AddOnView,
-                         OptionGroupView, OptionView, shop_login)
+                         OptionGroupView, OptionView, shop_login, product_search)
 
 shop_reviews_router = DefaultRouter()
 shop_reviews_router.register('', ShopReviewView, 'shop reviews')
@@ -30,6 +30,7 @@ urlpatterns = [
     path('', ShopProfileView.as_view({'get': 'list'})),
     path('signup/', ShopProfileView.as_view({'post': 'create'})),
     path('login/', shop_login),
+    path('products/', product_search),
     path('<slug:shop_slug>/', ShopProfileView.as_view({'get': 'retrieve',
                                                        'put': 'update',
                                                        'patch': 'partial_update',
@@ -1,24 +1,27 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 31/01/2020, 17:29
 
-from itertools import chain
-
 from django.contrib.auth import login, authenticate
-from django.db.models import F
-from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view
 from rest_framework.generics import get_object_or_404
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.pagination import LimitOffsetPagination, _positive_int
 from rest_framework.response import Response
 
-from koshkie import haversine
-from shops.models import ShopProfileModel, ShopReviewModel, ProductGroupModel, ProductModel, ProductReviewModel, \
-    AddOnModel, OptionGroupModel, OptionModel
+from koshkie.ordering import get_at_position_or_404
+from koshkie.pagination import paginate
+from koshkie.ratings import update_rating
+from shops.listing import open_shops_near, get_shops_list
+from shops.menu import get_menu
+from shops.models import ShopProfileModel, ShopReviewModel, ProductGroupModel, ProductReviewModel, \
+    AddOnModel, OptionGroupModel
 from shops.permissions import ShopProfilePermissions, ShopReviewPermissions, ProductPermissions, \
     ProductReviewPermissions, ProductGroupPermissions, AddOnPermission, OptionGroupPermissions, OptionPermissions
-from shops.serializers import (ShopProfileSerializer, ShopProfileDetailSerializer, ShopReviewSerializer,
+from shops.routes import (get_shop_route_or_404, get_product_route_or_404, get_product_or_404, shop_lookups,
+                          product_lookups)
+from shops.search import get_product_search
+from shops.serializers import (ShopProfileDetailSerializer, ShopReviewSerializer,
                                ProductGroupSerializer, ProductDetailsSerializer, ProductReviewSerializer,
-                               AddOnSerializer, OptionGroupSerializer, OptionSerializer, ProductSerializer)
+                               AddOnSerializer, OptionGroupSerializer, OptionSerializer, ProductSearchSerializer)
 
 
 @api_view(['POST'])
@@ -38,6 +41,28 @@ def shop_login(request):
         return Response('Wrong Username or Password', status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+def product_search(request):
+    """returns the top products of the open shops near a location
+    matching a search with their shops, best first"""
+    try:
+        user_longitude = float(request.GET.get('longitude'))
+        user_latitude = float(request.GET.get('latitude'))
+        search = request.GET.get('search', '')
+    except Exception:
+        return Response("invalid coordinates", status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = _positive_int(request.GET['limit'], strict=True, cutoff=50)
+    except (KeyError, ValueError):
+        limit = 20
+
+    shops = open_shops_near(user_latitude, user_longitude)
+    products = get_product_search().search(shops, search, limit)
+    serializer = ProductSearchSerializer(products, many=True)
+
+    return Response(data={'products': serializer.data})
+
+
 class ShopProfileView(viewsets.ViewSet):
     permission_classes = (ShopProfilePermissions,)
     serializer_class = ShopProfileDetailSerializer
@@ -51,30 +76,13 @@ class ShopProfileView(viewsets.ViewSet):
         except Exception:
             return Response("invalid coordinates", status=status.HTTP_400_BAD_REQUEST)
 
-        queryset = ShopProfileModel.objects.annotate(distance=
-                                                     haversine(user_latitude, user_longitude,
-                                                               F('address__location_latitude'),
-                                                               F('address__location_longitude'))
-                                                     ).filter(distance__lte=2.5,
-                                                              is_open=True,
-                                                              is_active=True, opens_at__lte=timezone.now(),
-                                                              closes_at__gt=timezone.now()
-                                                              ).order_by('distance')
-        if shop_type:
-            queryset = queryset.filter(shop_type__iexact=shop_type)
-        if search:
-            queryset_temp1 = queryset.filter(name__icontains=search)
-            queryset_temp2 = queryset.filter(tags__tag__icontains=search).exclude(name__icontains=search)
-            queryset = list(chain(queryset_temp1, queryset_temp2))
-
         paginator = LimitOffsetPagination()
         paginator.default_limit = 25
         paginator.max_limit = 100
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        serializer = ShopProfileSerializer(paginated_queryset, many=True)
+        shops_list = get_shops_list(user_latitude, user_longitude, shop_type, search,
+                                    paginator.get_limit(request), paginator.get_offset(request))
 
-        return Response(data={'limit': paginator.limit, 'offset': paginator.offset,
-                              'count': paginator.count, 'shops': serializer.data})
+        return Response(data=shops_list)
 
     def retrieve(self, request, shop_slug):
         shop_profile = get_object_or_404(ShopProfileModel, slug=shop_slug)
@@ -125,32 +133,28 @@ class ShopReviewView(viewsets.ViewSet):
     serializer_class = ShopReviewSerializer
 
     def list(self, request, shop_slug=None):
-        queryset = ShopReviewModel.objects.filter(shop__slug=shop_slug).all()
+        queryset = ShopReviewModel.objects.filter(**shop_lookups(shop_slug)).all()
 
-        paginator = LimitOffsetPagination()
-        paginator.default_limit = 25
-        paginator.max_limit = 100
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        serializer = ShopReviewSerializer(paginated_queryset, many=True)
+        page, pagination = paginate(queryset, request, ('time_stamp', 'id'))
+        serializer = ShopReviewSerializer(page, many=True)
 
-        return Response(data={'limit': paginator.limit, 'offset': paginator.offset,
-                              'count': paginator.count, 'reviews': serializer.data})
+        return Response(data=dict(pagination, reviews=serializer.data))
 
     def retrieve(self, request, shop_slug=None, pk=None):
-        review = get_object_or_404(ShopReviewModel, shop__slug=shop_slug, sort=pk)
+        review = get_object_or_404(ShopReviewModel, sort=pk, **shop_lookups(shop_slug))
         serializer = ShopReviewSerializer(review)
         return Response(serializer.data)
 
     def create(self, request, shop_slug=None):
-        shop = get_object_or_404(ShopProfileModel, slug=shop_slug)
+        route = get_shop_route_or_404(shop_slug)
         serializer = ShopReviewSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user.profile, shop=shop)
+            serializer.save(user=request.user.profile, shop_id=route.shop_id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def update(self, request, shop_slug=None, pk=None):
-        review = get_object_or_404(ShopReviewModel, shop__slug=shop_slug, sort=pk)
+        review = get_object_or_404(ShopReviewModel, sort=pk, **shop_lookups(shop_slug))
         self.check_object_permissions(request, review)
         serializer = ShopReviewSerializer(review, data=request.data)
         if serializer.is_valid():
@@ -159,7 +163,7 @@ class ShopReviewView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def partial_update(self, request, shop_slug=None, pk=None):
-        review = get_object_or_404(ShopReviewModel, shop__slug=shop_slug, sort=pk)
+        review = get_object_or_404(ShopReviewModel, sort=pk, **shop_lookups(shop_slug))
         self.check_object_permissions(request, review)
         serializer = ShopReviewSerializer(review, data=request.data, partial=True)
         if serializer.is_valid():
@@ -168,14 +172,13 @@ class ShopReviewView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, shop_slug=None, pk=None):
-        review = get_object_or_404(ShopReviewModel, shop__slug=shop_slug, sort=pk)
+        review = get_object_or_404(ShopReviewModel, sort=pk, **shop_lookups(shop_slug))
         self.check_object_permissions(request, review)
         shop = review.shop
         review.delete()
 
-        shop.calculate_rating()
         shop.resort_reviews(review.sort)
-        shop.save()
+        update_rating(shop, -1, -review.stars)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -184,17 +187,18 @@ class ProductGroupView(viewsets.ViewSet):
     serializer_class = ProductGroupSerializer
 
     def create(self, request, shop_slug=None):
-        shop = get_object_or_404(ShopProfileModel, slug=shop_slug)
-        self.check_object_permissions(request, shop)
+        route = get_shop_route_or_404(shop_slug)
+        self.check_object_permissions(request, route)
         serializer = ProductGroupSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(shop=shop)
+            serializer.save(shop_id=route.shop_id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
     def update(self, request, shop_slug=None, pk=None):
-        product_group = get_object_or_404(ProductGroupModel, shop__slug=shop_slug, sort=pk)
-        self.check_object_permissions(request, product_group)
+        route = get_shop_route_or_404(shop_slug)
+        product_group = get_at_position_or_404(ProductGroupModel.objects.filter(shop_id=route.shop_id), pk)
+        self.check_object_permissions(request, route)
         serializer = ProductGroupSerializer(product_group, data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -202,8 +206,9 @@ class ProductGroupView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def partial_update(self, request, shop_slug=None, pk=None):
-        product_group = get_object_or_404(ProductGroupModel, shop__slug=shop_slug, sort=pk)
-        self.check_object_permissions(request, product_group)
+        route = get_shop_route_or_404(shop_slug)
+        product_group = get_at_position_or_404(ProductGroupModel.objects.filter(shop_id=route.shop_id), pk)
+        self.check_object_permissions(request, route)
         serializer = ProductGroupSerializer(product_group, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -211,10 +216,10 @@ class ProductGroupView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, shop_slug=None, pk=None):
-        product_group = get_object_or_404(ProductGroupModel, shop__slug=shop_slug, sort=pk)
-        self.check_object_permissions(request, product_group)
+        route = get_shop_route_or_404(shop_slug)
+        product_group = get_at_position_or_404(ProductGroupModel.objects.filter(shop_id=route.shop_id), pk)
+        self.check_object_permissions(request, route)
         product_group.delete()
-        product_group.shop.resort_product_groups(product_group.sort)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -223,48 +228,36 @@ class ProductView(viewsets.ViewSet):
     serializer_class = ProductDetailsSerializer
 
     def list(self, request, shop_slug=None):
-        queryset = ProductGroupModel.objects.filter(shop__slug=shop_slug)
-
-        best_selling_queryset = ProductModel.objects.filter(shop__slug=shop_slug, is_available=True,
-                                                            num_sold__gt=0).order_by('num_sold')
-        best_selling_serializer = ProductSerializer(best_selling_queryset[:5], many=True)
-
-        offers_queryset = ProductModel.objects.filter(shop__slug=shop_slug, is_offer=True,
-                                                      is_available=True)
-        offers_serializer = ProductSerializer(offers_queryset, many=True)
-
         paginator = LimitOffsetPagination()
         paginator.default_limit = 5
         paginator.max_limit = 10
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        serializer = ProductGroupSerializer(paginated_queryset, many=True)
+        menu = get_menu(shop_slug, paginator, request)
 
         return Response(data={'limit': paginator.limit, 'offset': paginator.offset,
-                              'count': paginator.count, 'offers': offers_serializer.data,
-                              'best_selling': best_selling_serializer.data, 'groups': serializer.data})
+                              'count': paginator.count, 'offers': menu['offers'],
+                              'best_selling': menu['best_selling'], 'groups': menu['groups']})
 
     def retrieve(self, request, shop_slug=None, product_slug=None):
-        product = get_object_or_404(ProductModel, shop__slug=shop_slug, slug=product_slug)
+        product, _ = get_product_or_404(shop_slug, product_slug)
         serializer = ProductDetailsSerializer(product)
         return Response(serializer.data)
 
     def create(self, request, shop_slug=None):
-        shop = get_object_or_404(ShopProfileModel, slug=shop_slug)
+        route = get_shop_route_or_404(shop_slug)
         serializer = ProductDetailsSerializer(data=request.data)
         if serializer.is_valid():
-            self.check_object_permissions(request, shop)
+            self.check_object_permissions(request, route)
             product_group = None
             if not serializer.validated_data.get('is_offer', False):
-                product_group = get_object_or_404(ProductGroupModel,
-                                                  sort=serializer.validated_data.pop('group_id'),
-                                                  shop__slug=shop_slug)
-            serializer.save(shop=shop, product_group=product_group)
+                product_group = get_at_position_or_404(ProductGroupModel.objects.filter(shop_id=route.shop_id),
+                                                       serializer.validated_data.pop('group_id'))
+            serializer.save(shop_id=route.shop_id, product_group=product_group)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def update(self, request, shop_slug=None, product_slug=None):
-        product = get_object_or_404(ProductModel, shop__slug=shop_slug, slug=product_slug)
-        self.check_object_permissions(request, product)
+        product, route = get_product_or_404(shop_slug, product_slug)
+        self.check_object_permissions(request, route)
         serializer = ProductDetailsSerializer(product, data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -272,8 +265,8 @@ class ProductView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def partial_update(self, request, shop_slug=None, product_slug=None):
-        product = get_object_or_404(ProductModel, shop__slug=shop_slug, slug=product_slug)
-        self.check_object_permissions(request, product)
+        product, route = get_product_or_404(shop_slug, product_slug)
+        self.check_object_permissions(request, route)
         serializer = ProductDetailsSerializer(product, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -281,8 +274,8 @@ class ProductView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, shop_slug=None, product_slug=None):
-        product = get_object_or_404(ProductModel, slug=product_slug, shop__slug=shop_slug)
-        self.check_object_permissions(request, product)
+        product, route = get_product_or_404(shop_slug, product_slug)
+        self.check_object_permissions(request, route)
         product.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -292,25 +285,19 @@ class ProductReviewView(viewsets.ViewSet):
     serializer_class = ProductReviewSerializer
 
     def list(self, request, shop_slug=None, product_slug=None):
-        queryset = ProductReviewModel.objects.filter(product__shop__slug=shop_slug,
-                                                     product__slug=product_slug).all()
-        paginator = LimitOffsetPagination()
-        paginator.default_limit = 25
-        paginator.max_limit = 100
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        serializer = ProductReviewSerializer(paginated_queryset, many=True)
+        queryset = ProductReviewModel.objects.filter(**product_lookups(shop_slug, product_slug)).all()
+        page, pagination = paginate(queryset, request, ('time_stamp', 'id'))
+        serializer = ProductReviewSerializer(page, many=True)
 
-        return Response(data={'limit': paginator.limit, 'offset': paginator.offset,
-                              'count': paginator.count, 'reviews': serializer.data})
+        return Response(data=dict(pagination, reviews=serializer.data))
 
     def retrieve(self, request, shop_slug=None, product_slug=None, pk=None):
-        review = get_object_or_404(ProductReviewModel, product__shop__slug=shop_slug,
-                                   product__slug=product_slug, sort=pk)
+        review = get_object_or_404(ProductReviewModel, sort=pk, **product_lookups(shop_slug, product_slug))
         serializer = ProductReviewSerializer(review)
         return Response(serializer.data)
 
     def create(self, request, shop_slug=None, product_slug=None):
-        product = get_object_or_404(ProductModel, shop__slug=shop_slug, slug=product_slug)
+        product, _ = get_product_or_404(shop_slug, product_slug)
         serializer = ProductReviewSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(user=request.user.profile, product=product)
@@ -318,8 +305,7 @@ class ProductReviewView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def update(self, request, shop_slug=None, product_slug=None, pk=None):
-        review = get_object_or_404(ProductReviewModel, product__shop__slug=shop_slug,
-                                   product__slug=product_slug, sort=pk)
+        review = get_object_or_404(ProductReviewModel, sort=pk, **product_lookups(shop_slug, product_slug))
         self.check_object_permissions(request, review)
         serializer = ProductReviewSerializer(review, data=request.data)
         if serializer.is_valid():
@@ -328,8 +314,7 @@ class ProductReviewView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def partial_update(self, request, shop_slug=None, product_slug=None, pk=None):
-        review = get_object_or_404(ProductReviewModel, product__shop__slug=shop_slug,
-                                   product__slug=product_slug, sort=pk)
+        review = get_object_or_404(ProductReviewModel, sort=pk, **product_lookups(shop_slug, product_slug))
         self.check_object_permissions(request, review)
         serializer = ProductReviewSerializer(review, data=request.data, partial=True)
         if serializer.is_valid():
@@ -338,15 +323,13 @@ class ProductReviewView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, shop_slug=None, product_slug=None, pk=None):
-        review = get_object_or_404(ProductReviewModel, product__shop__slug=shop_slug,
-                                   product__slug=product_slug, sort=pk)
+        review = get_object_or_404(ProductReviewModel, sort=pk, **product_lookups(shop_slug, product_slug))
         self.check_object_permissions(request, review)
         product = review.product
         review.delete()
 
-        product.calculate_rating()
         product.resort_reviews(review.sort)
-        product.save()
+        update_rating(product, -1, -review.stars)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -355,8 +338,8 @@ class OptionGroupView(viewsets.ViewSet):
     serializer_class = OptionGroupSerializer
 
     def create(self, request, shop_slug=None, product_slug=None):
-        product = get_object_or_404(ProductModel, shop__slug=shop_slug, slug=product_slug)
-        self.check_object_permissions(request, product)
+        product, route = get_product_or_404(shop_slug, product_slug)
+        self.check_object_permissions(request, route)
         serializer = OptionGroupSerializer(data=request.data, context={'product': product})
         if serializer.is_valid():
             serializer.save(product=product)
@@ -364,9 +347,9 @@ class OptionGroupView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def update(self, request, shop_slug=None, product_slug=None, pk=None):
-        product = get_object_or_404(ProductModel, slug=product_slug, shop__slug=shop_slug)
-        option_group = get_object_or_404(OptionGroupModel, product=product, sort=pk)
-        self.check_object_permissions(request, option_group)
+        product, route = get_product_or_404(shop_slug, product_slug)
+        option_group = get_at_position_or_404(product.option_groups, pk)
+        self.check_object_permissions(request, route)
         serializer = OptionGroupSerializer(option_group, data=request.data, context={'product': product})
         if serializer.is_valid():
             serializer.save()
@@ -374,9 +357,9 @@ class OptionGroupView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def partial_update(self, request, shop_slug=None, product_slug=None, pk=None):
-        product = get_object_or_404(ProductModel, slug=product_slug, shop__slug=shop_slug)
-        option_group = get_object_or_404(OptionGroupModel, product=product, sort=pk)
-        self.check_object_permissions(request, option_group)
+        product, route = get_product_or_404(shop_slug, product_slug)
+        option_group = get_at_position_or_404(product.option_groups, pk)
+        self.check_object_permissions(request, route)
         serializer = OptionGroupSerializer(option_group, data=request.data, context={'product': product}, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -384,11 +367,10 @@ class OptionGroupView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, shop_slug=None, product_slug=None, pk=None):
-        option_group = get_object_or_404(OptionGroupModel, product__slug=product_slug,
-                                         product__shop__slug=shop_slug, sort=pk)
-        self.check_object_permissions(request, option_group)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        option_group = get_at_position_or_404(OptionGroupModel.objects.filter(product_id=route.product_id), pk)
+        self.check_object_permissions(request, route)
         option_group.delete()
-        option_group.product.resort_option_groups(option_group.sort)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -397,9 +379,10 @@ class OptionView(viewsets.ViewSet):
     serializer_class = OptionSerializer
 
     def create(self, request, shop_slug=None, product_slug=None, group_id=None):
-        option_group = get_object_or_404(OptionGroupModel, product__shop__slug=shop_slug,
-                                         product__slug=product_slug, sort=group_id)
-        self.check_object_permissions(request, option_group)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        option_group = get_at_position_or_404(OptionGroupModel.objects.filter(product_id=route.product_id),
+                                              group_id)
+        self.check_object_permissions(request, route)
         serializer = OptionSerializer(data=request.data, context={'option_group': option_group})
         if serializer.is_valid():
             serializer.save(option_group=option_group)
@@ -407,10 +390,11 @@ class OptionView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def update(self, request, shop_slug=None, product_slug=None, group_id=None, pk=None):
-        option_group = get_object_or_404(OptionGroupModel, product__slug=product_slug,
-                                         product__shop__slug=shop_slug, sort=group_id)
-        option = get_object_or_404(OptionModel, option_group=option_group, sort=pk)
-        self.check_object_permissions(request, option)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        option_group = get_at_position_or_404(OptionGroupModel.objects.filter(product_id=route.product_id),
+                                              group_id)
+        option = get_at_position_or_404(option_group.options, pk)
+        self.check_object_permissions(request, route)
         serializer = OptionSerializer(option, data=request.data,
                                       context={'option_group': option_group})
         if serializer.is_valid():
@@ -419,10 +403,11 @@ class OptionView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def partial_update(self, request, shop_slug=None, product_slug=None, group_id=None, pk=None):
-        option_group = get_object_or_404(OptionGroupModel, product__slug=product_slug,
-                                         product__shop__slug=shop_slug, sort=group_id)
-        option = get_object_or_404(OptionModel, option_group=option_group, sort=pk)
-        self.check_object_permissions(request, option)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        option_group = get_at_position_or_404(OptionGroupModel.objects.filter(product_id=route.product_id),
+                                              group_id)
+        option = get_at_position_or_404(option_group.options, pk)
+        self.check_object_permissions(request, route)
         serializer = OptionSerializer(option, data=request.data,
                                       context={'option_group': option_group}, partial=True)
         if serializer.is_valid():
@@ -431,12 +416,12 @@ class OptionView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, shop_slug=None, product_slug=None, group_id=None, pk=None):
-        option = get_object_or_404(OptionModel, option_group__product__slug=product_slug,
-                                   option_group__product__shop__slug=shop_slug,
-                                   option_group__sort=group_id, sort=pk)
-        self.check_object_permissions(request, option)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        option_group = get_at_position_or_404(OptionGroupModel.objects.filter(product_id=route.product_id),
+                                              group_id)
+        option = get_at_position_or_404(option_group.options, pk)
+        self.check_object_permissions(request, route)
         option.delete()
-        option.option_group.resort_options(option.sort)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -445,18 +430,18 @@ class AddOnView(viewsets.ViewSet):
     serializer_class = AddOnSerializer
 
     def create(self, request, shop_slug=None, product_slug=None):
-        product = get_object_or_404(ProductModel, shop__slug=shop_slug, slug=product_slug)
-        self.check_object_permissions(request, product)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        self.check_object_permissions(request, route)
         serializer = AddOnSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(product=product)
+            serializer.save(product_id=route.product_id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def update(self, request, shop_slug=None, product_slug=None, pk=None):
-        addon = get_object_or_404(AddOnModel, product__slug=product_slug,
-                                  product__shop__slug=shop_slug, sort=pk)
-        self.check_object_permissions(request, addon)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        addon = get_at_position_or_404(AddOnModel.objects.filter(product_id=route.product_id), pk)
+        self.check_object_permissions(request, route)
         serializer = AddOnSerializer(addon, data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -464,9 +449,9 @@ class AddOnView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def partial_update(self, request, shop_slug=None, product_slug=None, pk=None):
-        addon = get_object_or_404(AddOnModel, product__slug=product_slug,
-                                  product__shop__slug=shop_slug, sort=pk)
-        self.check_object_permissions(request, addon)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        addon = get_at_position_or_404(AddOnModel.objects.filter(product_id=route.product_id), pk)
+        self.check_object_permissions(request, route)
         serializer = AddOnSerializer(addon, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -474,9 +459,8 @@ class AddOnView(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, shop_slug=None, product_slug=None, pk=None):
-        addon = get_object_or_404(AddOnModel, product__slug=product_slug,
-                                  product__shop__slug=shop_slug, sort=pk)
-        self.check_object_permissions(request, addon)
+        route = get_product_route_or_404(shop_slug, product_slug)
+        addon = get_at_position_or_404(AddOnModel.objects.filter(product_id=route.product_id), pk)
+        self.check_object_permissions(request, route)
         addon.delete()
-        addon.product.resort_addons(addon.sort)
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,28 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 18:40
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from koshkie.geoindex import build_index, read_places
+
+
+class Command(BaseCommand):
+    """Django command to build the offline reverse geocoding index
+    from a csv file of places (e.g. an export of the GeoNames cities)"""
+
+    help = 'Builds GEOCODING_OFFLINE_INDEX from a csv with latitude, longitude, country and city columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='csv file of the places')
+        parser.add_argument('--output', default=settings.GEOCODING_OFFLINE_INDEX,
+                            help='path of the index file')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        output = options['output']
+        # running workers keep reading the old file until they restart
+        size = build_index(read_places(options['source']), output + '.tmp')
+        os.replace(output + '.tmp', output)
+
+        self.stdout.write(self.style.SUCCESS('Indexed %d places in %s' % (size, output)))
@@ -0,0 +1,38 @@
+#  Copyright (c) Code Written and Tested by Ahmed Emad in 18/10/2026, 18:10
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from koshkie.geocoding import get_geocode_cache
+from orders.models import OrderAddressModel
+from users.models import UserAddressModel
+
+
+class Command(BaseCommand):
+    """Django command to prefill the persistent geocoding cache
+    with the country and city of the already geocoded addresses"""
+
+    help = 'Fills GEOCODING_CACHE from the user and order addresses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='number of cells written to the cache at once')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        cache = get_geocode_cache()
+        if cache is None or not settings.GEOCODING_CACHE:
+            raise CommandError('GEOCODING_CACHE is not set, an in-process cache is lost when this command exits')
+
+        cells = {}
+        for model in (UserAddressModel, OrderAddressModel):
+            addresses = model.objects.exclude(country='').values_list('location_latitude', 'location_longitude',
+                                                                      'country', 'city')
+            for latitude, longitude, country, city in addresses.iterator():
+                latitude, longitude = float(latitude), float(longitude)
+                cells[cache.key(latitude, longitude)] = ((latitude, longitude), (country, city))
+
+        results = list(cells.values())
+        for i in range(0, len(results), options['batch_size']):
+            cache.set_many(results[i:i + options['batch_size']])
+
+        self.stdout.write(self.style.SUCCESS('Cached %d locations' % len(results)))
@@ -6,6 +6,8 @@ from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+from koshkie.geocoding import Geocoded
+
 
 def photo_upload(instance, filename):
     """Gives a unique path to the saved photo in models.
@@ -33,7 +35,7 @@ class UserProfileModel(models.Model):
         return self.account.username
 
 
-class UserAddressModel(models.Model):
+class UserAddressModel(Geocoded, models.Model):
     """The Model of the User's address."""
 
     address_type_choices = [
@@ -1,10 +1,9 @@
 #  Copyright (c) Code Written and Tested by Ahmed Emad in 21/02/2020, 17:27
 from django.db.models import F
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, pre_save, post_save
 from django.dispatch import receiver
-from geopy import Nominatim
-from geopy.exc import GeocoderTimedOut
 
+from koshkie.geocoding import geocode_address
 from users.models import UserProfileModel, UserAddressModel
 
 
@@ -27,24 +26,15 @@ def add_sort_to_address(sender, **kwargs):
         address.sort = latest_sort + 1
 
 
-@receiver(pre_save, sender=UserAddressModel)
+@receiver(post_save, sender=UserAddressModel)
 def add_country_and_city(sender, **kwargs):
-    """The receiver called before a user address is saved
-    to get the country and city from location coordinates"""
+    """The receiver called after a user address is saved
+    to get the country and city from location coordinates
+    in the background when it's new or its location changed"""
 
     address = kwargs['instance']
-    longitude = address.location_longitude
-    latitude = address.location_latitude
-    geolocator = Nominatim()
-    try:
-        location = geolocator.reverse("{}, {}".format(longitude, latitude), language='en')
-        address.country = location.raw.get('address', {}).get('country', '')
-        address.city = location.raw.get('address', {}).get('state', '') or location.raw.get('address', {}).get('city',
-                                                                                                               '')
-    except GeocoderTimedOut:
-        return add_country_and_city(sender, **kwargs)  # recursion
-    except Exception:
-        pass
+    if not kwargs['raw'] and address.location_changed():
+        geocode_address(address)
 
 
 @receiver(post_delete, sender=UserAddressModel)